@@ -0,0 +1,2 @@
+# -*- coding: utf-8 -*-
+"""Micro-benchmarks for tavi. Run with *python -m benchmarks.run*."""
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""Representative models and sample data used by the benchmarks."""
+import datetime
+from tavi import fields
+from tavi.documents import Document, EmbeddedDocument
+from tavi import validators
+
+WIDE_FIELD_COUNT = 40
+ORDER_LINE_COUNT = 50
+ARRAY_LENGTH = 10000
+JOURNAL_ENTRY_COUNT = 5000
+
+
+def _wide_attrs():
+    attrs = {}
+    for i in range(WIDE_FIELD_COUNT):
+        if i % 4 == 0:
+            attrs["s%02d" % i] = fields.StringField("s%02d" % i)
+        elif i % 4 == 1:
+            attrs["i%02d" % i] = fields.IntegerField("i%02d" % i)
+        elif i % 4 == 2:
+            attrs["f%02d" % i] = fields.FloatField("f%02d" % i)
+        else:
+            attrs["d%02d" % i] = fields.DateTimeField("d%02d" % i)
+    return attrs
+
+
+Wide = type(Document)("Wide", (Document,), _wide_attrs())
+
+
+class Address(EmbeddedDocument):
+    street = fields.StringField("street")
+    city = fields.StringField("city")
+    state = fields.StringField("state")
+    postal_code = fields.StringField("postal_code")
+
+
+class OrderLine(EmbeddedDocument):
+    sku = fields.StringField("sku", required=True)
+    quantity = fields.IntegerField("quantity", min_value=0)
+    total_price = fields.FloatField("total_price", min_value=0)
+    created_at = fields.DateTimeField("created_at")
+    last_modified_at = fields.DateTimeField("last_modified_at")
+
+
+class Order(Document):
+    name = fields.StringField("name")
+    address = fields.EmbeddedField("address", Address)
+    email = fields.StringField("email")
+    pay_type = fields.StringField("pay_type")
+    order_lines = fields.ListField("order_lines", OrderLine, key="sku")
+    discount_codes = fields.ArrayField("discount_codes")
+    created_at = fields.DateTimeField("created_at")
+    last_modified_at = fields.DateTimeField("last_modified_at")
+
+
+def _validate_reading(field, document, item):
+    if not isinstance(item, float):
+        document.errors.add(field.name, "values must be floats")
+
+
+class Series(Document):
+    name = fields.StringField("name")
+    readings = fields.ArrayField("readings", validate_item=_validate_reading)
+
+
+class CheckedSeries(Document):
+    name = fields.StringField("name")
+    readings = fields.ArrayField(
+        "readings", validate_items=validators.item_type(float))
+
+
+class PackedSeries(Document):
+    name = fields.StringField("name")
+    readings = fields.TypedArrayField("readings", min_value=0)
+
+
+class JournalEntry(EmbeddedDocument):
+    number = fields.IntegerField("number")
+    memo = fields.StringField("memo")
+
+
+class Journal(Document):
+    name = fields.StringField("name")
+    entries = fields.ListField("entries", JournalEntry)
+
+
+class LazyJournal(Document):
+    name = fields.StringField("name")
+    entries = fields.ListField("entries", JournalEntry, lazy=True)
+
+
+def wide_values():
+    """Returns keyword arguments for a fully populated *Wide* document."""
+    now = datetime.datetime(2015, 2, 3, 12, 30, 0)
+    values = {}
+    for name in Wide._field_descriptors:
+        i = int(name[1:])
+        values[name] = {
+            "s": u"value %s" % i,
+            "i": i,
+            "f": i * 1.5,
+            "d": now
+        }[name[0]]
+    return values
+
+
+def order_values():
+    """Returns keyword arguments for an *Order* with many order lines."""
+    return {
+        "name": u"John Doe",
+        "email": u"jdoe@example.com",
+        "pay_type": u"Mastercard",
+        "address": {
+            "street": u"123 Elm St.",
+            "city": u"Anywhere",
+            "state": u"NJ",
+            "postal_code": u"00000"
+        },
+        "order_lines": [
+            {"sku": u"SKU-%05d" % i, "quantity": i, "total_price": i * 9.99}
+            for i in range(ORDER_LINE_COUNT)
+        ],
+        "discount_codes": [u"HelloInternet", u"rosebud"]
+    }
+
+
+def series_values():
+    """Returns keyword arguments for a *Series* with a long array."""
+    return {
+        "name": u"sensor-1",
+        "readings": [i * 0.25 for i in range(ARRAY_LENGTH)]
+    }
+
+
+def journal_values():
+    """Returns keyword arguments for a *Journal* with a long list."""
+    return {
+        "name": u"ledger",
+        "entries": [
+            {"number": i, "memo": u"entry %s" % i}
+            for i in range(JOURNAL_ENTRY_COUNT)
+        ]
+    }
@@ -0,0 +1,357 @@
+# -*- coding: utf-8 -*-
+"""Runs the tavi benchmarks and compares them against a saved baseline.
+
+Usage::
+
+    python -m benchmarks.run                  # run and compare to baseline
+    python -m benchmarks.run --save           # run and save a new baseline
+    python -m benchmarks.run to_json find     # only run matching benchmarks
+
+Each benchmark reports operations per second (best of several repeats),
+the number of objects left allocated per operation and the peak memory
+used while running it.
+
+"""
+from __future__ import print_function
+import argparse
+import gc
+import json
+import os
+import sys
+from benchmarks import models
+from tavi import Connection
+from tavi.utils.timer import clock
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+_benchmarks = []
+
+
+def benchmark(setup=None, number=100):
+    """Registers the decorated function as a benchmark. *setup* is called
+    once before timing and its return value is passed to the benchmark.
+    *number* is how many times the benchmark is called per repeat.
+
+    """
+    def decorator(fn):
+        _benchmarks.append((fn.__name__, fn, setup, number))
+        return fn
+    return decorator
+
+
+def _connect():
+    Connection.setup("benchmarks", backend="memory")
+    return Connection.database
+
+
+def _populate(document_class, values, count):
+    database = _connect()
+    for _ in range(count):
+        document_class(**values).save()
+    return database
+
+
+def _wide():
+    return models.Wide(**models.wide_values())
+
+
+def _order():
+    return models.Order(**models.order_values())
+
+
+def _saved_orders():
+    return _populate(models.Order, models.order_values(), 20)
+
+
+def _saved_wides():
+    return _populate(models.Wide, models.wide_values(), 100)
+
+
+def _saved_series():
+    database = _populate(models.Series, models.series_values(), 5)
+    for _ in range(5):
+        models.PackedSeries(**models.series_values()).save()
+    return database
+
+
+def _saved_journals():
+    database = _populate(models.Journal, models.journal_values(), 1)
+    models.LazyJournal(**models.journal_values()).save()
+    return database
+
+
+def _unsaved_wide_values():
+    _connect()
+    return models.wide_values()
+
+
+def _unsaved_order():
+    _connect()
+    return _order()
+
+
+@benchmark(setup=models.wide_values, number=500)
+def construct_wide(values):
+    return models.Wide(**values)
+
+
+@benchmark(setup=_wide, number=500)
+def field_values_wide(doc):
+    return doc.field_values
+
+
+@benchmark(setup=_wide, number=500)
+def to_json_wide(doc):
+    return doc.to_json()
+
+
+@benchmark(setup=_wide, number=500)
+def to_json_wide_fields(doc):
+    return doc.to_json(fields=sorted(doc.fields)[:10])
+
+
+@benchmark(setup=models.order_values, number=50)
+def construct_order(values):
+    return models.Order(**values)
+
+
+@benchmark(setup=_order, number=50)
+def to_json_order(doc):
+    return doc.to_json()
+
+
+@benchmark(setup=_order, number=50)
+def json_round_trip_order(doc):
+    return models.Order.from_json(doc.to_json())
+
+
+@benchmark(setup=_order, number=50)
+def bson_round_trip_order(doc):
+    return models.Order.from_bson(doc.to_bson())
+
+
+@benchmark(setup=_wide, number=500)
+def json_round_trip_wide(doc):
+    return models.Wide.from_json(doc.to_json())
+
+
+@benchmark(setup=_wide, number=500)
+def bson_round_trip_wide(doc):
+    return models.Wide.from_bson(doc.to_bson())
+
+
+@benchmark(setup=_order, number=50)
+def order_lines_find(doc):
+    lines = doc.order_lines
+    return [lines.find(line) for line in lines[-10:]]
+
+
+@benchmark(setup=_order, number=50)
+def order_lines_get_by_key(doc):
+    lines = doc.order_lines
+    return [lines.get_by_key(line.sku) for line in lines[-10:]]
+
+
+@benchmark(setup=models.series_values, number=20)
+def construct_series(values):
+    return models.Series(**values)
+
+
+@benchmark(setup=models.series_values, number=20)
+def construct_checked_series(values):
+    return models.CheckedSeries(**values)
+
+
+@benchmark(setup=models.series_values, number=20)
+def construct_packed_series(values):
+    return models.PackedSeries(**values)
+
+
+@benchmark(setup=_saved_orders, number=5)
+def find_orders(database):
+    return list(models.Order.find())
+
+
+@benchmark(setup=_saved_wides, number=5)
+def find_wide(database):
+    return list(models.Wide.find())
+
+
+@benchmark(setup=_saved_wides, number=5)
+def find_wide_two_fields(database):
+    return [(w.s00, w.i01) for w in models.Wide.find()]
+
+
+@benchmark(setup=_saved_wides, number=5)
+def find_wide_lazy_two_fields(database):
+    return [(w.s00, w.i01) for w in models.Wide.find(lazy=True)]
+
+
+@benchmark(setup=_saved_series, number=5)
+def find_series(database):
+    return list(models.Series.find())
+
+
+@benchmark(setup=_saved_series, number=5)
+def find_packed_series(database):
+    return list(models.PackedSeries.find())
+
+
+@benchmark(setup=_saved_journals, number=5)
+def find_journal_head(database):
+    return [e.memo for e in models.Journal.find_one().entries[:10]]
+
+
+@benchmark(setup=_saved_journals, number=5)
+def find_lazy_journal_head(database):
+    entries = models.LazyJournal.find_one().entries
+    return [entries[i].memo for i in range(10)]
+
+
+@benchmark(setup=_unsaved_wide_values, number=200)
+def insert_wide(values):
+    return models.Wide(**values).save()
+
+
+@benchmark(setup=_unsaved_order, number=50)
+def update_order(doc):
+    return doc.save()
+
+
+def _peak_memory():
+    if tracemalloc:
+        return tracemalloc.get_traced_memory()[1]
+    if resource:
+        # ru_maxrss is in kilobytes on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return None
+
+
+def _count_allocations(fn, arg, number):
+    """Returns the number of objects left allocated per call of *fn*. The
+    results are kept alive so the objects they reference are counted.
+
+    """
+    gc.collect()
+    gc.disable()
+    try:
+        before = len(gc.get_objects())
+        results = [fn(arg) for _ in range(number)]
+        after = len(gc.get_objects())
+    finally:
+        gc.enable()
+    del results
+    return float(after - before - 1) / number
+
+
+def run_benchmark(name, fn, setup, number, repeat=5):
+    """Runs a single benchmark and returns a dictionary of its results."""
+    arg = setup() if setup else None
+    fn(arg)  # warm up
+
+    best = None
+    for _ in range(repeat):
+        start = clock()
+        for _ in range(number):
+            fn(arg)
+        elapsed = clock() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    if tracemalloc:
+        tracemalloc.start()
+    peak_before = _peak_memory()
+    allocations = _count_allocations(fn, arg, number)
+    peak_after = _peak_memory()
+    if tracemalloc:
+        tracemalloc.stop()
+
+    return {
+        "ops_per_sec": number / best if best else float("inf"),
+        "allocations_per_op": allocations,
+        "peak_memory_bytes": (
+            None if peak_after is None else peak_after - peak_before)
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Returns the names of benchmarks that are more than *tolerance*
+    (a fraction) slower than *baseline*.
+
+    """
+    regressions = []
+    for name, result in sorted(results.items()):
+        expected = baseline.get(name, {}).get("ops_per_sec")
+        if expected and result["ops_per_sec"] < expected * (1 - tolerance):
+            regressions.append(name)
+    return regressions
+
+
+def _format_row(name, result, baseline):
+    expected = baseline.get(name, {}).get("ops_per_sec")
+    change = ""
+    if expected:
+        change = "%+.1f%%" % ((result["ops_per_sec"] / expected - 1) * 100)
+
+    peak = result["peak_memory_bytes"]
+    return "%-20s %14.1f %10s %12.1f %14s" % (
+        name,
+        result["ops_per_sec"],
+        change,
+        result["allocations_per_op"],
+        "n/a" if peak is None else "%.1f KiB" % (peak / 1024.0)
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("names", nargs="*", help="only run these benchmarks")
+    parser.add_argument(
+        "--baseline", default=BASELINE_FILE, help="baseline file to use")
+    parser.add_argument(
+        "--save", action="store_true", help="save results as the baseline")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.2,
+        help="allowed slowdown before failing (default: 0.2)")
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    print("%-20s %14s %10s %12s %14s" % (
+        "benchmark", "ops/sec", "change", "allocs/op", "peak memory"))
+
+    results = {}
+    for name, fn, setup, number in _benchmarks:
+        if args.names and not any(n in name for n in args.names):
+            continue
+        results[name] = run_benchmark(name, fn, setup, number)
+        print(_format_row(name, results[name], baseline))
+
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump(
+                results, f, indent=2, sort_keys=True, separators=(",", ": "))
+        print("Saved baseline to %s" % args.baseline)
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print("Regressed: %s" % ", ".join(regressions))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
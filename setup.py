@@ -29,6 +29,7 @@ setup(
     author_email='bnadlerjr@gmail.com',
     packages=[
         'tavi',
+        'tavi.backends',
         'tavi.base',
         'tavi.utils'
     ],
@@ -39,9 +40,14 @@ setup(
     include_package_data=True,
     zip_safe=False,
     install_requires=[
+        "futures >= 2.1.6",
         "inflection >= 0.2.0",
-        "pymongo >= 2.4.1"
+        "pymongo >= 2.9"
     ] + test_requirements,
+    extras_require={
+        "asyncio": ["trollius"],
+        "numpy": ["numpy"]
+    },
     tests_require=test_requirements,
     test_suite="nose_collector"
 )
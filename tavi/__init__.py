@@ -1,32 +1,119 @@
 # -*- coding: utf-8 -*-
 """A simple Object Document Mapper for MongoDB"""
-from pymongo import MongoClient, MongoReplicaSetClient
-from pymongo.database import Database
+from tavi.backends import get_backend
+from tavi.errors import TaviConnectionError
+from tavi import executors
 import collections
+import os
 import tavi
 
 
 class Connection(object):
-    """Represents a MongoDB connection."""
+    """Represents the MongoDB connections. Several named connections can be
+    set up with the *alias* argument of *setup*; the attributes of this
+    class hold the default connection.
 
+    The connections belong to the process that set them up; a forked
+    process gets its own clients the first time it uses a connection.
+
+    """
+    DEFAULT_ALIAS = "default"
+
+    backend = None
     client = None
     database = None
+    pid = None
+
+    _connections = {}
 
     @classmethod
-    def setup(cls, database_name, **kwargs):
+    def setup(
+        cls, database_name, backend="mongo", alias=DEFAULT_ALIAS, **kwargs
+    ):
         """Sets ups the Mongo connection. *database_name* is the name of the
         database to connect to. **kwargs** are the same options that can be
         passed to *MongoClient*. If replicaSet is present in the host, a
         *MongoReplicaSetClient* will be used instead.
 
+        *backend* selects the storage backend; either "mongo" (the default),
+        "memory" for an in-process database or a
+        *tavi.base.backends.BaseBackend* instance.
+
+        *alias* names the connection. Documents use the default connection
+        unless they name another one in *__connection__*.
+
         """
-        host = kwargs.get("host", "")
-        if host.find("replicaSet") > 0:
-            client = MongoReplicaSetClient(**kwargs)
-        else:
-            client = MongoClient(**kwargs)
-        cls.client = client
-        cls.database = Database(client, database_name)
+        if cls.pid is not None and cls.pid != os.getpid():
+            cls.reset_after_fork()
+
+        backend = get_backend(backend)
+        client, database = backend.connect(database_name, **kwargs)
+        cls._connections[alias] = _NamedConnection(
+            backend, client, database, database_name, kwargs)
+        cls.pid = os.getpid()
+
+        if cls.DEFAULT_ALIAS == alias:
+            cls.backend, cls.client, cls.database = backend, client, database
+
+    @classmethod
+    def get_database(cls, alias=None, name=None):
+        """Returns the database of the connection named *alias*, or of the
+        default connection. *name* selects another database on the same
+        client. Rebuilds the clients first if the process has been forked
+        since they were created.
+
+        Returns None if the default connection has not been set up and
+        raises a TaviConnectionError for an unknown *alias*.
+
+        """
+        if cls.pid != os.getpid() and cls._connections:
+            cls.reset_after_fork()
+
+        connection = cls._connections.get(alias or cls.DEFAULT_ALIAS)
+        if connection is None:
+            if alias in (None, cls.DEFAULT_ALIAS):
+                return None
+            raise TaviConnectionError(
+                "No connection named '%s'. Did you call "
+                "'tavi.Connection.setup' with alias='%s'?" % (alias, alias))
+
+        if name is None:
+            return connection.database
+        return connection.client[name]
+
+    @classmethod
+    def reset_after_fork(cls):
+        """Replaces the clients inherited from the parent process, along with
+        the shared thread pool, whose threads do not survive a fork. Called
+        automatically, but may be called from a post-fork hook (such as
+        gunicorn's *post_fork*) to connect eagerly.
+
+        """
+        executors.reset()
+        for connection in cls._connections.values():
+            connection.reconnect()
+
+        default = cls._connections.get(cls.DEFAULT_ALIAS)
+        if default:
+            cls.client, cls.database = default.client, default.database
+        cls.pid = os.getpid()
+
+
+class _NamedConnection(object):
+    """The client and database of one Connection alias, along with the
+    settings needed to connect again.
+
+    """
+    def __init__(self, backend, client, database, database_name, kwargs):
+        self.backend = backend
+        self.client = client
+        self.database = database
+        self.database_name = database_name
+        self.kwargs = kwargs
+
+    def reconnect(self):
+        self.client, self.database = self.backend.reconnect(
+            self.client, self.database_name, **self.kwargs)
 
 
 class EmbeddedList(collections.MutableSequence):
@@ -34,35 +121,126 @@ class EmbeddedList(collections.MutableSequence):
     EmbeddedDocuments can be added to the list. Supports all the of standard
     list functions, excluding sorting.
 
+    *key* names a field of the embedded documents to index the items by,
+    for *get_by_key*, *contains_key* and faster *find*. The index is built
+    on first use and kept up to date as items are added and removed; the
+    key of an item should not be changed while it is in the list.
+
+    *page_size* is set for the lists of lazy ListFields. When the owning
+    Document was read with only the first *page_size* items, the next items
+    are read a page at a time as the list is iterated or indexed, and the
+    length is counted by the server. Changing the list, comparing it or
+    looking items up with *find* or by key reads all the remaining items
+    first.
+
     """
-    def __init__(self, name, type_):
+    def __init__(self, name, type_, key=None, page_size=None):
         self.list_ = list()
         self.name = name
+        self.key = key
+        self.page_size = page_size
         self._owner = None
         self._type = type_
+        self._index = None
+        self._partial = None
+        self._size = None
+
+        self._check_item_type(type_)
+        if key is not None and key not in type_._field_descriptors:
+            raise tavi.errors.TaviError(
+                "%s has no field named '%s'" % (type_.__name__, key))
 
-        if not isinstance(self._type(), tavi.documents.EmbeddedDocument):
+    @staticmethod
+    def _check_item_type(type_):
+        """Raises a TaviTypeError if *type_* is not a subclass of
+        tavi.document.EmbeddedDocument.
+
+        """
+        if not (isinstance(type_, type) and
+                issubclass(type_, tavi.documents.EmbeddedDocument)):
             raise tavi.errors.TaviTypeError(
                 "tavi.EmbeddedList only accepts "
                 "tavi.document.EmbeddedDocument objects"
             )
 
     def __len__(self):
+        if self._has_more():
+            if self._size is None:
+                self._size = type(self.owner)._list_size(
+                    self.owner.bson_id, self.name)
+            return self._size
         return len(self.list_)
 
     def __getitem__(self, index):
+        if isinstance(index, slice) or index < 0:
+            self._read_all()
+        else:
+            while index >= len(self.list_) and self._has_more():
+                self._read_page()
         return self.list_[index]
 
+    def __iter__(self):
+        if self.page_size is None:
+            return iter(self.list_)
+        return self._iter_pages()
+
+    def _iter_pages(self):
+        position = 0
+        while True:
+            while position < len(self.list_):
+                yield self.list_[position]
+                position += 1
+            if not self._has_more():
+                return
+            self._read_page()
+
+    def _has_more(self):
+        """Indicates if the list holds the first page of the items of a
+        Document read from Mongo, and more items may follow.
+
+        """
+        if self._partial is None:
+            owner = self.owner
+            self._partial = bool(
+                self.page_size and owner is not None and
+                owner.__dict__.get("_paged") and
+                len(self.list_) >= self.page_size
+            )
+        return self._partial
+
+    def _read_page(self):
+        items = type(self.owner)._list_page(
+            self.owner.bson_id, self.name, len(self.list_), self.page_size)
+        self._extend([self._type._trusted(item) for item in items])
+        if len(items) < self.page_size:
+            self._partial, self._size = False, None
+
+    def _read_all(self):
+        while self._has_more():
+            self._read_page()
+
     def __delitem__(self, index):
+        self._read_all()
+        if self._index is not None:
+            if isinstance(index, slice):
+                self._index = None
+            else:
+                self._unindex(self.list_[index])
         del self.list_[index]
 
     def __repr__(self):
         return str(self.list_)
 
     def __setitem__(self, index, value):
+        self._read_all()
         self.list_[index] = value
+        self._index = None
+
+    def __contains__(self, value):
+        return self.find(value) is not None
 
     def __eq__(self, other):
+        self._read_all()
         return self.list_ == other
 
     @property
@@ -84,12 +262,68 @@ class EmbeddedList(collections.MutableSequence):
 
         self._owner = value
 
+    def _key_index(self):
+        """Returns the index of the items, a dictionary of key to the list
+        of items with that key, in list order.
+
+        """
+        self._read_all()
+        if self._index is None:
+            index = {}
+            for item in self.list_:
+                index.setdefault(getattr(item, self.key), []).append(item)
+            self._index = index
+        return self._index
+
+    def _unindex(self, item):
+        items = self._index.get(getattr(item, self.key), [])
+        for position, indexed in enumerate(items):
+            if indexed is item:
+                del items[position]
+                break
+        else:
+            self._index = None    # the key was changed in place
+
+    def _index_inserted(self, value):
+        items = self._index.setdefault(getattr(value, self.key), [])
+        if not items or self.list_[-1] is value:
+            items.append(value)
+        else:
+            self._index = None    # rebuilt to keep the items in list order
+
+    def get_by_key(self, key, default=None):
+        """Returns the first item whose key field is *key*, or *default*.
+        Raises a TaviError if the list has no key field.
+
+        """
+        if self.key is None:
+            raise tavi.errors.TaviError(
+                "tavi.EmbeddedList %s has no key field" % self.name)
+
+        items = self._key_index().get(key)
+        if items and getattr(items[0], self.key) != key:
+            self._index = None    # the key was changed in place
+            items = self._key_index().get(key)
+        return items[0] if items else default
+
+    def contains_key(self, key):
+        """Indicates if an item has *key* as the value of its key field.
+        Raises a TaviError if the list has no key field.
+
+        """
+        return self.get_by_key(key) is not None
+
     def find(self, item):
         """Finds *item* in the list and returns it. If not found, returns
-        None.
+        None. Only the items with the same key are compared if the list has
+        a key field.
 
         """
-        return next((i for i in self.list_ if i == item), None)
+        self._read_all()
+        items = self.list_
+        if self.key is not None and isinstance(item, self._type):
+            items = self._key_index().get(getattr(item, self.key), ())
+        return next((i for i in items if i == item), None)
 
     def insert(self, index, value):
         """Adds *value* to list at *index*. Ensures that *value* is a
@@ -98,17 +332,63 @@ class EmbeddedList(collections.MutableSequence):
         valid it adds the errors to the list owner.
 
         """
+        self._check_type(value)
+        self._read_all()
+
+        if value.valid:
+            value.owner = self.owner
+            self.list_.insert(index, value)
+            if self._index is not None:
+                self._index_inserted(value)
+        else:
+            for msg in value.errors.full_messages:
+                self.owner.errors.add("%s Error:" % self.name, msg)
+
+    def _check_type(self, value):
         if not isinstance(value, self._type):
             raise tavi.errors.TaviTypeError(
                 "This tavi.EmbeddedList only accepts items of type %s (tried "
                 "to add an object of type %s)" % (
-                    self._type().__class__.__name__, value.__class__.__name__
+                    self._type.__name__, value.__class__.__name__
                 )
             )
 
-        if value.valid:
+    def extend(self, values):
+        """Adds *values* to the end of the list. Checks the type of all the
+        items before adding any of them, then validates each item once and
+        adds the valid ones. The errors of the invalid items are added to
+        the list owner, if any, with the index of the item in *values*.
+
+        """
+        values = list(values)
+        for value in values:
+            self._check_type(value)
+        self._read_all()
+
+        valid = []
+        for position, value in enumerate(values):
+            if value.valid:
+                valid.append(value)
+            elif self.owner is not None:
+                for msg in value.errors.full_messages:
+                    self.owner.errors.add(
+                        "%s[%s] Error:" % (self.name, position), msg)
+        self._extend(valid)
+
+    def extend_trusted(self, values):
+        """Adds *values*, items of the list type that were valid when they
+        were stored, to the end of the list without checking or validating
+        them. Used when loading Documents from Mongo.
+
+        """
+        self._extend(list(values))
+
+    def _extend(self, values):
+        for value in values:
             value.owner = self.owner
-            self.list_.insert(index, value)
-        else:
-            for msg in value.errors.full_messages:
-                self.owner.errors.add("%s Error:" % self.name, msg)
+        self.list_.extend(values)
+
+        if self._index is not None:
+            for value in values:
+                self._index.setdefault(
+                    getattr(value, self.key), []).append(value)
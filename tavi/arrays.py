@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""Provides packed storage for arrays of numbers.
+
+A tavi.fields.TypedArrayField holds numbers of a single *dtype* and stores
+them in Mongo as one BSON binary value, the little-endian bytes of the
+numbers, instead of a BSON array with an element per number. The
+supported dtypes are:
+
+    int8, uint8, int16, uint16, int32, uint32, int64, uint64, float32,
+    float64
+
+Arrays are NumPy arrays when NumPy is installed and *array.array*
+otherwise. The NumPy arrays of values read from Mongo are read only views
+of the binary value, which are not copied; assign a new array to change
+them. Without NumPy, the 64-bit integer dtypes are only supported where
+*array.array* has a 64-bit integer type code.
+
+"""
+import array
+import sys
+from bson.binary import Binary
+from tavi.errors import TaviError
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+DTYPES = (
+    "int8", "uint8", "int16", "uint16", "int32", "uint32", "int64", "uint64",
+    "float32", "float64"
+)
+
+# The item size of each dtype and the array.array type codes that may hold
+# it, in order of preference; the first one of the right size is used.
+_CANDIDATES = {
+    "int8": (1, "b"),
+    "uint8": (1, "B"),
+    "int16": (2, "h"),
+    "uint16": (2, "H"),
+    "int32": (4, "il"),
+    "uint32": (4, "IL"),
+    "int64": (8, "l"),
+    "uint64": (8, "L"),
+    "float32": (4, "f"),
+    "float64": (8, "d")
+}
+
+
+def _typecodes():
+    typecodes = {}
+    for dtype, (itemsize, candidates) in _CANDIDATES.items():
+        for typecode in candidates:
+            if itemsize == array.array(typecode).itemsize:
+                typecodes[dtype] = typecode
+                break
+    return typecodes
+
+
+_TYPECODES = _typecodes()
+
+_BIG_ENDIAN = "big" == sys.byteorder
+
+
+def check_dtype(dtype):
+    """Raises a TaviError if arrays of *dtype* are not supported."""
+    if dtype not in DTYPES or (numpy is None and dtype not in _TYPECODES):
+        raise TaviError("unsupported array dtype '%s'" % dtype)
+
+
+def is_array(value, dtype):
+    """Indicates if *value* is an array of *dtype*."""
+    if isinstance(value, array.array):
+        return value.typecode == _TYPECODES.get(dtype)
+    return numpy is not None and \
+        isinstance(value, numpy.ndarray) and \
+        1 == value.ndim and dtype == value.dtype.name
+
+
+def load(value, dtype):
+    """Returns *value*, binary data made by *pack* or a sequence of
+    numbers, as an array of *dtype*. Arrays of *dtype* are returned as they
+    are. Raises a TypeError, a ValueError or an OverflowError if *value*
+    holds other kinds of numbers, such as floats for an integer dtype, or
+    integers out of the range of *dtype*. Numbers loaded into a float
+    dtype are rounded to its precision, such as float64 or large integers
+    to float32.
+
+    """
+    if is_array(value, dtype):
+        return value
+    if isinstance(value, bytes):
+        return unpack(value, dtype)
+
+    if numpy is None:
+        return array.array(_TYPECODES[dtype], value)
+
+    values = numpy.asarray(value)
+    if 0 == values.size:
+        return numpy.empty(0, dtype)
+    integers = values.dtype.kind in "iu" and not dtype.startswith("float")
+    if 1 != values.ndim or not (
+            integers or numpy.can_cast(values.dtype, dtype, "same_kind")):
+        raise TypeError("expected a sequence of %s numbers" % dtype)
+
+    # Integers that do not fit would wrap around when cast
+    if integers:
+        limits = numpy.iinfo(dtype)
+        low, high = bounds(values)
+        if low < limits.min or high > limits.max:
+            raise OverflowError("%s out of range for %s" % (
+                low if low < limits.min else high, dtype))
+    return values.astype(dtype)
+
+
+def pack(values):
+    """Returns the little-endian bytes of the array *values* as a BSON
+    binary value.
+
+    """
+    if isinstance(values, array.array):
+        if _BIG_ENDIAN:
+            values = array.array(values.typecode, values)
+            values.byteswap()
+        return Binary(values.tostring())
+
+    little_endian = values.dtype.newbyteorder("<")
+    return Binary(values.astype(little_endian, copy=False).tobytes())
+
+
+def unpack(data, dtype):
+    """Returns the array of *dtype* packed in *data*. Raises a ValueError if
+    the length of *data* is not a multiple of the size of *dtype*.
+
+    """
+    if numpy is not None:
+        return numpy.frombuffer(data, numpy.dtype(dtype).newbyteorder("<"))
+
+    values = array.array(_TYPECODES[dtype])
+    values.fromstring(bytes(data))
+    if _BIG_ENDIAN:
+        values.byteswap()
+    return values
+
+
+def bounds(values):
+    """Returns the smallest and largest numbers of the non-empty array
+    *values*, each found in one pass over the array.
+
+    """
+    if isinstance(values, array.array):
+        return min(values), max(values)
+    return values.min(), values.max()
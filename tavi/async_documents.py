@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""Provides asyncio support for Documents.
+
+AsyncDocument methods return asyncio Futures instead of blocking the event
+loop on pymongo I/O. The blocking work runs in an executor, so an
+AsyncDocument is validated, stamped and saved exactly like a Document::
+
+    class User(AsyncDocument):
+        email = fields.StringField("email", required=True, unique=True)
+
+    @trollius.coroutine
+    def activate(email):
+        saved = yield From(User(email=email).asave())
+
+        results = User.afind({"active": True})
+        while (yield From(results.fetch_next)):
+            user = results.next_object()
+
+The trollius port of asyncio is used on Python 2; coroutines yield *From*
+the Futures.
+
+"""
+import functools
+import itertools
+import logging
+from tavi.documents import Document
+from tavi.errors import TaviError
+
+try:
+    import asyncio
+except ImportError:
+    try:
+        import trollius as asyncio
+    except ImportError:
+        asyncio = None
+
+try:
+    StopAsyncIteration = StopAsyncIteration
+except NameError:
+    class StopAsyncIteration(Exception):
+        """Raised by AsyncResults.__anext__ when there are no more
+        Documents.
+
+        """
+        pass
+
+logger = logging.getLogger(__name__)
+
+
+def _loop():
+    if asyncio is None:
+        raise TaviError(
+            "AsyncDocument needs asyncio (or trollius on Python 2)")
+    return asyncio.get_event_loop()
+
+
+def _future(loop):
+    create_future = getattr(loop, "create_future", None)
+    if create_future:
+        return create_future()
+    return asyncio.Future(loop=loop)
+
+
+def _chain(source, target, transform):
+    """Resolves the *target* Future with the *transform* of the result of the
+    *source* Future, or with its exception.
+
+    """
+    def done(source):
+        if target.cancelled():
+            return
+
+        if source.cancelled():
+            target.cancel()
+            return
+
+        error = source.exception()
+        if error is not None:
+            target.set_exception(error)
+            return
+
+        try:
+            target.set_result(transform(source.result()))
+        except Exception as error:
+            target.set_exception(error)
+
+    source.add_done_callback(done)
+    return target
+
+
+class AsyncResults(object):
+    """An asynchronous iterator over the Documents found by *afind*. Results
+    are fetched and hydrated in batches of *batch_size* in the executor.
+    *find* returns the pymongo cursor; it is also called in the executor,
+    as resolving the collection may create indexes on first use.
+
+    Supports *async for* and, like Motor's cursors, *fetch_next* and
+    *next_object* for use with trollius on Python 2::
+
+        results = User.afind()
+        while (yield From(results.fetch_next)):
+            user = results.next_object()
+
+    """
+    def __init__(self, document_class, find, batch_size=100):
+        self._document_class = document_class
+        self._find = find
+        self._cursor = None
+        self._batch_size = batch_size
+        self._buffer = []
+        self._exhausted = False
+
+    def __aiter__(self):
+        return self
+
+    def __anext__(self):
+        def next_document(found):
+            if not found:
+                raise StopAsyncIteration()
+            return self.next_object()
+
+        return _chain(self.fetch_next, _future(_loop()), next_document)
+
+    def _fetch(self, limit=None):
+        if self._cursor is None:
+            self._cursor = self._find()
+        results = list(itertools.islice(self._cursor, limit))
+        return [self._document_class._from_mongo(r) for r in results]
+
+    @property
+    def fetch_next(self):
+        """A Future that resolves to True if there is another Document, which
+        can be taken with *next_object*, or False if there are no more.
+
+        """
+        loop = _loop()
+        if self._buffer or self._exhausted:
+            future = _future(loop)
+            future.set_result(bool(self._buffer))
+            return future
+
+        def buffer(batch):
+            self._buffer.extend(batch)
+            self._exhausted = len(batch) < self._batch_size
+            return bool(self._buffer)
+
+        fetched = loop.run_in_executor(
+            self._document_class.__executor__, self._fetch, self._batch_size)
+        return _chain(fetched, _future(loop), buffer)
+
+    def next_object(self):
+        """Returns the next Document fetched by *fetch_next*, or None."""
+        return self._buffer.pop(0) if self._buffer else None
+
+    def to_list(self):
+        """Returns a Future that resolves to a list of all the remaining
+        Documents.
+
+        """
+        loop = _loop()
+        fetched = loop.run_in_executor(
+            self._document_class.__executor__, self._fetch)
+
+        def remaining(batch):
+            documents, self._buffer = self._buffer + batch, []
+            self._exhausted = True
+            return documents
+
+        return _chain(fetched, _future(loop), remaining)
+
+
+class AsyncDocument(Document):
+    """A Document with asyncio counterparts of its persistence methods. The
+    Futures they return resolve to the same results as the blocking methods.
+
+    The blocking calls are run in *__executor__*; None uses the event loop's
+    default executor.
+
+    """
+    __executor__ = None
+
+    @classmethod
+    def _run(cls, function, *args, **kwargs):
+        return _loop().run_in_executor(
+            cls.__executor__, functools.partial(function, *args, **kwargs))
+
+    def asave(self, w=1, wtimeout=0, j=False):
+        """Saves the Document. Returns a Future that resolves to the result of
+        *save*: False if the Document was invalid or violated a unique index,
+        in which case *errors* is populated.
+
+        """
+        return self._run(self.save, w=w, wtimeout=wtimeout, j=j)
+
+    def adelete(self):
+        """Removes the Document from the collection. Returns a Future."""
+        return self._run(self.delete)
+
+    @classmethod
+    def acount(cls, *args, **kwargs):
+        """Returns a Future that resolves to the number of documents in the
+        collection. Supports the same arguments as *count*.
+
+        """
+        return cls._run(cls.count, *args, **kwargs)
+
+    @classmethod
+    def afind(cls, *args, **kwargs):
+        """Returns an AsyncResults over the Documents that meet criteria.
+        Supports the same arguments as *find*, plus *batch_size*, the number
+        of Documents fetched from the executor at a time.
+
+        """
+        batch_size = kwargs.pop("batch_size", 100)
+
+        def find():
+            collection = cls._collection_for_read(kwargs)
+            logger.info("%s AFIND %s, %s", cls.__name__, args, kwargs)
+            return collection.find(*args, **kwargs)
+        return AsyncResults(cls, find, batch_size)
+
+    @classmethod
+    def afind_by_id(cls, id_):
+        """Returns a Future that resolves to the Document that matches *id_*
+        or None if it cannot be found.
+
+        """
+        return cls._run(cls.find_by_id, id_)
+
+    @classmethod
+    def afind_one(cls, spec_or_id=None, *args, **kwargs):
+        """Returns a Future that resolves to one Document that meets criteria
+        or None.
+
+        """
+        return cls._run(cls.find_one, spec_or_id, *args, **kwargs)
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+"""Provides the storage backends that can be passed to Connection.setup."""
+from tavi.backends.memory import MemoryBackend
+from tavi.backends.mongo import MongoBackend
+from tavi.base.backends import BaseBackend
+from tavi.errors import TaviError
+
+_registry = {
+    "memory": MemoryBackend,
+    "mongo": MongoBackend
+}
+
+
+def get_backend(backend):
+    """Returns a backend for *backend*, which is either a BaseBackend
+    instance or the name of a registered backend ("mongo" or "memory").
+
+    """
+    if isinstance(backend, BaseBackend):
+        return backend
+
+    if backend not in _registry:
+        raise TaviError(
+            "Unknown backend '%s' (expected one of: %s)" % (
+                backend, ", ".join(sorted(_registry))))
+
+    return _registry[backend]()
+
+
+def register_backend(name, backend_class):
+    """Makes *backend_class* available to Connection.setup as *name*."""
+    _registry[name] = backend_class
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""Provides the aggregation pipeline of the memory backend.
+
+Supports the $match, $project, $addFields (and its alias $set), $group,
+$sort, $skip, $limit, $unwind and $count stages. Expressions may be field
+paths ("$field.path"), literals, {"$literal": ...}, {"$size": ...},
+{"$ifNull": [...]} and sub-documents of expressions; $group supports the
+$sum, $avg, $min, $max, $first, $last, $push and $addToSet accumulators.
+
+"""
+import copy
+from pymongo.errors import OperationFailure
+from tavi.backends.memory import (
+    _freeze, _get_path_value, _set_path, _unset_path, matches, sort_key)
+
+
+def evaluate(document, expression):
+    """Returns the value of *expression* for *document*."""
+    if isinstance(expression, basestring) and expression.startswith("$"):
+        return _get_path_value(document, expression[1:])
+
+    if isinstance(expression, dict):
+        if "$literal" in expression:
+            return expression["$literal"]
+        if "$size" in expression:
+            return _size(evaluate(document, expression["$size"]))
+        if "$ifNull" in expression:
+            found, replacement = expression["$ifNull"]
+            found = evaluate(document, found)
+            return evaluate(document, replacement) if found is None else found
+        if any(key.startswith("$") for key in expression):
+            raise OperationFailure(
+                "unsupported expression operator in %r" % (expression,))
+        return dict(
+            (key, evaluate(document, value))
+            for key, value in expression.items())
+
+    if isinstance(expression, list):
+        return [evaluate(document, value) for value in expression]
+
+    return expression
+
+
+def _size(value):
+    if not isinstance(value, list):
+        raise OperationFailure(
+            "The argument to $size must be an array, not %r" % (value,))
+    return len(value)
+
+
+def _match(documents, spec):
+    return (document for document in documents if matches(document, spec))
+
+
+def _project(documents, projection):
+    projection = dict(projection)
+    include_id = projection.pop("_id", True)
+    excluded = [k for k, v in projection.items() if v in (0, False)]
+
+    for document in documents:
+        if excluded:
+            result = copy.deepcopy(document)
+            for path in excluded:
+                _unset_path(result, path)
+        else:
+            result = {}
+            for path, value in projection.items():
+                if value in (1, True):
+                    found = _get_path_value(document, path)
+                    if found is not None:
+                        _set_path(result, path, found)
+                else:
+                    _set_path(result, path, evaluate(document, value))
+
+        if include_id in (1, True):
+            if "_id" in document:
+                result["_id"] = document["_id"]
+        elif include_id in (0, False):
+            result.pop("_id", None)
+        else:
+            result["_id"] = evaluate(document, include_id)
+        yield result
+
+
+def _add_fields(documents, spec):
+    for document in documents:
+        result = copy.deepcopy(document)
+        for path, value in spec.items():
+            _set_path(result, path, evaluate(document, value))
+        yield result
+
+
+def _sum(values):
+    return sum(v for v in values if isinstance(v, (int, long, float)))
+
+
+def _avg(values):
+    numbers = [v for v in values if isinstance(v, (int, long, float))]
+    return float(sum(numbers)) / len(numbers) if numbers else None
+
+
+def _add_to_set(values):
+    result = []
+    for value in values:
+        if value not in result:
+            result.append(value)
+    return result
+
+
+_ACCUMULATORS = {
+    "$sum": _sum,
+    "$avg": _avg,
+    "$min": lambda values: min(
+        [v for v in values if v is not None] or [None], key=sort_key),
+    "$max": lambda values: max(
+        [v for v in values if v is not None] or [None], key=sort_key),
+    "$first": lambda values: values[0] if values else None,
+    "$last": lambda values: values[-1] if values else None,
+    "$push": list,
+    "$addToSet": _add_to_set
+}
+
+
+def _group(documents, spec):
+    spec = dict(spec)
+    key_expression = spec.pop("_id")
+
+    groups, keys = {}, []
+    for document in documents:
+        key = evaluate(document, key_expression)
+        frozen = _freeze(key)
+        if frozen not in groups:
+            groups[frozen] = []
+            keys.append((frozen, key))
+        groups[frozen].append(document)
+
+    for frozen, key in keys:
+        result = {"_id": key}
+        for name, accumulator in spec.items():
+            (operator, expression), = accumulator.items()
+            if operator not in _ACCUMULATORS:
+                raise OperationFailure(
+                    "unknown group operator '%s'" % operator)
+
+            values = [evaluate(d, expression) for d in groups[frozen]]
+            result[name] = _ACCUMULATORS[operator](values)
+        yield result
+
+
+def _sort(documents, spec):
+    documents = list(documents)
+    for key, direction in reversed(list(spec.items())):
+        documents.sort(
+            key=lambda d: sort_key(_get_path_value(d, key)),
+            reverse=direction < 0
+        )
+    return documents
+
+
+def _skip(documents, count):
+    for index, document in enumerate(documents):
+        if index >= count:
+            yield document
+
+
+def _limit(documents, count):
+    for index, document in enumerate(documents):
+        if index >= count:
+            return
+        yield document
+
+
+def _unwind(documents, path):
+    if isinstance(path, dict):
+        path = path["path"]
+    path = path[1:]
+
+    for document in documents:
+        values = _get_path_value(document, path)
+        if not isinstance(values, list):
+            if values is not None:
+                yield document
+            continue
+
+        for value in values:
+            result = copy.deepcopy(document)
+            _set_path(result, path, value)
+            yield result
+
+
+def _count(documents, name):
+    yield {name: sum(1 for _ in documents)}
+
+
+_STAGES = {
+    "$match": _match,
+    "$project": _project,
+    "$addFields": _add_fields,
+    "$set": _add_fields,
+    "$group": _group,
+    "$sort": _sort,
+    "$skip": _skip,
+    "$limit": _limit,
+    "$unwind": _unwind,
+    "$count": _count
+}
+
+
+def aggregate(documents, pipeline):
+    """Runs the aggregation *pipeline* over *documents* and returns an
+    iterator over the results.
+
+    """
+    for stage in pipeline:
+        (name, spec), = stage.items()
+        if name not in _STAGES:
+            raise OperationFailure(
+                "unsupported aggregation stage '%s'" % name)
+        documents = _STAGES[name](documents, spec)
+    return iter(documents)
@@ -0,0 +1,1005 @@
+# -*- coding: utf-8 -*-
+"""Provides an in-memory storage backend.
+
+The memory backend keeps every collection in the current process. It
+implements the parts of the pymongo API that tavi uses, including the query
+and update operators, sorting, unique, sparse, partial and TTL indexes and
+the same *DuplicateKeyError* that MongoDB raises on unique index violations.
+It is meant for test suites, ephemeral workers and tiny, hot collections
+that do not need to be shared between processes.
+
+Records are stored as encoded BSON, so values go through the same
+conversions (and key checks) they would on their way to a real server.
+
+"""
+import collections
+import copy
+import datetime
+import re
+import threading
+from bson import BSON, ObjectId
+from pymongo import ASCENDING
+from pymongo.read_preferences import Primary
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from tavi.base.backends import BaseBackend
+
+_TYPE_ORDER = [
+    (type(None), 1),
+    ((int, long, float), 2),
+    (basestring, 3),
+    (dict, 4),
+    (list, 5),
+    (ObjectId, 7),
+    (bool, 8),
+    (datetime.datetime, 9)
+]
+
+
+def _lookup(value, parts):
+    """Returns the values found at the dotted path *parts* in *value*,
+    descending into arrays the same way MongoDB does.
+
+    """
+    if not parts:
+        return [value]
+
+    key, rest = parts[0], parts[1:]
+    if isinstance(value, dict):
+        return _lookup(value[key], rest) if key in value else []
+
+    if isinstance(value, list):
+        if key.isdigit():
+            index = int(key)
+            return _lookup(value[index], rest) if index < len(value) else []
+        found = []
+        for item in value:
+            if isinstance(item, dict):
+                found.extend(_lookup(item, parts))
+        return found
+
+    return []
+
+
+def get_path(document, path):
+    """Returns the values at dotted *path* in *document*."""
+    return _lookup(document, path.split("."))
+
+
+def _expand(values):
+    """Adds the elements of any arrays in *values* to *values*."""
+    expanded = []
+    for value in values:
+        expanded.append(value)
+        if isinstance(value, list):
+            expanded.extend(value)
+    return expanded
+
+
+def _type_rank(value):
+    for types, rank in _TYPE_ORDER:
+        if isinstance(value, types) and not (
+                2 == rank and isinstance(value, bool)):
+            return rank
+    return 10
+
+
+def sort_key(value):
+    """Returns a key that orders values the way MongoDB does, first by type
+    and then by value.
+
+    """
+    if isinstance(value, dict):
+        return (4, tuple((k, sort_key(v)) for k, v in value.items()))
+    if isinstance(value, list):
+        return (5, tuple(sort_key(v) for v in value))
+    return (_type_rank(value), value)
+
+
+def _is_regex(value):
+    return hasattr(value, "pattern") and hasattr(value, "search")
+
+
+def _equal(value, target):
+    if _is_regex(target):
+        return isinstance(value, basestring) and \
+            target.search(value) is not None
+    if isinstance(value, bool) != isinstance(target, bool):
+        return False
+    return value == target
+
+
+def _equals(values, target):
+    if target is None and not values:
+        return True
+    return any(_equal(value, target) for value in _expand(values))
+
+
+def _compare(values, target, test):
+    rank = _type_rank(target)
+    return any(
+        _type_rank(value) == rank and test(value, target)
+        for value in _expand(values)
+    )
+
+
+def _regex(values, pattern, condition):
+    if not _is_regex(pattern):
+        flags = 0
+        for option in condition.get("$options", ""):
+            flags |= {"i": re.I, "m": re.M, "s": re.S, "x": re.X}[option]
+        pattern = re.compile(pattern, flags)
+    return _equals(values, pattern)
+
+
+def _elem_match(values, condition):
+    for value in values:
+        if not isinstance(value, list):
+            continue
+        for item in value:
+            if _is_operator_condition(condition):
+                if _match_condition([item], condition):
+                    return True
+            elif isinstance(item, dict) and matches(item, condition):
+                return True
+    return False
+
+
+_OPERATORS = {
+    "$eq": lambda values, arg, cond: _equals(values, arg),
+    "$ne": lambda values, arg, cond: not _equals(values, arg),
+    "$gt": lambda values, arg, cond: _compare(values, arg, lambda a, b: a > b),
+    "$gte": lambda values, arg, cond: _compare(
+        values, arg, lambda a, b: a >= b),
+    "$lt": lambda values, arg, cond: _compare(values, arg, lambda a, b: a < b),
+    "$lte": lambda values, arg, cond: _compare(
+        values, arg, lambda a, b: a <= b),
+    "$in": lambda values, arg, cond: any(_equals(values, t) for t in arg),
+    "$nin": lambda values, arg, cond: not any(
+        _equals(values, t) for t in arg),
+    "$all": lambda values, arg, cond: all(_equals(values, t) for t in arg),
+    "$exists": lambda values, arg, cond: bool(values) == bool(arg),
+    "$size": lambda values, arg, cond: any(
+        isinstance(v, list) and len(v) == arg for v in values),
+    "$regex": _regex,
+    "$options": lambda values, arg, cond: True,
+    "$elemMatch": lambda values, arg, cond: _elem_match(values, arg),
+    "$not": lambda values, arg, cond: not _match_condition(values, arg)
+}
+
+
+def _is_operator_condition(condition):
+    return isinstance(condition, dict) and len(condition) > 0 and \
+        all(k.startswith("$") for k in condition)
+
+
+def _match_condition(values, condition):
+    if _is_regex(condition):
+        return _equals(values, condition)
+
+    if not _is_operator_condition(condition):
+        return _equals(values, condition)
+
+    for operator, arg in condition.items():
+        if operator not in _OPERATORS:
+            raise OperationFailure("Unsupported query operator: %s" % operator)
+        if not _OPERATORS[operator](values, arg, condition):
+            return False
+    return True
+
+
+def matches(document, spec):
+    """Indicates if *document* matches the query *spec*."""
+    for key, condition in (spec or {}).items():
+        if "$and" == key:
+            result = all(matches(document, s) for s in condition)
+        elif "$or" == key:
+            result = any(matches(document, s) for s in condition)
+        elif "$nor" == key:
+            result = not any(matches(document, s) for s in condition)
+        elif key.startswith("$"):
+            raise OperationFailure("Unsupported query operator: %s" % key)
+        else:
+            result = _match_condition(get_path(document, key), condition)
+
+        if not result:
+            return False
+    return True
+
+
+def _set_path(document, path, value):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        document = document.setdefault(part, {})
+    document[parts[-1]] = value
+
+
+def _unset_path(document, path):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        document = document.get(part)
+        if not isinstance(document, dict):
+            return
+    document.pop(parts[-1], None)
+
+
+def _get_path_value(document, path, default=None):
+    values = get_path(document, path)
+    return values[0] if values else default
+
+
+def _push(document, path, value):
+    items = list(_get_path_value(document, path, []))
+    if isinstance(value, dict) and "$each" in value:
+        items.extend(value["$each"])
+    else:
+        items.append(value)
+    _set_path(document, path, items)
+
+
+def _add_to_set(document, path, value):
+    items = list(_get_path_value(document, path, []))
+    new = value["$each"] if isinstance(value, dict) and "$each" in value \
+        else [value]
+    items.extend(v for v in new if v not in items)
+    _set_path(document, path, items)
+
+
+def _pull(document, path, condition):
+    items = _get_path_value(document, path, [])
+    _set_path(document, path, [
+        item for item in items if not (
+            matches(item, condition)
+            if isinstance(item, dict) and isinstance(condition, dict)
+            and not _is_operator_condition(condition)
+            else _match_condition([item], condition)
+        )
+    ])
+
+
+_UPDATE_OPERATORS = {
+    "$set": _set_path,
+    "$unset": lambda document, path, value: _unset_path(document, path),
+    "$inc": lambda document, path, value: _set_path(
+        document, path, _get_path_value(document, path, 0) + value),
+    "$push": _push,
+    "$addToSet": _add_to_set,
+    "$pull": _pull
+}
+
+
+def apply_update(document, update):
+    """Applies *update* to *document* in place. *update* is either a
+    replacement document or a document of update operators.
+
+    """
+    if not any(k.startswith("$") for k in update):
+        _id = document.get("_id")
+        document.clear()
+        document.update(update)
+        if _id is not None:
+            document["_id"] = _id
+        return
+
+    for operator, changes in update.items():
+        if operator not in _UPDATE_OPERATORS:
+            raise OperationFailure(
+                "Unsupported update operator: %s" % operator)
+        for path, value in changes.items():
+            _UPDATE_OPERATORS[operator](document, path, value)
+
+
+def _freeze(value):
+    """Returns a hashable version of *value*."""
+    if isinstance(value, dict):
+        return tuple((k, _freeze(v)) for k, v in sorted(value.items()))
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _projection(fields):
+    if fields is None:
+        return None
+    if not isinstance(fields, dict):
+        return dict((field, 1) for field in fields)
+    return fields
+
+
+def _is_slice(value):
+    return isinstance(value, dict) and "$slice" in value
+
+
+def _slice(values, spec):
+    """Returns the items of the array *values* selected by the $slice
+    projection *spec*: the first (or, if negative, last) *n* items, or
+    [*skip*, *limit*].
+
+    """
+    if not isinstance(values, list):
+        return values
+    if isinstance(spec, list):
+        skip, limit = spec
+        if limit <= 0:
+            raise OperationFailure("$slice limit must be positive")
+        start = max(len(values) + skip, 0) if skip < 0 else skip
+        return values[start:start + limit]
+    return values[spec:] if spec < 0 else values[:spec]
+
+
+def _include(document, paths):
+    result = {}
+    for path in paths:
+        values = get_path(document, path)
+        if values and "_id" != path:
+            _set_path(result, path, values[0])
+    return result
+
+
+def _exclude(document, fields):
+    for path, value in fields.items():
+        if not value:
+            _unset_path(document, path)
+    return document
+
+
+def project(document, fields):
+    """Returns the parts of *document* selected by the *fields* projection.
+    Arrays projected with {"$slice": ...} are included in inclusion
+    projections and do not exclude the other fields on their own.
+
+    """
+    fields = _projection(fields)
+    if not fields:
+        return document
+
+    include_id = fields.get("_id", 1)
+    slices = dict((k, v["$slice"]) for k, v in fields.items() if _is_slice(v))
+    inclusions = [
+        k for k, v in fields.items()
+        if v and k not in slices and ("_id" != k or slices)
+    ]
+
+    result = _include(document, inclusions + slices.keys()) \
+        if inclusions else _exclude(document, fields)
+
+    for path, spec in slices.items():
+        values = get_path(result, path)
+        if values:
+            _set_path(result, path, _slice(values[0], spec))
+
+    if include_id and "_id" in document:
+        result["_id"] = document["_id"]
+    elif not include_id:
+        result.pop("_id", None)
+    return result
+
+
+def _sort_spec(key_or_list, direction=None):
+    if isinstance(key_or_list, basestring):
+        return [(key_or_list, direction or ASCENDING)]
+    return list(key_or_list)
+
+
+class _Index(object):
+    """A secondary index. Unique indexes keep a map of key to document id,
+    which is used both to enforce uniqueness and to look up documents by
+    equality on the indexed fields.
+
+    """
+    def __init__(self, name, key, options):
+        self.name = name
+        self.key = key
+        self.options = options
+        self.unique = bool(options.get("unique"))
+        self.sparse = bool(options.get("sparse"))
+        self.partial = options.get("partialFilterExpression")
+        self.expire_after = options.get("expireAfterSeconds")
+        self.multikey = False
+        self.entries = {}
+
+    @property
+    def fields(self):
+        return [field for field, _ in self.key]
+
+    def info(self):
+        info = dict(self.options)
+        info["key"] = list(self.key)
+        return info
+
+    def key_for(self, document):
+        """Returns the index key for *document* or None if *document* is
+        not indexed.
+
+        """
+        if self.partial is not None and not matches(document, self.partial):
+            return None
+
+        values = [get_path(document, field) for field in self.fields]
+        if self.sparse and not any(values):
+            return None
+
+        if any(isinstance(v, list) for found in values for v in found):
+            self.multikey = True
+
+        return tuple(_freeze(found[0] if found else None) for found in values)
+
+    def lookup(self, spec):
+        """Returns the id of the only document that can match *spec*, None
+        if none can, or raises KeyError if the index can not answer.
+
+        """
+        if self.multikey or not self.unique or self.partial is not None:
+            raise KeyError(self.name)
+
+        key = []
+        for field in self.fields:
+            value = spec[field]
+            if value is None or isinstance(value, (dict, list)) or \
+                    _is_regex(value):
+                raise KeyError(field)
+            key.append(value)
+        return self.entries.get(tuple(key))
+
+
+class MemoryCursor(object):
+    """A cursor over the results of a query on a MemoryCollection. Supports
+    the same chaining methods as a pymongo Cursor.
+
+    """
+    def __init__(
+        self, collection, spec=None, fields=None, skip=0, limit=0, sort=None
+    ):
+        self.collection = collection
+        self._spec = spec or {}
+        self._fields = fields
+        self._skip = skip
+        self._limit = limit
+        self._sort = _sort_spec(sort) if sort else None
+        self._results = None
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        """Returns the next document."""
+        if self._results is None:
+            self._results = iter(self._execute())
+        return next(self._results)
+
+    __next__ = next
+
+    def __getitem__(self, index):
+        return self.clone().skip(self._skip + index).limit(-1).next()
+
+    def _execute(self):
+        self.collection.database.client.record_read(
+            self.collection.read_preference)
+        records = self.collection._select(self._spec)
+        if self._sort:
+            for key, direction in reversed(self._sort):
+                records.sort(
+                    key=lambda r: sort_key(_get_path_value(r[1], key)),
+                    reverse=direction < 0
+                )
+
+        records = records[self._skip:]
+        if self._limit:
+            records = records[:abs(self._limit)]
+
+        document_class = self.collection.document_class
+        if 101 == getattr(document_class, "_type_marker", None):
+            # Raw BSON document classes are built from the encoded records
+            if self._fields is None:
+                return (document_class(record) for record, _ in records)
+            return (
+                document_class(BSON.encode(
+                    project(BSON(record).decode(), self._fields)))
+                for record, _ in records
+            )
+
+        return (
+            project(BSON(record).decode(), self._fields)
+            for record, _ in records
+        )
+
+    def _check_not_started(self):
+        if self._results is not None:
+            raise OperationFailure(
+                "cannot set options after executing query")
+
+    def batch_size(self, batch_size):
+        """Accepted for compatibility; results are already in memory."""
+        return self
+
+    def clone(self):
+        """Returns a new, unevaluated copy of the cursor."""
+        return MemoryCursor(
+            self.collection, self._spec, self._fields,
+            self._skip, self._limit, self._sort)
+
+    def close(self):
+        """Stops iteration."""
+        self._results = iter([])
+
+    def count(self, with_limit_and_skip=False):
+        """Returns the number of matching documents."""
+        if not with_limit_and_skip:
+            return len(self.collection._select(self._spec))
+        return len(list(self.clone()))
+
+    def distinct(self, key):
+        """Returns the distinct values of *key* among the results."""
+        return _distinct(self.clone(), key)
+
+    def limit(self, limit):
+        """Limits the number of results to *limit*."""
+        self._check_not_started()
+        self._limit = limit
+        return self
+
+    def rewind(self):
+        """Rewinds the cursor so it can be iterated again."""
+        self._results = None
+        return self
+
+    def skip(self, skip):
+        """Skips the first *skip* results."""
+        self._check_not_started()
+        self._skip = skip
+        return self
+
+    def sort(self, key_or_list, direction=None):
+        """Sorts the results, using the same arguments as pymongo."""
+        self._check_not_started()
+        self._sort = _sort_spec(key_or_list, direction)
+        return self
+
+
+def _distinct(documents, key):
+    result = []
+    for document in documents:
+        for value in _expand(get_path(document, key)):
+            if not isinstance(value, list) and value not in result:
+                result.append(value)
+    return result
+
+
+class MemoryCollection(object):
+    """An in-memory collection supporting the subset of the pymongo
+    Collection API that tavi uses.
+
+    """
+    read_preference = Primary()
+    document_class = dict
+
+    # Results can be read as raw BSON documents; see tavi.raw
+    supports_raw_bson = True
+
+    def __init__(self, database, name):
+        self.database = database
+        self.name = name
+        self._lock = threading.RLock()
+        self._records = collections.OrderedDict()
+        self._indexes = collections.OrderedDict()
+
+    def __repr__(self):
+        return "MemoryCollection(%r, %r)" % (self.database, self.name)
+
+    def __getitem__(self, name):
+        return self.database["%s.%s" % (self.name, name)]
+
+    def _reset(self):
+        self._records.clear()
+        self._indexes.clear()
+
+    @property
+    def full_name(self):
+        """The full name of the collection, e.g. "database.collection"."""
+        return "%s.%s" % (self.database.name, self.name)
+
+    def aggregate(self, pipeline, **kwargs):
+        """Runs an aggregation pipeline; see tavi.backends.aggregation. Like
+        pymongo 2, returns an iterator over the results if the *cursor*
+        option is given and a {"result": [...]} document otherwise.
+
+        """
+        from tavi.backends.aggregation import aggregate
+
+        if isinstance(pipeline, dict):
+            pipeline = [pipeline]
+
+        with self._lock:
+            self._expire()
+            documents = [BSON(r).decode() for r, _ in self._records.values()]
+        self.database.client.record_read(self.read_preference)
+
+        results = aggregate(documents, pipeline)
+        if "cursor" in kwargs:
+            return results
+        return {"result": list(results), "ok": 1.0}
+
+    def count(self, spec=None):
+        """Returns the number of documents in the collection."""
+        self._expire()
+        if spec:
+            return len(self._select(spec))
+        return len(self._records)
+
+    def create_index(self, key_or_list, cache_for=300, **kwargs):
+        """Creates an index. Raises a DuplicateKeyError if *unique* is given
+        and existing documents violate the constraint.
+
+        """
+        key = _sort_spec(key_or_list)
+        name = kwargs.pop("name", None) or "_".join(
+            "%s_%s" % (field, direction) for field, direction in key)
+
+        with self._lock:
+            if name not in self._indexes:
+                index = _Index(name, key, kwargs)
+                for _, document in self._records.values():
+                    self._add_to_index(index, document)
+                self._indexes[name] = index
+        return name
+
+    ensure_index = create_index
+
+    def distinct(self, key):
+        """Returns the distinct values of *key* in the collection."""
+        return _distinct(self.find(), key)
+
+    def drop(self):
+        """Removes all documents and indexes."""
+        with self._lock:
+            self._reset()
+
+    def drop_index(self, index_or_name):
+        """Drops the index with the given name or key."""
+        name = index_or_name
+        if not isinstance(name, basestring):
+            name = "_".join("%s_%s" % pair for pair in index_or_name)
+
+        with self._lock:
+            if name not in self._indexes:
+                raise OperationFailure("index not found with name [%s]" % name)
+            del self._indexes[name]
+
+    def drop_indexes(self):
+        """Drops all indexes except the one on *_id*."""
+        with self._lock:
+            self._indexes.clear()
+
+    def find(self, *args, **kwargs):
+        """Queries the collection, returning a MemoryCursor. Accepts the
+        same *spec*, *fields*, *skip*, *limit* and *sort* arguments as
+        pymongo. Other options are ignored.
+
+        """
+        names = ["spec", "fields", "skip", "limit", "sort"]
+        options = dict(zip(names, args))
+        options.setdefault("spec", kwargs.pop("filter", None))
+        options.setdefault("fields", kwargs.pop("projection", None))
+        for name in names:
+            if name in kwargs:
+                options[name] = kwargs[name]
+        return MemoryCursor(self, **options)
+
+    def find_one(self, spec_or_id=None, *args, **kwargs):
+        """Returns a single matching document or None."""
+        if spec_or_id is not None and not isinstance(spec_or_id, dict):
+            spec_or_id = {"_id": spec_or_id}
+
+        for document in self.find(spec_or_id, *args, **kwargs).limit(-1):
+            return document
+        return None
+
+    def with_options(
+        self, codec_options=None, read_preference=None, write_concern=None
+    ):
+        """Returns a handle to the same collection that reads with
+        *read_preference* and the *document_class* of *codec_options*. The
+        other options are ignored.
+
+        """
+        collection = copy.copy(self)
+        if read_preference is not None:
+            collection.read_preference = read_preference
+        if codec_options is not None:
+            collection.document_class = codec_options.document_class
+        return collection
+
+    def index_information(self):
+        """Returns a dictionary describing each index on the collection."""
+        info = {"_id_": {"key": [("_id", ASCENDING)]}}
+        for name, index in self._indexes.items():
+            info[name] = index.info()
+        return info
+
+    def insert(self, doc_or_docs, manipulate=True, check_keys=True, **kwargs):
+        """Inserts one or more documents and returns their id(s)."""
+        _check_write_concern(kwargs)
+
+        docs = doc_or_docs
+        if isinstance(doc_or_docs, dict):
+            docs = [doc_or_docs]
+
+        ids = []
+        with self._lock:
+            for doc in docs:
+                if "_id" not in doc:
+                    doc["_id"] = ObjectId()
+                self._store(BSON.encode(doc, check_keys), None)
+                ids.append(doc["_id"])
+
+        return ids[0] if isinstance(doc_or_docs, dict) else ids
+
+    def remove(self, spec_or_id=None, multi=True, **kwargs):
+        """Removes the matching documents."""
+        _check_write_concern(kwargs)
+        if spec_or_id is not None and not isinstance(spec_or_id, dict):
+            spec_or_id = {"_id": spec_or_id}
+
+        with self._lock:
+            removed = self._select(spec_or_id)
+            if not multi:
+                removed = removed[:1]
+            for record, document in removed:
+                self._discard(document)
+
+        return {"n": len(removed), "ok": 1.0, "err": None}
+
+    def update(
+        self, spec, document, upsert=False, manipulate=False, multi=False,
+        check_keys=True, **kwargs
+    ):
+        """Updates the matching documents, inserting one if *upsert* is
+        given and nothing matches.
+
+        """
+        _check_write_concern(kwargs)
+
+        with self._lock:
+            selected = self._select(spec)
+            if not multi:
+                selected = selected[:1]
+
+            for record, old in selected:
+                new = BSON(record).decode()
+                apply_update(new, document)
+                self._store(BSON.encode(new), old)
+
+            result = {
+                "n": len(selected),
+                "updatedExisting": len(selected) > 0,
+                "ok": 1.0,
+                "err": None
+            }
+
+            if not selected and upsert:
+                result["upserted"] = self._upsert(spec, document)
+                result["n"] = 1
+
+        return result
+
+    def _upsert(self, spec, document):
+        new = dict(
+            (k, v) for k, v in (spec or {}).items()
+            if not k.startswith("$") and not _is_operator_condition(v)
+        )
+        apply_update(new, document)
+        new.setdefault("_id", (spec or {}).get("_id") or ObjectId())
+        self._store(BSON.encode(new), None)
+        return new["_id"]
+
+    def _check_unique(self, index, document, replacing=None):
+        key = index.key_for(document)
+        if key is None or not index.unique:
+            return
+
+        existing = index.entries.get(key)
+        if existing is not None and existing != replacing:
+            raise DuplicateKeyError(
+                "E11000 duplicate key error index: %s.$%s dup key: { %s }" % (
+                    self.full_name,
+                    index.name,
+                    ", ".join(": %r" % (value,) for value in key)
+                ),
+                11000
+            )
+
+    def _add_to_index(self, index, document):
+        self._check_unique(index, document)
+        key = index.key_for(document)
+        if key is not None and index.unique:
+            index.entries[key] = _freeze(document["_id"])
+
+    def _discard(self, document):
+        _id = _freeze(document["_id"])
+        for index in self._indexes.values():
+            key = index.key_for(document)
+            if key is not None and index.entries.get(key) == _id:
+                del index.entries[key]
+        del self._records[_id]
+
+    def _store(self, record, old):
+        """Stores the encoded *record*, replacing the *old* document if it
+        is given. Checks unique indexes before changing anything.
+
+        """
+        document = BSON(record).decode()
+        _id = _freeze(document["_id"])
+
+        if old is None and _id in self._records:
+            raise DuplicateKeyError(
+                "E11000 duplicate key error index: %s.$_id_ dup key: "
+                "{ : %r }" % (self.full_name, document["_id"]),
+                11000
+            )
+
+        replacing = None if old is None else _freeze(old["_id"])
+        for index in self._indexes.values():
+            self._check_unique(index, document, replacing)
+
+        if old is not None:
+            self._discard(old)
+
+        for index in self._indexes.values():
+            self._add_to_index(index, document)
+        self._records[_id] = (record, document)
+
+    def _candidates(self, spec):
+        if "_id" in spec and not isinstance(spec["_id"], (dict, list)) and \
+                not _is_regex(spec["_id"]):
+            record = self._records.get(_freeze(spec["_id"]))
+            return [record] if record else []
+
+        for index in self._indexes.values():
+            if not all(field in spec for field in index.fields):
+                continue
+            try:
+                _id = index.lookup(spec)
+            except KeyError:
+                continue
+            return [self._records[_id]] if _id is not None else []
+
+        return self._records.values()
+
+    def _expire(self):
+        """Removes the documents whose TTL index date has passed. MongoDB
+        does this periodically in the background; here it happens before
+        each read.
+
+        """
+        with self._lock:
+            for index in self._indexes.values():
+                if index.expire_after is None:
+                    continue
+
+                cutoff = datetime.datetime.utcnow() - \
+                    datetime.timedelta(seconds=index.expire_after)
+                for _, document in list(self._records.values()):
+                    dates = [
+                        d for d in _expand(get_path(document, index.fields[0]))
+                        if isinstance(d, datetime.datetime)
+                    ]
+                    if dates and min(dates) < cutoff:
+                        self._discard(document)
+
+    def _select(self, spec):
+        """Returns the (record, document) pairs that match *spec*."""
+        spec = spec or {}
+        with self._lock:
+            self._expire()
+            return [
+                (record, document)
+                for record, document in self._candidates(spec)
+                if matches(document, spec)
+            ]
+
+
+def _check_write_concern(options):
+    w = options.get("w")
+    if isinstance(w, (int, long)) and w > 1:
+        raise OperationFailure(
+            "cannot use 'w' > 1 on a non-replicaset", 2)
+
+
+class MemoryDatabase(object):
+    """An in-memory database. Collections are created on first access."""
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+        self._collections = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return "MemoryDatabase(%r)" % self.name
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def __getitem__(self, name):
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = MemoryCollection(self, name)
+            return self._collections[name]
+
+    def collection_names(self):
+        """Returns the names of the collections that hold documents."""
+        return sorted(
+            name for name, collection in self._collections.items()
+            if collection.count()
+        )
+
+    def drop_collection(self, name_or_collection):
+        """Removes all documents and indexes from a collection."""
+        name = getattr(name_or_collection, "name", name_or_collection)
+        self[name].drop()
+
+
+class MemoryClient(object):
+    """An in-memory client. Databases are created on first access.
+
+    The client stands in for a replica set whose members all share the same
+    data: *reads* counts the queries served by read preference mode, e.g.
+    "primary" or "secondaryPreferred".
+
+    """
+    def __init__(self):
+        self._databases = {}
+        self._lock = threading.Lock()
+        self.reads = collections.Counter()
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def __getitem__(self, name):
+        with self._lock:
+            if name not in self._databases:
+                self._databases[name] = MemoryDatabase(self, name)
+            return self._databases[name]
+
+    def record_read(self, read_preference):
+        """Counts a query served with *read_preference*."""
+        with self._lock:
+            self.reads[read_preference.document["mode"]] += 1
+
+    def database_names(self):
+        """Returns the names of the databases that hold documents."""
+        return sorted(
+            name for name, database in self._databases.items()
+            if database.collection_names()
+        )
+
+    def drop_database(self, name_or_database):
+        """Removes all collections from a database. Existing handles to the
+        database stay valid.
+
+        """
+        name = getattr(name_or_database, "name", name_or_database)
+        database = self[name]
+        for collection in database._collections.values():
+            collection.drop()
+
+
+class MemoryBackend(BaseBackend):
+    """Stores Documents in memory, in the current process."""
+
+    def connect(self, database_name, **kwargs):
+        """Creates a new, empty MemoryClient. **kwargs** (such as the host)
+        are ignored.
+
+        """
+        client = MemoryClient()
+        return client, client[database_name]
+
+    def reconnect(self, client, database_name, **kwargs):
+        """Keeps using *client*; a forked process has its own copy of the
+        data.
+
+        """
+        return client, client[database_name]
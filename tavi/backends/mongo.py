@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+"""Provides the MongoDB storage backend."""
+from pymongo import MongoClient, MongoReplicaSetClient
+from pymongo.database import Database
+from tavi.base.backends import BaseBackend
+
+
+class MongoBackend(BaseBackend):
+    """Stores Documents in MongoDB using pymongo."""
+
+    def connect(self, database_name, **kwargs):
+        """Connects to MongoDB. **kwargs** are the same options that can be
+        passed to *MongoClient*. If replicaSet is present in the host, a
+        *MongoReplicaSetClient* will be used instead.
+
+        """
+        host = kwargs.get("host", "")
+        if host.find("replicaSet") > 0:
+            client = MongoReplicaSetClient(**kwargs)
+        else:
+            client = MongoClient(**kwargs)
+        return client, Database(client, database_name)
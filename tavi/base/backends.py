@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+"""Provides base storage backend support."""
+import abc
+
+
+class BaseBackend(object):
+    """Base class for storage backends. A backend creates the client and
+    database that *tavi.Connection* hands out. Every Document operation
+    (insert, update, delete, find and find_one) goes through the collections
+    of that database, so a backend only has to provide collections that
+    support the parts of the pymongo *Collection* API that tavi uses.
+    Subclasses must implement *connect*.
+
+    """
+    __metaclass__ = abc.ABCMeta
+
+    @abc.abstractmethod
+    def connect(self, database_name, **kwargs):
+        """Returns a (client, database) pair for *database_name*. The
+        database must return a collection when indexed by collection name.
+
+        """
+
+    def reconnect(self, client, database_name, **kwargs):
+        """Returns a (client, database) pair for use in a process that was
+        forked after *client* was created. Sockets must not be shared
+        between processes, so by default this connects again.
+
+        """
+        return self.connect(database_name, **kwargs)
@@ -1,19 +1,62 @@
 # -*- coding: utf-8 -*-
 """Provides base document support."""
 import collections
+import json
 import logging
-from bson.json_util import dumps, loads
+from bson import json_util
+from bson.json_util import loads
+from bson.son import SON
 from tavi.errors import Errors
 from tavi.base.fields import BaseField
 
 logger = logging.getLogger(__name__)
 
 
+# Values of these exact types are already valid JSON; subclasses, such as
+# bson.Binary, may need extended JSON.
+_JSON_TYPES = frozenset([str, unicode, int, long, float, bool, type(None)])
+
+
+def _json_value(value):
+    """Converts *value* for json.dumps like bson.json_util does, but passes
+    plain JSON values through without trying the extended JSON conversions.
+
+    """
+    kind = type(value)
+    if kind in _JSON_TYPES:
+        return value
+
+    if kind is list:
+        return [_json_value(v) for v in value]
+
+    if hasattr(value, "iteritems"):
+        return SON((k, _json_value(v)) for k, v in value.iteritems())
+
+    # NumPy arrays and array.arrays, the values of typed array fields
+    if hasattr(value, "tolist"):
+        return value.tolist()
+
+    if hasattr(value, "__iter__") and not isinstance(value, basestring):
+        return [_json_value(v) for v in value]
+
+    try:
+        return json_util.default(value)
+    except TypeError:
+        return value
+
+
 def get_field_attr(cls, field):
     """Custom function for retrieving a tavi.field attribute. Handles nested
     attributes for embedded documents as well as embedded lists of documents.
+    Reference fields return the id of the referenced Document and typed
+    array fields their packed binary value.
 
     """
+    if field in cls._reference_fields:
+        return cls._field_descriptors[field].reference_id(cls)
+    if field in cls._packed_fields:
+        return cls._field_descriptors[field].pack(cls)
+
     value = getattr(cls, field)
     if isinstance(value, BaseDocument):
         value = value.field_values
@@ -25,23 +68,36 @@ def get_field_attr(cls, field):
     return value
 
 
-def set_field_attr(cls, field, value):
-    """Custom function for setting a tavi.field attribute."""
+def set_field_attr(cls, field, value, trusted=False):
+    """Custom function for setting a tavi.field attribute. The items of
+    lists of embedded documents are validated in a single pass, or not at
+    all if the values are *trusted*.
+
+    """
     field_descriptor = cls._field_descriptors[field]
 
     if value is not None and hasattr(field_descriptor, '_type'):
         if not isinstance(value, collections.MutableSequence):
             raise ValueError('ListField value must be a sequence.')
 
-        for item in value:
-            getattr(cls, field).append(field_descriptor._type(**item))
+        type_ = field_descriptor._type
+        if trusted:
+            getattr(cls, field).extend_trusted(
+                type_._trusted(item) for item in value)
+        else:
+            getattr(cls, field).extend([type_(**item) for item in value])
         return
 
-    if None == value:
+    if value is None:
         value = field_descriptor.default
 
     if isinstance(value, dict):
-        value = field_descriptor.doc_class(**value)
+        # A new embedded document that nothing else refers to, so it is
+        # kept as it is instead of being copied by the field.
+        doc_class = field_descriptor.doc_class
+        cls.__dict__[field_descriptor.attribute_name] = (
+            doc_class._trusted(value) if trusted else doc_class(**value))
+        return
 
     setattr(cls, field, value)
 
@@ -61,6 +117,48 @@ class BaseDocumentMetaClass(type):
         )
 
         cls._field_descriptors = collections.OrderedDict(sorted_fields)
+        cls._field_names = cls._field_descriptors.keys()
+        cls._field_name_set = frozenset(cls._field_names)
+        cls._attribute_names = dict(
+            (field.name, attribute)
+            for attribute, field in cls._field_descriptors.items()
+        )
+        cls._json_plans = {}
+
+        # Fields that store the id of another Document; their values are
+        # persisted without reading that Document.
+        cls._reference_fields = frozenset(
+            name for name, field in sorted_fields
+            if hasattr(field, "reference_id")
+        )
+
+        # Fields whose values are stored packed in a binary value
+        cls._packed_fields = frozenset(
+            name for name, field in sorted_fields if hasattr(field, "pack")
+        )
+
+        # Fields compared by their stored values; see EmbeddedDocument.__eq__
+        cls._compared_as_stored = cls._reference_fields | cls._packed_fields
+
+        # Fields whose values can be assigned as they are when loading
+        # trusted values; the others convert values in __set__.
+        cls._plain_fields = frozenset(
+            name for name, field in sorted_fields
+            if getattr(type(field).__set__, "im_func", None) is
+            BaseField.__set__.im_func
+        )
+
+
+class _LazyFields(object):
+    """The raw BSON a Document was loaded from and the persisted names of
+    the fields that have not been decoded from it yet.
+
+    """
+    __slots__ = ("raw", "pending")
+
+    def __init__(self, raw, pending):
+        self.raw = raw
+        self.pending = pending
 
 
 class BaseDocument(object):
@@ -68,24 +166,92 @@ class BaseDocument(object):
     __metaclass__ = BaseDocumentMetaClass
 
     def __init__(self, **kwargs):
+        self._load_fields(kwargs)
+
+    def _load_fields(self, kwargs, trusted_lists=False):
+        """Sets the fields from *kwargs*, keyed by field attribute name, and
+        validates them. The items of lists of embedded documents are not
+        validated if *trusted_lists* is True.
+
+        """
         self._errors = Errors()
-        for field in self.fields:
-            set_field_attr(self, field, kwargs.get(field))
+        for field in self._field_names:
+            set_field_attr(self, field, kwargs.get(field), trusted_lists)
         for k, v in kwargs.iteritems():
-            if k not in self.fields:
+            if k not in self._field_name_set:
                 msg = "Ignoring unknown field for %s: %s = '%s'"
                 logger.debug(msg, self.__class__.__name__, repr(k), repr(v))
         self.changed_fields = set()
 
+    def _load_trusted(self, attrs):
+        """Sets the fields from *attrs*, keyed by field attribute name, like
+        __init__ does but without running the validators of plain fields.
+        Only used for values that were valid when they were stored.
+
+        """
+        self._errors = Errors()
+        self.changed_fields = set()
+        for field in self._field_names:
+            self._load_trusted_field(field, attrs.get(field))
+        self.changed_fields = set()
+
+    def _load_trusted_field(self, field, value):
+        if field in self._plain_fields:
+            descriptor = self._field_descriptors[field]
+            if value is None:
+                value = descriptor.default
+            self.__dict__[descriptor.attribute_name] = value
+        else:
+            set_field_attr(self, field, value, trusted=True)
+
+    def _load_lazy(self, raw):
+        """Loads the fields from *raw*, a tavi.raw.RawDocument with the
+        persisted field names. Each field is decoded on first access.
+
+        """
+        self._errors = Errors()
+        self.changed_fields = set()
+        self.__dict__["_lazy"] = _LazyFields(raw, dict(self._attribute_names))
+
+    def _decode_lazy(self, name):
+        """Decodes the field persisted as *name* if it has not been decoded
+        yet. Called by the field descriptors.
+
+        """
+        lazy = self.__dict__["_lazy"]
+        field = lazy.pending.pop(name, None)
+        if field is None:
+            return
+
+        changed = name in self.changed_fields
+        self._load_trusted_field(field, lazy.raw.get(name))
+        if not changed:
+            self.changed_fields.discard(name)
+
+    def _decoded_field_names(self):
+        """Returns the attribute names of the fields that have been decoded;
+        all of them unless the Document was loaded lazily.
+
+        """
+        lazy = self.__dict__.get("_lazy")
+        if lazy is None:
+            return self._field_names
+        return [
+            field for field in self._field_names
+            if self._field_descriptors[field].name not in lazy.pending
+        ]
+
     @property
     def fields(self):
         """Returns the list of fields for the Document."""
-        return self._field_descriptors.keys()
+        return list(self._field_names)
 
     @property
     def field_values(self):
         """Returns a dictionary containing all fields and their values."""
-        return {field: get_field_attr(self, field) for field in self.fields}
+        return {
+            field: get_field_attr(self, field) for field in self._field_names
+        }
 
     @property
     def mongo_field_values(self):
@@ -113,27 +279,80 @@ class BaseDocument(object):
         self.__validate__()
         return 0 == self.errors.count
 
+    @classmethod
+    def _json_plan(cls, fields):
+        """Returns the names of the *fields* to serialize and whether to
+        include the bson_id, computed once per list of *fields*.
+
+        """
+        key = tuple(fields) if fields else None
+        plan = cls._json_plans.get(key)
+        if plan is None:
+            if key is None:
+                plan = (cls._field_names, True)
+            else:
+                names = [field for field in key if "bson_id" != field]
+                for field in names:
+                    if field not in cls._field_name_set:
+                        raise KeyError(field)
+                plan = (names, "bson_id" in key)
+            cls._json_plans[key] = plan
+        return plan
+
+    def _json_map(self, plan):
+        names, include_bson_id = plan
+        packed = self._packed_fields
+        field_map = {
+            field: _json_value(
+                getattr(self, field) if field in packed
+                else get_field_attr(self, field)
+            )
+            for field in names
+        }
+
+        if include_bson_id:
+            field_map["id"] = _json_value(self.bson_id)
+        return field_map
+
     def to_json(self, fields=None):
         """Convert Document model object to JSON. Optionally, specify which
         fields should be serialized.
 
-        """
-        include_bson_id = True
+        The values of the fields are computed once, in a single pass, and
+        only values that are not plain JSON go through the extended JSON
+        conversions of bson.json_util. Typed arrays are serialized as lists
+        of numbers.
 
-        if fields:
-            if "bson_id" not in fields:
-                include_bson_id = False
-            else:
-                fields.remove("bson_id")
+        """
+        return json.dumps(self._json_map(self._json_plan(fields)))
 
-            field_map = {field: self.field_values[field] for field in fields}
-        else:
-            field_map = self.field_values
+    @classmethod
+    def dumps_many(cls, documents, fields=None, fileobj=None):
+        """Serializes *documents* to a JSON array of the objects *to_json*
+        would return for each of them. Optionally, specify which fields
+        should be serialized.
 
-        if include_bson_id:
-            field_map["id"] = self.bson_id
+        If *fileobj* is given, the array is written to it (anything with a
+        *write* method, such as a file or a socket's makefile) one document
+        at a time, so only one document is serialized in memory at once,
+        and the number of documents written is returned. Otherwise the JSON
+        string is returned.
 
-        return dumps(field_map)
+        """
+        plan = cls._json_plan(fields)
+        if fileobj is None:
+            return "[%s]" % ", ".join(
+                json.dumps(document._json_map(plan)) for document in documents)
+
+        count = 0
+        fileobj.write("[")
+        for document in documents:
+            if count:
+                fileobj.write(", ")
+            fileobj.write(json.dumps(document._json_map(plan)))
+            count += 1
+        fileobj.write("]")
+        return count
 
     @classmethod
     def from_json(cls, json_str):
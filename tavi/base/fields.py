@@ -19,6 +19,10 @@ class BaseField(object):
 
     _creation_counter = 0
 
+    # The type of the column the field is exported to by
+    # tavi.columns.to_columns
+    column_type = "object"
+
     def __init__(
         self, name,
         required=False, default=None, choices=None, persist=True, unique=False
@@ -33,13 +37,23 @@ class BaseField(object):
         self.creation_order = BaseField._creation_counter
         BaseField._creation_counter += 1
 
+    def _load(self, instance):
+        """Decodes the value of the field if *instance* was loaded lazily
+        from raw BSON and the field has not been read yet.
+
+        """
+        if instance is not None and "_lazy" in instance.__dict__:
+            instance._decode_lazy(self.name)
+
     def __get__(self, instance, owner):
+        self._load(instance)
         if self.attribute_name not in instance.__dict__ and self.default:
             self.__set__(instance, self.default)
         return getattr(instance, self.attribute_name)
 
     def __set__(self, instance, value):
-        if None == value and self.required and self.default:
+        self._load(instance)
+        if value is None and self.required and self.default:
             value = self.default
         self.validate(instance, value)
         setattr(instance, self.attribute_name, value)
@@ -55,7 +69,7 @@ class BaseField(object):
 
         """
         instance.errors.clear(self.name)
-        if self.required and None == value:
+        if self.required and value is None:
             instance.errors.add(self.name, "is required")
 
         if self.choices and value not in self.choices:
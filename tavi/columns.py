@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""Provides columnar export of query results.
+
+Records read from Mongo are streamed straight into one typed buffer per
+field, without creating Documents. The type of a column comes from the
+*column_type* of its field:
+
+    int64      -- IntegerField
+    float64    -- FloatField
+    bool       -- BooleanField
+    datetime64 -- DateTimeField, as microseconds since the epoch (UTC)
+    string     -- StringField; Python objects or dictionary-encoded
+    object     -- any other field; the values of a TypedArrayField are
+                  unpacked into arrays
+
+Columns are NumPy arrays when NumPy is installed and *array.array* (or
+lists, for string and object columns) otherwise. Every column has a mask
+that is True where the value is missing.
+
+"""
+import array
+import calendar
+import collections
+from tavi import arrays
+from tavi.errors import TaviError
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+
+class Column(collections.namedtuple("Column", "values mask categories")):
+    """A column of values.
+
+    values     -- the values; for dictionary-encoded strings, the index of
+                  each value in *categories*, or -1 where missing
+    mask       -- True where the value is missing
+    categories -- the distinct strings of a dictionary-encoded column, else
+                  None
+
+    """
+    __slots__ = ()
+
+
+# array.array has no 64-bit integer type code of its own
+_INT64 = "l" if 8 == array.array("l").itemsize else "d"
+
+_TYPECODES = {
+    "int64": _INT64,
+    "float64": "d",
+    "bool": "b",
+    "datetime64": _INT64
+}
+
+_DTYPES = {
+    "int64": "int64",
+    "float64": "float64",
+    "bool": "bool",
+    "datetime64": "int64"
+}
+
+
+def _microseconds(value):
+    seconds = calendar.timegm(value.utctimetuple())
+    return seconds * 1000000 + value.microsecond
+
+
+_CONVERTERS = {
+    "int64": int,
+    "float64": float,
+    "bool": bool,
+    "datetime64": _microseconds
+}
+
+_MISSING = {
+    "int64": 0,
+    "float64": float("nan"),
+    "bool": False,
+    "datetime64": 0
+}
+
+
+def _unpacker(dtype):
+    """Returns a function that unpacks the binary values of a
+    TypedArrayField of *dtype*.
+
+    """
+    def unpack(value):
+        if isinstance(value, bytes):
+            return arrays.unpack(value, dtype)
+        return value
+    return unpack
+
+
+class _ColumnBuilder(object):
+    def __init__(self, kind, encode, convert=None):
+        self.kind = kind
+        self.mask = array.array("b")
+        self.categories = None
+
+        if kind in _TYPECODES:
+            self.values = array.array(_TYPECODES[kind])
+            self.convert = _CONVERTERS[kind]
+            self.missing = _MISSING[kind]
+        elif "string" == kind and encode:
+            self.values = array.array(_INT64)
+            self.categories = collections.OrderedDict()
+            self.convert = self._encode
+            self.missing = -1
+        else:
+            self.values = []
+            self.convert = convert or (lambda value: value)
+            self.missing = None
+
+    def _encode(self, value):
+        return self.categories.setdefault(value, len(self.categories))
+
+    def append(self, value):
+        if value is None:
+            self.mask.append(True)
+            self.values.append(self.missing)
+        else:
+            self.mask.append(False)
+            self.values.append(self.convert(value))
+
+    def build(self):
+        categories = None
+        if self.categories is not None:
+            categories = list(self.categories)
+
+        if numpy is None:
+            return Column(self.values, self.mask, categories)
+
+        mask = numpy.frombuffer(self.mask, "bool").copy()
+        if isinstance(self.values, list):
+            values = numpy.empty(len(self.values), dtype=object)
+            values[:] = self.values
+        else:
+            dtype = "int64" if categories is not None else _DTYPES[self.kind]
+            values = numpy.frombuffer(self.values, self.values.typecode)
+            values = values.astype(dtype)
+
+        if "datetime64" == self.kind:
+            values = values.view("datetime64[us]")
+            values[mask] = numpy.datetime64("NaT")
+        if categories is not None:
+            categories = numpy.array(categories, dtype=object)
+        return Column(values, mask, categories)
+
+
+def fields_for(document_class, fields=None):
+    """Returns the (attribute name, field) pairs of the *fields* of
+    *document_class*, all of its fields by default.
+
+    """
+    descriptors = document_class._field_descriptors
+    if fields is None:
+        return descriptors.items()
+
+    for name in fields:
+        if name not in descriptors:
+            raise TaviError(
+                "%s has no field named '%s'" % (document_class.__name__, name))
+    return [(name, descriptors[name]) for name in fields]
+
+
+def projection(document_class, fields=None):
+    """Returns the projection that reads only the *fields* (attribute
+    names; all fields by default) of *document_class*.
+
+    """
+    return dict(
+        (field.name, True) for _, field in fields_for(document_class, fields))
+
+
+def to_columns(document_class, records, fields=None, encode_strings=False):
+    """Returns an ordered dictionary of field attribute name to Column for
+    *records*, an iterable of documents read from the collection of
+    *document_class*.
+
+    fields         -- the attribute names of the fields to export; all
+                      fields by default
+    encode_strings -- dictionary-encode string columns
+
+    """
+    columns = [
+        (
+            name, field.name,
+            _ColumnBuilder(
+                field.column_type, encode_strings,
+                _unpacker(field.dtype) if hasattr(field, "pack") else None
+            )
+        )
+        for name, field in fields_for(document_class, fields)
+    ]
+
+    for record in records:
+        for _, stored_name, builder in columns:
+            builder.append(record.get(stored_name))
+
+    return collections.OrderedDict(
+        (name, builder.build()) for name, _, builder in columns)
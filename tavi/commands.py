@@ -2,18 +2,23 @@
 import collections
 import datetime
 import tavi.documents
+from tavi.instrumentation import Operation
+from tavi import read_preferences
 
 
 class MongoCommand(object):
     def __init__(self, target, **kwargs):
         self.target = target
         self.kwargs = kwargs
+        self.values = None
+        self.metrics = Operation(self.name.lower(), target.__class__)
 
     @property
     def name(self):
         raise "Not Implemented"
 
     def execute(self):
+        read_preferences.record_write()
         self._now = datetime.datetime.utcnow()
         if hasattr(self.target, "last_modified_at"):
             self.old_last_modified_at = self.target.last_modified_at
@@ -25,7 +30,7 @@ class MongoCommand(object):
             self._update_field("last_modified_at", self.old_last_modified_at)
 
     def _update_field(self, name, timestamp):
-        for field in self.target.fields:
+        for field in self.target._decoded_field_names():
             value = getattr(self.target, field)
             if name == field:
                 setattr(self.target, name, timestamp)
@@ -51,8 +56,15 @@ class Insert(MongoCommand):
         self._update_field("created_at", self._now)
 
         collection = self.target.__class__.collection
-        values = self.target.mongo_field_values
-        self.target._id = collection.insert(values, **self.kwargs)
+        with self.metrics.phase("serialize"):
+            values = self.values = self.target.mongo_field_values
+            self.target._pop_sparse_nulls(values)
+        self.metrics.measure(values)
+
+        with self.metrics.phase("network"):
+            self.target._id = collection.insert(values, **self.kwargs)
+        self.target.__class__._invalidate_counts()
+        self.metrics.count = 1
 
     def reset_fields(self):
         super(Insert, self).reset_fields()
@@ -68,7 +80,21 @@ class Update(MongoCommand):
     def execute(self):
         super(Update, self).execute()
         self.kwargs["upsert"] = True
-        self.target.__class__.collection.update(
-            {"_id": self.target._id},
-            {"$set": self.target.mongo_field_values},
-            **self.kwargs)
+        with self.metrics.phase("serialize"):
+            values = self.values = self.target._values_to_save()
+            document = {"$set": values}
+            unset = self.target._pop_sparse_nulls(values)
+            if unset:
+                document["$unset"] = dict.fromkeys(unset, "")
+                if not values:
+                    del document["$set"]
+        self.metrics.measure(values)
+
+        with self.metrics.phase("network"):
+            result = self.target.__class__.collection.update(
+                {"_id": self.target._id},
+                document,
+                **self.kwargs)
+        if result and result.get("upserted") is not None:
+            self.target.__class__._invalidate_counts()
+        self.metrics.count = 1
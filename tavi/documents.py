@@ -1,11 +1,24 @@
 # -*- coding: utf-8 -*-
 """Provides support for dealing with Mongo Documents."""
+import collections
+import copy
+from bson import BSON
+from bson.json_util import dumps
 from bson.objectid import ObjectId
 from tavi import Connection
-from tavi.base.documents import BaseDocument, BaseDocumentMetaClass
+from tavi.base.documents import (
+    BaseDocument, BaseDocumentMetaClass, get_field_attr)
 from tavi.commands import Insert, Update
-from tavi.errors import TaviConnectionError
-from tavi.utils.timer import Timer
+from tavi.errors import TaviConnectionError, TaviError
+from tavi import executors
+from tavi.instrumentation import Operation
+from tavi import indexes
+from tavi import jsonl
+from tavi import read_preferences
+from tavi.query import Query, ResultSet, translate_pipeline
+from tavi import raw
+from tavi import references
+from tavi.utils.timer import clock
 import inflection
 import logging
 import pymongo
@@ -13,6 +26,44 @@ import re
 
 logger = logging.getLogger(__name__)
 
+# The number of cached counts kept per Document class
+COUNT_CACHE_SIZE = 256
+
+
+def _is_empty(value):
+    """Indicates if *value* is None or an empty list, which *field_values*
+    both return as None.
+
+    """
+    return value is None or \
+        isinstance(value, collections.MutableSequence) and 0 == len(value)
+
+
+def _paged(hydrate):
+    """Wraps *hydrate* to mark the Documents it returns as read with the
+    first page of their lazy ListFields.
+
+    """
+    def load(record):
+        document = hydrate(record)
+        document.__dict__["_paged"] = True
+        return document
+    return load
+
+
+def _overrides_init(cls, base):
+    """Indicates if *cls* defines its own __init__ instead of the one of
+    *base*. Documents of such classes are loaded by calling the class, so
+    that their __init__ runs.
+
+    """
+    return cls.__init__.__func__ is not base.__init__.__func__
+
+
+def _from_bson(document_class, data):
+    """Unpickles a Document; see Document.__reduce__."""
+    return document_class.from_bson(data)
+
 
 class DocumentMetaClass(BaseDocumentMetaClass):
     """MetaClass for Documents. Sets up the database connection, infers the
@@ -25,49 +76,412 @@ class DocumentMetaClass(BaseDocumentMetaClass):
         super(DocumentMetaClass, cls).__init__(name, bases, attrs)
         cls._collection_name = inflection.underscore(
             inflection.pluralize(name))
+        cls._index_specs = {}
+        cls._count_cache = {}
+        cls._lazy_lists = [
+            (field.name, field.page_size)
+            for field in cls._field_descriptors.values()
+            if getattr(field, "lazy", False)
+        ]
+
+        for index in attrs.get("__indexes__", []):
+            index.key(cls)
+
+        # Persisted names of the fields of sparse indexes, which are left
+        # out of writes when they have no value so that they are not indexed
+        cls._sparse_names = frozenset(
+            name
+            for index in cls.__indexes__ if index.options.get("sparse")
+            for name, _ in index.key(cls)
+        )
 
     @property
     def collection(cls):
-        """Returns a handle to the Document collection."""
-        if not Connection.database:
-            raise TaviConnectionError(
-                "Cannot connect to MongoDB. Did you call "
-                "'tavi.connection.Connection.setup'?")
-        return Connection.database[cls._collection_name]
+        """Returns a handle to the Document collection. Unless
+        *__auto_index__* is False, the declared indexes are ensured first;
+        pymongo caches which indexes it has ensured, so this only goes to the
+        server once in a while.
+
+        """
+        collection = cls._get_collection()
+        if cls.__auto_index__:
+            for key, options in cls._specs_for(collection):
+                collection.ensure_index(key, **options)
+        return collection
 
     @property
     def collection_name(cls):
         """Returns the name of the Document collection."""
         return cls._collection_name
 
+    def _get_collection(cls):
+        database = Connection.get_database(
+            cls.__connection__, cls.__database__)
+        if not database:
+            raise TaviConnectionError(
+                "Cannot connect to MongoDB. Did you call "
+                "'tavi.connection.Connection.setup'?")
+        return database[cls._collection_name]
+
+    def _specs_for(cls, collection):
+        specs = cls._index_specs.get(collection.full_name)
+        if specs is None:
+            specs = [
+                index.spec(cls) for index in cls.declared_indexes(
+                    collection.full_name)
+            ]
+            cls._index_specs[collection.full_name] = specs
+        return specs
+
 
 class Document(BaseDocument):
     """Represents a Mongo Document. Provides methods for saving and retrieving
     and deleting Documents.
 
+    Documents are stored using the default tavi.Connection, unless
+    *__connection__* names another connection alias. *__database__* selects
+    a database other than the one the connection was set up with.
+
+    Reads use the client's read preference unless *__read_preference__*
+    names one; see tavi.read_preferences.
+
+    Indexes are declared with a list of tavi.indexes.Index in *__indexes__*.
+    Fields with *unique* set are covered by an additional compound unique
+    index. Set *__auto_index__* to False to build indexes only when
+    *ensure_indexes* is called.
+
     """
     __metaclass__ = DocumentMetaClass
 
     __MAX_NAMESPACE_SIZE__ = 127  # bytes
     __UNIQUE_INDEX_SUFFIX__ = "_unique_index"
 
+    __connection__ = None
+    __database__ = None
+
+    __read_preference__ = None
+    __tag_sets__ = None
+    __max_staleness__ = None
+
+    __indexes__ = []
+    __auto_index__ = True
+
+    __lazy__ = False
+
     def __init__(self, **kwargs):
         self._id = kwargs.pop("_id", None)
         super(Document, self).__init__(**kwargs)
+
+    @classmethod
+    def declared_indexes(cls, full_name):
+        """Returns the Indexes declared for the Document, including the unique
+        index for fields with *unique* set. *full_name* is the full name of
+        the collection, which limits the length of the unique index name.
+
+        """
+        declared = list(cls.__indexes__)
         unique_keys = [
-            k for k, v in self._field_descriptors.items() if v.unique]
+            k for k, v in cls._field_descriptors.items() if v.unique]
 
         if len(unique_keys) > 0:
-            key_pairs = [(k, pymongo.ASCENDING) for k in unique_keys]
-            max_index_name_length = self.__MAX_NAMESPACE_SIZE__ - \
-                len(".$" + self.__class__.collection.full_name
-                    + self.__UNIQUE_INDEX_SUFFIX__)
+            max_index_name_length = cls.__MAX_NAMESPACE_SIZE__ - \
+                len(".$" + full_name + cls.__UNIQUE_INDEX_SUFFIX__)
 
             name = "_".join(unique_keys)[:max_index_name_length] + \
-                self.__UNIQUE_INDEX_SUFFIX__
+                cls.__UNIQUE_INDEX_SUFFIX__
+            declared.append(indexes.Index(
+                *unique_keys, name=name, unique=True, background=False))
+
+        return declared
+
+    @classmethod
+    def diff_indexes(cls):
+        """Compares the declared indexes with the indexes that exist on the
+        collection and returns a tavi.indexes.IndexDiff.
+
+        """
+        collection = cls._get_collection()
+        return indexes.diff(collection, cls._specs_for(collection))
+
+    @classmethod
+    def ensure_indexes(cls):
+        """Builds the declared indexes that do not exist on the collection and
+        returns their names. Indexes that exist with different options are
+        logged and left alone, since they have to be dropped first.
+
+        """
+        collection = cls._get_collection()
+        diff = indexes.diff(collection, cls._specs_for(collection))
+
+        for key, options in diff.changed:
+            logger.warn(
+                "%s index %s exists with different options; drop it to "
+                "rebuild it",
+                cls.__name__,
+                options["name"]
+            )
+
+        created = []
+        for key, options in diff.missing:
+            created.append(collection.create_index(key, **options))
+            logger.info("%s CREATE INDEX %s", cls.__name__, options["name"])
+        return created
+
+    @classmethod
+    def _from_mongo(cls, record):
+        """Returns a Document for *record*, a document read from Mongo, whose
+        fields use the persisted names. The fields are validated, except for
+        the items of lists of embedded documents, which were validated when
+        they were added.
+
+        """
+        names = cls._attribute_names
+        if _overrides_init(cls, Document):
+            return cls(**dict(
+                (names.get(key, key), value) for key, value in record.items()))
+
+        document = cls.__new__(cls)
+        document._id = record.get("_id")
+        document._load_fields(
+            dict((names.get(key, key), value) for key, value in record.items()
+                 if "_id" != key),
+            trusted_lists=True
+        )
+        return document
 
-            opts = {"name": name, "unique": True}
-            self.__class__.collection.create_index(key_pairs, **opts)
+    @classmethod
+    def _trusted(cls, record):
+        """Returns a Document for *record*, whose fields use the persisted
+        names, without validating the field values again.
+
+        """
+        if _overrides_init(cls, Document):
+            return cls._from_mongo(record)
+
+        names = cls._attribute_names
+        document = cls.__new__(cls)
+        document._id = record.get("_id")
+        document._load_trusted(dict(
+            (names.get(key, key), value) for key, value in record.items()))
+        return document
+
+    @classmethod
+    def _from_raw(cls, record):
+        """Returns a Document for *record*, a tavi.raw.RawDocument, that
+        decodes each field on first access.
+
+        """
+        if _overrides_init(cls, Document):
+            return cls._from_mongo(record.decode())
+
+        document = cls.__new__(cls)
+        document._id = record.get("_id")
+        document._load_lazy(record)
+        return document
+
+    @classmethod
+    def _reader(cls, kwargs, paged=False):
+        """Returns the collection to read from and the function that
+        hydrates the results, using the read preference and *lazy* options
+        popped from *kwargs*. Inside a tavi.references.identity_map block,
+        results that were read before return the same Document.
+
+        *paged* indicates that the lazy ListFields were read with their
+        first page only; see *_page_lists*.
+
+        """
+        lazy = kwargs.pop("lazy", cls.__lazy__)
+        collection, hydrate = cls._collection_for_read(kwargs), cls._from_mongo
+        if lazy and raw.supported(collection):
+            collection, hydrate = raw.raw_collection(collection), cls._from_raw
+        if paged:
+            hydrate = _paged(hydrate)
+        return collection, references.identity(cls, hydrate)
+
+    @classmethod
+    def _page_lists(cls, args, kwargs):
+        """Adds a projection that reads the first page of each lazy
+        ListField to the *find* arguments *args* (the spec and projection),
+        unless a projection is given. Returns the arguments and whether the
+        projection was added.
+
+        """
+        if not cls._lazy_lists or len(args) > 1 or \
+                "fields" in kwargs or "projection" in kwargs:
+            return args, False
+
+        projection = dict(
+            (name, {"$slice": page_size})
+            for name, page_size in cls._lazy_lists
+        )
+        return (args[0] if args else None, projection), True
+
+    @classmethod
+    def _list_page(cls, bson_id, name, skip, limit):
+        """Returns the items *skip* to *skip* + *limit* of the list field
+        persisted as *name* in the Document with *bson_id*, read with a
+        $slice projection.
+
+        """
+        operation = Operation("list_page", cls)
+        with operation:
+            collection = cls._collection_for_read({})
+            with operation.phase("network"):
+                record = collection.find_one(
+                    {"_id": bson_id},
+                    {name: {"$slice": [skip, limit]}, "_id": True}
+                )
+
+        items = (record or {}).get(name) or []
+        operation.count = len(items)
+
+        logger.info(
+            "(%ss) %s LIST PAGE %s[%s:%s], %s",
+            operation.duration_in_seconds(),
+            cls.__name__,
+            name,
+            skip,
+            skip + limit,
+            bson_id
+        )
+        operation.emit()
+        return items
+
+    @classmethod
+    def _list_size(cls, bson_id, name):
+        """Returns the number of items of the list field persisted as *name*
+        in the Document with *bson_id*, counted with $size by the server.
+
+        """
+        pipeline = [
+            {"$match": {"_id": bson_id}},
+            {"$project": {
+                "_id": False,
+                "size": {"$size": {"$ifNull": ["$" + name, []]}}
+            }}
+        ]
+
+        operation = Operation("list_size", cls)
+        with operation:
+            collection = cls._collection_for_read({})
+            with operation.phase("network"):
+                results = collection.aggregate(pipeline, cursor={})
+            if isinstance(results, dict):
+                results = results["result"]
+            results = list(results)
+
+        logger.info(
+            "(%ss) %s LIST SIZE %s, %s",
+            operation.duration_in_seconds(),
+            cls.__name__,
+            name,
+            bson_id
+        )
+        operation.emit()
+        return results[0]["size"] if results else 0
+
+    @classmethod
+    def _pop_sparse_nulls(cls, values):
+        """Removes the fields of sparse indexes that have no value from
+        *values*, persisted field values, and returns their names.
+
+        """
+        names = [
+            name for name in cls._sparse_names
+            if name in values and values[name] is None
+        ]
+        for name in names:
+            del values[name]
+        return names
+
+    def _values_to_save(self):
+        """Returns the persisted field values to send on update. Documents
+        that were loaded lazily only send the fields that were changed and
+        the decoded fields that hold lists, documents or typed arrays, which
+        can change in place.
+
+        """
+        if "_lazy" not in self.__dict__:
+            return self.mongo_field_values
+
+        values = {}
+        for field in self._decoded_field_names():
+            name = self._field_descriptors[field].name
+            value = get_field_attr(self, field)
+            if name in self.changed_fields or \
+                    isinstance(value, (list, dict)) or \
+                    field in self._packed_fields:
+                values[name] = value
+        return values
+
+    def to_bson(self):
+        """Returns a snapshot of the Document as BSON bytes, with the field
+        names persisted in Mongo. See *from_bson*.
+
+        """
+        record = self.mongo_field_values
+        if self._id is not None:
+            record["_id"] = self._id
+        return bytes(BSON.encode(record))
+
+    @classmethod
+    def from_bson(cls, data):
+        """Returns the Document for *data*, a snapshot made by *to_bson*.
+        The snapshot is trusted, so the field validators are not run.
+
+        """
+        return cls._trusted(BSON(data).decode())
+
+    def __reduce__(self):
+        return _from_bson, (self.__class__, self.to_bson())
+
+    # Pickles are BSON snapshots (see __reduce__), but copies keep all the
+    # state of the Document, such as its changed fields and the values of
+    # fields that are not persisted.
+    def __copy__(self):
+        document = self.__class__.__new__(self.__class__)
+        document.__dict__.update(self.__dict__)
+        return document
+
+    def __deepcopy__(self, memo):
+        document = self.__class__.__new__(self.__class__)
+        memo[id(self)] = document
+        document.__dict__.update(copy.deepcopy(self.__dict__, memo))
+        return document
+
+    @classmethod
+    def _collection_for_read(cls, kwargs):
+        """Returns the collection to read from, using the read preference
+        options popped from *kwargs* or those of the Document.
+
+        """
+        preference = read_preferences.resolve(
+            cls,
+            kwargs.pop("read_preference", None),
+            kwargs.pop("tag_sets", None),
+            kwargs.pop("max_staleness", None)
+        )
+
+        collection = cls.collection
+        if preference is None:
+            return collection
+        return collection.with_options(read_preference=preference)
+
+    @classmethod
+    def _unique_error_field(cls, message):
+        """Returns the name of the field(s) in the unique index named in the
+        DuplicateKeyError *message*.
+
+        """
+        name = re.search(
+            r'index: (?:\S*\$)?(\S+)\s+dup key', message).group(1)
+        if name.endswith(cls.__UNIQUE_INDEX_SUFFIX__):
+            return name[:-len(cls.__UNIQUE_INDEX_SUFFIX__)]
+
+        for index in cls.__indexes__:
+            if name == index.name:
+                return "_".join(index.attribute_names())
+        return name
 
     @property
     def bson_id(self):
@@ -75,19 +489,164 @@ class Document(BaseDocument):
         return self._id
 
     @classmethod
-    def count(cls):
-        """Returns the total number of documents in the collection."""
-        return cls.collection.count()
+    def aggregate(
+        cls, pipeline, hydrate=False, allow_disk_use=True, batch_size=None,
+        **kwargs
+    ):
+        """Runs the aggregation *pipeline* on the collection and returns an
+        iterator that streams the results. Field references ("$field"),
+        $match specs, $sort keys and $project inclusions use the field
+        attribute names, which are translated up to the first stage that
+        reshapes the documents, such as $group. Accepts the read preference
+        options of *find*.
+
+        hydrate        -- return Documents instead of dictionaries; use with
+                          pipelines that output the Document's fields,
+                          which are loaded without validating them again
+        allow_disk_use -- let the server use temporary files for large
+                          stages; default is True
+        batch_size     -- number of results per batch from the server
+
+        """
+        pipeline = translate_pipeline(cls, pipeline)
+        cursor_options = {}
+        if batch_size:
+            cursor_options["batchSize"] = batch_size
+
+        operation = Operation("aggregate", cls)
+        with operation:
+            collection = cls._collection_for_read(kwargs)
+            with operation.phase("network"):
+                results = collection.aggregate(
+                    pipeline,
+                    allowDiskUse=allow_disk_use,
+                    cursor=cursor_options,
+                    **kwargs
+                )
+
+        logger.info(
+            "(%ss) %s AGGREGATE %s",
+            operation.duration_in_seconds(),
+            cls.__name__,
+            pipeline
+        )
+        operation.emit()
+
+        if isinstance(results, dict):
+            results = iter(results["result"])
+        if hydrate:
+            return (cls._trusted(result) for result in results)
+        return results
+
+    @classmethod
+    def export_jsonl(cls, fileobj, spec=None, fields=None, **kwargs):
+        """Streams the documents that match *spec* to *fileobj* as JSON
+        Lines, without creating Documents; *fields* limits the export to the
+        given field attribute names. Returns a tavi.jsonl.TransferReport.
+        See tavi.jsonl.export_jsonl.
+
+        """
+        return jsonl.export_jsonl(cls, fileobj, spec, fields, **kwargs)
+
+    @classmethod
+    def import_jsonl(cls, fileobj, batch_size=1000, validate=True):
+        """Inserts the JSON Lines documents in *fileobj* in batches of
+        *batch_size*, skipping invalid documents unless *validate* is False.
+        Returns a tavi.jsonl.TransferReport. See tavi.jsonl.import_jsonl.
+
+        """
+        return jsonl.import_jsonl(cls, fileobj, batch_size, validate)
+
+    @classmethod
+    def count(cls, spec=None, estimated=False, cache_ttl=None, **kwargs):
+        """Returns the number of documents in the collection that match
+        *spec*, or the total number if no *spec* is given. Accepts the read
+        preference options of *find*.
+
+        estimated -- return the count from the collection metadata instead
+                     of counting documents; cannot be combined with *spec*
+        cache_ttl -- reuse a count made up to *cache_ttl* seconds ago. The
+                     cache is cleared when this process inserts (or
+                     upserts) or deletes a Document of this class, and
+                     keeps up to COUNT_CACHE_SIZE counts.
+
+        """
+        if estimated and spec:
+            raise TaviError("an estimated count cannot have a spec")
+
+        key = None
+        if cache_ttl:
+            key = dumps([spec, estimated, kwargs], sort_keys=True)
+            cached = cls._count_cache.get(key)
+            if cached:
+                if cached[0] > clock():
+                    return cached[1]
+                del cls._count_cache[key]
+
+        operation = Operation("count", cls)
+        with operation:
+            collection = cls._collection_for_read(kwargs)
+            with operation.phase("network"):
+                if estimated:
+                    count = getattr(
+                        collection, "estimated_document_count",
+                        collection.count)()
+                elif hasattr(collection, "count_documents"):
+                    count = collection.count_documents(spec or {})
+                elif spec:
+                    count = collection.find(spec).count()
+                else:
+                    count = collection.count()
+
+        logger.info(
+            "(%ss) %s COUNT %s%s",
+            operation.duration_in_seconds(),
+            cls.__name__,
+            spec,
+            " (estimated)" if estimated else ""
+        )
+        operation.emit()
+
+        if key:
+            cls._cache_count(key, clock() + cache_ttl, count)
+        return count
+
+    @classmethod
+    def _cache_count(cls, key, expires_at, count):
+        """Caches *count* until *expires_at*. When the cache is full, the
+        expired counts are removed, then the count that expires first.
+
+        """
+        cache = cls._count_cache
+        if key not in cache and len(cache) >= COUNT_CACHE_SIZE:
+            now = clock()
+            for cached_key, (cached_expires_at, _) in cache.items():
+                if cached_expires_at <= now:
+                    del cache[cached_key]
+            if len(cache) >= COUNT_CACHE_SIZE:
+                del cache[min(cache, key=lambda k: cache[k][0])]
+        cache[key] = (expires_at, count)
+
+    @classmethod
+    def _invalidate_counts(cls):
+        cls._count_cache.clear()
 
     def delete(self):
         """Removes the Document from the collection."""
-        timer = Timer()
-        with timer:
-            result = self.__class__.collection.remove({"_id": self._id})
+        read_preferences.record_write()
+        operation = Operation("delete", self.__class__)
+        with operation:
+            with operation.phase("network"):
+                result = self.__class__.collection.remove({"_id": self._id})
+        self.__class__._invalidate_counts()
+
+        current = references.current_identity_map()
+        if current is not None:
+            current.remove(self)
 
         logger.info(
             "(%ss) %s DELETE %s",
-            timer.duration_in_seconds(),
+            operation.duration_in_seconds(),
             self.__class__.__name__,
             self._id
         )
@@ -95,26 +654,72 @@ class Document(BaseDocument):
         if result.get("err"):
             logger.error(result.get("err"))
 
+        operation.count = result.get("n", 0)
+        operation.emit()
+
     @classmethod
     def find(cls, *args, **kwargs):
         """Returns all Documents in collection that meet criteria. Wraps
         pymongo's *find* method and supports all of the same arguments.
+        The Documents are returned in a tavi.query.ResultSet, a list that
+        runs the find when it is first used. It can also export the results
+        with *to_columns*, which reads them straight into columns when the
+        Documents were not read yet, and resolve their references with
+        *prefetch*.
+
+        *read_preference* (a mode name such as "secondaryPreferred"),
+        *tag_sets* and *max_staleness* override the Document's read
+        preference for this call.
+
+        *lazy* (default: the Document's *__lazy__*) keeps each result as raw
+        BSON and decodes each field of a Document when it is first used;
+        saving such a Document only sends the fields that may have changed.
+        It needs pymongo 3.2 or later, or the memory backend; otherwise the
+        results are decoded as usual.
 
         """
-        timer = Timer()
-        with timer:
-            results = cls.collection.find(*args, **kwargs)
+        args, paged = cls._page_lists(args, kwargs)
+        collection, hydrate = cls._reader(kwargs, paged)
+
+        def load():
+            operation = Operation("find", cls)
+            with operation:
+                with operation.phase("network"):
+                    results = list(collection.find(*args, **kwargs))
+                with operation.phase("hydrate"):
+                    documents = [hydrate(result) for result in results]
+
+            operation.count = len(documents)
+            operation.measure(*results)
+
+            logger.info(
+                "(%ss) %s FIND %s, %s (%s record(s) found)",
+                operation.duration_in_seconds(),
+                cls.__name__,
+                args,
+                kwargs,
+                operation.count
+            )
+
+            operation.emit()
+            return documents
+
+        def find_with(projection):
+            options = dict(kwargs)
+            options.pop("fields", None)
+            options.pop("projection", None)
+            spec = args[0] if args else None
+            return collection.find(spec, projection, *args[2:], **options)
+
+        return ResultSet(cls, load, find_with)
 
-        logger.info(
-            "(%ss) %s FIND %s, %s (%s record(s) found)",
-            timer.duration_in_seconds(),
-            cls.__name__,
-            args,
-            kwargs,
-            results.count()
-        )
+    @classmethod
+    def where(cls, *specs, **conditions):
+        """Returns a tavi.query.Query for the Documents that match the query
+        *specs* and *conditions*, which use field attribute names.
 
-        return [cls(**result) for result in results]
+        """
+        return Query(cls).where(*specs, **conditions)
 
     @classmethod
     def find_all(cls):
@@ -132,28 +737,36 @@ class Document(BaseDocument):
     @classmethod
     def find_one(cls, spec_or_id=None, *args, **kwargs):
         """Returns one Document that meets criteria. Wraps pymongo's find_one
-        method and supports all of the same arguments.
+        method and supports all of the same arguments, plus the read
+        preference and *lazy* options of *find*.
 
         """
-        timer = Timer()
-        with timer:
-            result = cls.collection.find_one(spec_or_id, *args, **kwargs)
+        operation = Operation("find_one", cls)
+        found_record = None
+        args, paged = cls._page_lists((spec_or_id,) + args, kwargs)
 
-        found_record, num_found = None, 0
+        with operation:
+            collection, hydrate = cls._reader(kwargs, paged)
+            with operation.phase("network"):
+                result = collection.find_one(*args, **kwargs)
 
-        if result:
-            found_record, num_found = cls(**result), 1
+            if result is not None:
+                with operation.phase("hydrate"):
+                    found_record = hydrate(result)
+                operation.count = 1
+                operation.measure(result)
 
         logger.info(
             "(%ss) %s FIND ONE %s, %s, %s (%s record(s) found)",
-            timer.duration_in_seconds(),
+            operation.duration_in_seconds(),
             cls.__name__,
             spec_or_id,
-            args,
+            args[1:],
             kwargs,
-            num_found
+            operation.count
         )
 
+        operation.emit()
         return found_record
 
     def save(self, w=1, wtimeout=0, j=False):
@@ -181,17 +794,19 @@ class Document(BaseDocument):
         http://docs.mongodb.org/manual/core/write-concern/
 
         """
-        if not self.valid:
-            return False
-
         write_opts = frozenset(["w", "j", "wtimeout"])
         kwargs = {k: v for k, v in locals().iteritems() if k in write_opts}
 
         operation = Update if self.bson_id else Insert
         operation = operation(self, **kwargs)
 
-        timer = Timer()
-        with timer:
+        with operation.metrics:
+            with operation.metrics.phase("validate"):
+                valid = self.valid
+
+            if not valid:
+                return False
+
             try:
                 operation.execute()
             except pymongo.errors.PyMongoError as e:
@@ -204,23 +819,64 @@ class Document(BaseDocument):
                         operation.name,
                         e.message
                     )
-                    f = re.search(r'\$(.+)_unique_index', e.message).group(1)
-                    self.errors.add(f, "must be unique")
+                    self.errors.add(
+                        self._unique_error_field(e.message), "must be unique")
                     return False
                 raise
 
         self.changed_fields = set()
 
+        current = references.current_identity_map()
+        if current is not None:
+            current.add(self)
+
         logger.info(
             "(%ss) %s %s %s, %s",
-            timer.duration_in_seconds(),
+            operation.metrics.duration_in_seconds(),
             self.__class__.__name__,
             operation.name,
-            self.mongo_field_values,
+            operation.values,
             self._id
         )
+
+        operation.metrics.emit()
         return True
 
+    def save_async(self, executor=None, **kwargs):
+        """Saves the Document in a thread and returns a
+        concurrent.futures.Future that resolves to the result of *save*.
+        **kwargs** are the write concern options of *save*.
+
+        *executor* defaults to the shared tavi.executors.BoundedExecutor;
+        this call blocks while the executor has no free slot.
+
+        """
+        return (executor or executors.shared()).submit(self.save, **kwargs)
+
+    @classmethod
+    def save_many_concurrently(cls, documents, max_workers=None, **kwargs):
+        """Saves *documents* concurrently and returns the list of *save*
+        results, in the same order. Errors (including unique index
+        violations) are added to each Document's *errors*, as with *save*.
+        **kwargs** are the write concern options of *save*.
+
+        Uses a pool of *max_workers* threads for this call if given, or the
+        shared executor otherwise. Documents are only taken from *documents*
+        as slots free up, so it can be a generator.
+
+        """
+        if max_workers:
+            with executors.BoundedExecutor(max_workers) as executor:
+                return cls._save_many(documents, executor, kwargs)
+        return cls._save_many(documents, executors.shared(), kwargs)
+
+    @classmethod
+    def _save_many(cls, documents, executor, kwargs):
+        futures = [
+            document.save_async(executor, **kwargs) for document in documents
+        ]
+        return [future.result() for future in futures]
+
 
 class EmbeddedDocument(BaseDocument):
     """Represents a single EmbeddedDocument. Supports an *owner* attribute that
@@ -231,5 +887,39 @@ class EmbeddedDocument(BaseDocument):
         super(EmbeddedDocument, self).__init__(**kwargs)
         self.owner = None
 
+    @classmethod
+    def _trusted(cls, attrs):
+        """Returns an EmbeddedDocument for *attrs*, keyed by field attribute
+        name, without validating the field values again.
+
+        """
+        if _overrides_init(cls, EmbeddedDocument):
+            return cls(**attrs)
+
+        document = cls.__new__(cls)
+        document._load_trusted(attrs)
+        document.owner = None
+        return document
+
     def __eq__(self, other):
-        return other and self.field_values == other.field_values
+        """Compares the field values one at a time, like comparing the
+        *field_values* of both Documents but without building them.
+
+        """
+        names = getattr(other, "_field_names", None)
+        if names is not self._field_names and names != self._field_names:
+            return False
+
+        stored = self._compared_as_stored
+        for field in self._field_names:
+            # Typed arrays compare item by item, and references would read
+            # the referenced Documents, so their stored values are compared
+            read = get_field_attr if field in stored else getattr
+            value, other_value = read(self, field), read(other, field)
+            if not value == other_value and \
+                    not (_is_empty(value) and _is_empty(other_value)):
+                return False
+        return True
+
+    def __ne__(self, other):
+        return not self == other
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""Provides the thread pool used for concurrent Document operations.
+
+The pool is shared by every Document and has five threads per CPU by
+default, like concurrent.futures; use *configure* to size it for the
+connection pool (*max_pool_size*) of the pymongo client. Submitting to it
+blocks once *max_pending* operations are queued or running, so producers
+that outrun the pool are slowed down instead of buffering an unbounded
+number of Documents in memory.
+
+"""
+from concurrent.futures import ThreadPoolExecutor
+import multiprocessing
+import threading
+
+DEFAULT_MAX_WORKERS = multiprocessing.cpu_count() * 5
+
+_lock = threading.Lock()
+_shared = None
+_settings = {}
+
+
+class BoundedExecutor(object):
+    """A ThreadPoolExecutor whose *submit* blocks while *max_pending* futures
+    are outstanding.
+
+    max_workers -- number of threads
+    max_pending -- number of queued and running calls allowed before *submit*
+                   blocks; default is four times *max_workers*
+
+    """
+    def __init__(self, max_workers=None, max_pending=None):
+        self.max_workers = max_workers or DEFAULT_MAX_WORKERS
+        self.max_pending = max_pending or self.max_workers * 4
+        self._executor = ThreadPoolExecutor(self.max_workers)
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+
+    def submit(self, function, *args, **kwargs):
+        """Schedules *function* to be called with *args* and *kwargs* and
+        returns a concurrent.futures.Future. Blocks until a slot is free.
+
+        """
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(function, *args, **kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def shutdown(self, wait=True):
+        """Frees the threads once the pending calls are done."""
+        self._executor.shutdown(wait)
+
+
+def configure(max_workers=None, max_pending=None):
+    """Sets the size of the shared executor. An existing shared executor is
+    shut down after its pending calls are done.
+
+    """
+    global _shared
+    with _lock:
+        _settings.update(max_workers=max_workers, max_pending=max_pending)
+        previous, _shared = _shared, None
+
+    if previous:
+        previous.shutdown(wait=False)
+
+
+def shared():
+    """Returns the shared BoundedExecutor, creating it if needed."""
+    global _shared
+    if _shared is None:
+        with _lock:
+            if _shared is None:
+                _shared = BoundedExecutor(**_settings)
+    return _shared
+
+
+def reset():
+    """Forgets the shared executor without shutting it down. Used in a
+    forked process, where the threads of the parent's executor do not
+    exist.
+
+    """
+    global _lock, _shared
+    _lock = threading.Lock()
+    _shared = None
@@ -6,9 +6,12 @@ import datetime
 from bson import ObjectId
 from pymongo.errors import InvalidId
 from tavi import EmbeddedList
+from tavi.base.documents import BaseDocument
 from tavi.base.fields import BaseField
-from tavi.documents import EmbeddedDocument
+from tavi.documents import Document, EmbeddedDocument
 from tavi.errors import TaviTypeError
+from tavi import arrays
+from tavi import references
 
 
 class BooleanField(BaseField):
@@ -16,6 +19,8 @@ class BooleanField(BaseField):
     validations of *BaseField*.
 
     """
+    column_type = "bool"
+
     def validate(self, instance, value):
         super(BooleanField, self).validate(instance, value)
 
@@ -28,6 +33,8 @@ class DateTimeField(BaseField):
     Supports all the validations in *BaseField*.
 
     """
+    column_type = "datetime64"
+
     def validate(self, instance, value):
         """Validates the field."""
         super(DateTimeField, self).validate(instance, value)
@@ -45,6 +52,8 @@ class FloatField(BaseField):
     max_value -- validates the maximum value the field value can be
 
     """
+    column_type = "float64"
+
     def __init__(self, name, min_value=None, max_value=None, **kwargs):
         super(FloatField, self).__init__(name, **kwargs)
 
@@ -84,6 +93,8 @@ class IntegerField(BaseField):
     max_value -- validates the maximum value the field value can be
 
     """
+    column_type = "int64"
+
     def __init__(self, name, min_value=None, max_value=None, **kwargs):
         super(IntegerField, self).__init__(name, **kwargs)
 
@@ -154,6 +165,8 @@ class StringField(BaseField):
                   pattern; default is *None*
 
     """
+    column_type = "string"
+
     def __init__(
         self, name,
         length=None, min_length=None, max_length=None, pattern=None,
@@ -216,25 +229,35 @@ class EmbeddedField(BaseField):
     """Represents an embedded Mongo document. Raises a TaviTypeError if *doc*
     is not a tavi.document.EmbeddedDocument.
 
+    Each instance gets its own embedded document, created the first time the
+    field is read if it has not been set.
+
     """
     def __init__(self, name, doc, **kwargs):
         super(EmbeddedField, self).__init__(name, **kwargs)
-        doc_instance = doc()
 
-        if not isinstance(doc_instance, EmbeddedDocument):
+        if not (isinstance(doc, type) and issubclass(doc, EmbeddedDocument)):
             raise TaviTypeError(
                 "expected %s to be a subclass of "
-                "tavi.document.EmbeddedDocument" %
-                doc_instance.__class__.__name__
+                "tavi.document.EmbeddedDocument" % doc.__name__
             )
 
         self.doc_class = doc
-        self.value = self.default or doc_instance
 
     def __get__(self, instance, owner):
-        return self.value
+        if instance is None:
+            return self
+        self._load(instance)
+        if self.attribute_name not in instance.__dict__:
+            instance.__dict__[self.attribute_name] = None
+            if self.default:
+                self.__set__(instance, self.default)
+            else:
+                instance.__dict__[self.attribute_name] = self.doc_class()
+        return instance.__dict__[self.attribute_name]
 
     def __set__(self, instance, value):
+        self._load(instance)
         if value:
             if not isinstance(value, EmbeddedDocument):
                 raise TaviTypeError(
@@ -243,29 +266,149 @@ class EmbeddedField(BaseField):
                     value.__class__
                 )
 
-            if not self.value:
-                self.value = self.doc_class()
+            current = instance.__dict__.get(self.attribute_name)
+            if not current:
+                current = self.doc_class()
+                instance.__dict__[self.attribute_name] = current
 
             for field in value.fields:
                 embedded_value = getattr(value, field, None)
-                setattr(self.value, field, embedded_value)
+                setattr(current, field, embedded_value)
         else:
-            self.value = value
+            instance.__dict__[self.attribute_name] = value
+
+
+class ReferenceField(BaseField):
+    """Represents a reference to another Mongo Document, stored as its
+    ObjectId. Raises a TaviTypeError if *doc* is not a subclass of
+    tavi.document.Document.
+
+    The field can be set to a Document of *doc*, an ObjectId or its string.
+    Reading the field returns the referenced Document, which is read from
+    Mongo the first time, or None if it does not exist. To read the
+    referenced Documents of many Documents at once, see
+    tavi.references.prefetch.
+
+    Supports all the validations in *BaseField*.
+
+    """
+    def __init__(self, name, doc, **kwargs):
+        super(ReferenceField, self).__init__(name, **kwargs)
+
+        if not (isinstance(doc, type) and issubclass(doc, Document)):
+            raise TaviTypeError(
+                "expected %s to be a subclass of tavi.document.Document" %
+                doc.__name__
+            )
+
+        self.document_class = doc
+        # Not a valid Mongo field name, so it cannot clash with a field
+        self.document_attribute = "_%s.document" % name
+
+    def reference_id(self, instance):
+        """Returns the ObjectId stored in the field of *instance*."""
+        self._load(instance)
+        return instance.__dict__.get(self.attribute_name)
+
+    def cached(self, instance):
+        """Returns the referenced Document of *instance* if it has been read,
+        or None.
+
+        """
+        document = instance.__dict__.get(self.document_attribute)
+        if document is not None and \
+                document.bson_id == self.reference_id(instance):
+            return document
+        return None
+
+    def cache(self, instance, document):
+        """Keeps *document* as the referenced Document of *instance*."""
+        instance.__dict__[self.document_attribute] = document
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+
+        bson_id = self.reference_id(instance)
+        if bson_id is None:
+            return None
+
+        document = self.cached(instance)
+        if document is None:
+            document = references.resolve(self.document_class, bson_id)
+            if document is not None:
+                self.cache(instance, document)
+        return document
+
+    def __set__(self, instance, raw_value):
+        document = None
+        if isinstance(raw_value, Document):
+            if not isinstance(raw_value, self.document_class):
+                raise TaviTypeError(
+                    "expected %s to be a %s" % (
+                        raw_value.__class__.__name__,
+                        self.document_class.__name__)
+                )
+            document, value = raw_value, raw_value.bson_id
+        elif raw_value is not None:
+            try:
+                value = ObjectId(raw_value)
+            except (InvalidId, TypeError):
+                value = raw_value
+        else:
+            value = None
+
+        super(ReferenceField, self).__set__(instance, value)
+
+        if document is not None:
+            if value is None:
+                instance.errors.add(self.name, "must be saved first")
+            else:
+                self.cache(instance, document)
+
+    def validate(self, instance, value):
+        """Validates the field."""
+        super(ReferenceField, self).validate(instance, value)
+
+        if value is not None and not isinstance(value, ObjectId):
+            instance.errors.add(self.name, "must be a valid Object Id")
 
 
 class ListField(BaseField):
-    """Represents a list of embedded document fields."""
-    def __init__(self, name, type_, **kwargs):
+    """Represents a list of embedded document fields.
+
+    key       -- the attribute name of a field of *type_* that the items are
+                 indexed by; see tavi.EmbeddedList. Default is *None*
+
+    lazy      -- read only the first *page_size* items with the Document
+                 and the next ones a page at a time when they are used; see
+                 tavi.EmbeddedList. Default is *False*
+
+    page_size -- the number of items per page of a lazy list; default is
+                 100
+
+    """
+    def __init__(self, name, type_, key=None, lazy=False, page_size=100,
+                 **kwargs):
         super(ListField, self).__init__(name, **kwargs)
+        EmbeddedList._check_item_type(type_)
         self._type = type_
+        self.key = key
+        self.lazy = lazy
+        self.page_size = page_size
 
     def __get__(self, instance, owner):
+        self._load(instance)
         if self.attribute_name not in instance.__dict__:
-            setattr(
-                instance,
-                self.attribute_name,
-                EmbeddedList(self.name, self._type)
+            items = EmbeddedList(
+                self.name,
+                self._type,
+                self.key,
+                self.page_size if self.lazy else None
             )
+            if isinstance(instance, BaseDocument):
+                items.owner = instance
+            setattr(instance, self.attribute_name, items)
         return getattr(instance, self.attribute_name)
 
     def __set__(self, instance, value):
@@ -289,11 +432,17 @@ class ArrayField(BaseField):
     validate_item -- a function which is run against each item in the field.
                      Must accept the ArrayField instance, the Document
                      instance, and the item as arguments.  Default is *None*
+
+    validate_items -- a function, or a list of functions, which is run once
+                      against all the items in the field. Must accept the
+                      ArrayField instance, the Document instance, and the
+                      list of items as arguments. See tavi.validators for
+                      the built-in ones. Default is *None*
     """
     def __init__(
         self, name,
         length=None, min_length=None, max_length=None, pattern=None,
-        validate_item=None, **kwargs
+        validate_item=None, validate_items=None, **kwargs
     ):
         super(ArrayField, self).__init__(name, **kwargs)
 
@@ -304,6 +453,15 @@ class ArrayField(BaseField):
             raise ValueError("validate_item must be callable or None")
         self.validate_item = validate_item
 
+        if validate_items is None:
+            validate_items = []
+        elif callable(validate_items):
+            validate_items = [validate_items]
+        if not all(callable(validator) for validator in validate_items):
+            raise ValueError(
+                "validate_items must be callable, a list of callables or None")
+        self.validate_items = list(validate_items)
+
     def validate(self, instance, value):
         """Validates the field."""
         super(ArrayField, self).validate(instance, value)
@@ -338,7 +496,13 @@ class ArrayField(BaseField):
             for item in value:
                 self.validate_item(self, instance, item)
 
+        # Values that are not lists were reported above
+        if isinstance(value, collections.MutableSequence):
+            for validator in self.validate_items:
+                validator(self, instance, value)
+
     def __get__(self, instance, owner):
+        self._load(instance)
         if self.attribute_name not in instance.__dict__:
             setattr(
                 instance,
@@ -346,3 +510,118 @@ class ArrayField(BaseField):
                 []
             )
         return getattr(instance, self.attribute_name) or []
+
+
+class TypedArrayField(BaseField):
+    """Represents an array of numbers of a single *dtype*, such as a vector
+    of sensor readings, stored in Mongo as one binary value rather than as
+    a BSON array. The field can be set to an array, a sequence of numbers
+    or the binary value; its value is a NumPy array when NumPy is installed
+    and an *array.array* otherwise. See tavi.arrays.
+
+    dtype         -- the type of the numbers; one of tavi.arrays.DTYPES.
+                     Default is "float64"
+
+    Supports all the validations in *BaseField* and the following, which
+    check the whole array at once:
+
+    length        -- validates the field value has an exact length; default is
+                     *None*
+
+    min_length    -- ensures field has a minimum number of items; default is
+                     *None*
+
+    max_length    -- ensures field is not more than a maximum number of
+                     items; default is *None*
+
+    min_value     -- validates the minimum value of the items; default is
+                     *None*
+
+    max_value     -- validates the maximum value of the items; default is
+                     *None*
+
+    """
+    def __init__(
+        self, name, dtype="float64",
+        length=None, min_length=None, max_length=None,
+        min_value=None, max_value=None, **kwargs
+    ):
+        super(TypedArrayField, self).__init__(name, **kwargs)
+        arrays.check_dtype(dtype)
+
+        self.dtype = dtype
+        self.length = length
+        self.min_length = min_length
+        self.max_length = max_length
+        self.min_value = min_value
+        self.max_value = max_value
+
+    def __set__(self, instance, value):
+        if value is not None:
+            try:
+                value = arrays.load(value, self.dtype)
+            except (TypeError, ValueError, OverflowError):
+                pass    # reported by validate
+
+        super(TypedArrayField, self).__set__(instance, value)
+
+    def pack(self, instance):
+        """Returns the value of the field of *instance* as it is stored in
+        Mongo.
+
+        """
+        value = self.__get__(instance, type(instance))
+        if arrays.is_array(value, self.dtype):
+            return arrays.pack(value)
+        return value
+
+    def validate(self, instance, value):
+        """Validates the field."""
+        super(TypedArrayField, self).validate(instance, value)
+        if value is None:
+            return
+
+        if not arrays.is_array(value, self.dtype):
+            instance.errors.add(
+                self.name, "must be an array of %s numbers" % self.dtype)
+            return
+
+        val_length = len(value)
+
+        if self.required and not val_length:
+            instance.errors.add(self.name, "is required")
+
+        if self.length and self.length != val_length:
+            instance.errors.add(
+                self.name,
+                "is the wrong length (should be %s items)" % self.length
+            )
+
+        if self.min_length and val_length < self.min_length:
+            instance.errors.add(
+                self.name,
+                "is too short (minimum is %s items)" % self.min_length
+            )
+
+        if self.max_length and val_length > self.max_length:
+            instance.errors.add(
+                self.name,
+                "is too long (maximum is %s items)" % self.max_length
+            )
+
+        if val_length and (None, None) != (self.min_value, self.max_value):
+            low, high = arrays.bounds(value)
+
+            if self.min_value is not None and low < self.min_value:
+                instance.errors.add(
+                    self.name,
+                    "has an item that is too small (minimum is %s)" %
+                    self.min_value
+                )
+
+            if self.max_value is not None and high > self.max_value:
+                instance.errors.add(
+                    self.name,
+                    "has an item that is too big (maximum is %s)" %
+                    self.max_value
+                )
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""Provides declarative index definitions for Documents.
+
+Indexes are declared on a Document class using the *__indexes__*
+attribute::
+
+    class Event(Document):
+        __indexes__ = [
+            Index("kind", "-created_at"),
+            Index("created_at", expire_after_seconds=3600),
+            Index("user_id", sparse=True),
+            Index("email", unique=True, partial_filter={"active": True})
+        ]
+
+Index keys and partial filters use the attribute names of the Document's
+fields; they are translated to the names persisted in Mongo. Prefix a key
+with "-" for a descending index.
+
+"""
+import pymongo
+from tavi.errors import TaviError
+from tavi.query import mongo_name, translate_spec
+
+_OPTIONS = {
+    "unique": "unique",
+    "sparse": "sparse",
+    "expire_after_seconds": "expireAfterSeconds",
+    "partial_filter": "partialFilterExpression",
+    "background": "background"
+}
+
+# Options that make two indexes on the same keys different
+_COMPARED_OPTIONS = frozenset(
+    ["unique", "sparse", "expireAfterSeconds", "partialFilterExpression"])
+
+
+class Index(object):
+    """Declares an index on one or more fields of a Document.
+
+    keys                 -- field attribute names, prefixed with "-" for
+                            descending order
+    name                 -- name of the index; generated from the keys if
+                            not given
+    unique               -- enforce unique values; default is *False*
+    sparse               -- only index documents that have the fields;
+                            default is *False*
+    expire_after_seconds -- makes this a TTL index on a date field
+    partial_filter       -- only index documents matching this query
+    background           -- build without blocking the collection; default
+                            is *True*
+
+    """
+    def __init__(self, *keys, **options):
+        if not keys:
+            raise TaviError("an Index needs at least one key")
+
+        unknown = set(options) - set(_OPTIONS) - set(["name"])
+        if unknown:
+            raise TaviError(
+                "unknown Index option(s): %s" % ", ".join(sorted(unknown)))
+
+        self.keys = keys
+        self.name = options.pop("name", None)
+        options.setdefault("background", True)
+        self.options = options
+
+    def __repr__(self):
+        return "Index(%s)" % ", ".join(
+            [repr(k) for k in self.keys] +
+            ["%s=%r" % item for item in sorted(self.options.items())])
+
+    def attribute_names(self):
+        """Returns the attribute names of the indexed fields."""
+        return [key.lstrip("-") for key in self.keys]
+
+    def key(self, document_class):
+        """Returns the index key as a list of (mongo name, direction)."""
+        return [
+            (
+                mongo_name(document_class, key.lstrip("-")),
+                pymongo.DESCENDING if key.startswith("-")
+                else pymongo.ASCENDING
+            )
+            for key in self.keys
+        ]
+
+    def spec(self, document_class):
+        """Returns a (key, options) pair suitable for passing to pymongo's
+        *create_index*.
+
+        """
+        options = {}
+        for option, value in self.options.items():
+            if "partial_filter" == option:
+                value = translate_spec(document_class, value)
+            options[_OPTIONS[option]] = value
+
+        key = self.key(document_class)
+        options["name"] = self.name or "_".join(
+            "%s_%s" % pair for pair in key)
+        return key, options
+
+
+class IndexDiff(object):
+    """The differences between the declared and existing indexes of a
+    Document collection.
+
+    missing -- (key, options) specs for declared indexes that do not exist
+    changed -- (key, options) specs for declared indexes that exist with
+               different options
+    extra   -- names of existing indexes that are not declared
+
+    """
+    def __init__(self, missing, changed, extra):
+        self.missing = missing
+        self.changed = changed
+        self.extra = extra
+
+    def __repr__(self):
+        return "<IndexDiff missing=%r changed=%r extra=%r>" % (
+            [options["name"] for _, options in self.missing],
+            [options["name"] for _, options in self.changed],
+            self.extra
+        )
+
+    @property
+    def in_sync(self):
+        """Indicates if no declared index is missing or changed."""
+        return not (self.missing or self.changed)
+
+
+def _compared(options):
+    return dict(
+        (k, v) for k, v in options.items()
+        if k in _COMPARED_OPTIONS and not (v is None or v is False)
+    )
+
+
+def diff(collection, specs):
+    """Compares the (key, options) *specs* against the indexes that exist on
+    *collection* and returns an IndexDiff.
+
+    """
+    existing = dict(
+        (name, info) for name, info in collection.index_information().items()
+        if "_id_" != name
+    )
+
+    missing, changed, matched = [], [], set()
+    for key, options in specs:
+        same_key = [
+            name for name, info in existing.items()
+            if [tuple(k) for k in info["key"]] == key
+        ]
+        same = [
+            name for name in same_key
+            if _compared(existing[name]) == _compared(options)
+        ]
+
+        if same:
+            matched.update(same)
+        elif same_key or options["name"] in existing:
+            changed.append((key, options))
+            matched.update(same_key)
+        else:
+            missing.append((key, options))
+
+    extra = sorted(set(existing) - matched - set(
+        options["name"] for _, options in changed))
+    return IndexDiff(missing, changed, extra)
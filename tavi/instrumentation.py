@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+"""Provides hooks for collecting metrics about Document operations.
+
+Listeners are registered with *register* and are called with an
+*OperationEvent* every time a Document finds, inserts, updates or deletes
+records. For example::
+
+    import tavi.instrumentation
+
+    histograms = tavi.instrumentation.HistogramAggregator()
+    tavi.instrumentation.register(histograms)
+
+    # ... use your Documents ...
+
+    histograms.dump()["operations"]["find"]["p95"]
+
+"""
+import contextlib
+import logging
+import math
+import threading
+from bson import BSON
+from tavi.utils.timer import Timer, clock
+
+logger = logging.getLogger(__name__)
+
+_listeners = []
+
+
+def register(listener):
+    """Registers *listener* to receive metrics events. *listener* must be a
+    callable that accepts a single *OperationEvent* argument.
+
+    """
+    if not callable(listener):
+        raise ValueError("listener must be callable")
+
+    if listener not in _listeners:
+        _listeners.append(listener)
+    return listener
+
+
+def unregister(listener):
+    """Stops sending metrics events to *listener*."""
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+
+def enabled():
+    """Indicates if there are any registered listeners."""
+    return len(_listeners) > 0
+
+
+def emit(event):
+    """Sends *event* to all registered listeners. Errors raised by a listener
+    are logged and do not affect the Document operation.
+
+    """
+    for listener in list(_listeners):
+        try:
+            listener(event)
+        except Exception:
+            logger.exception("Metrics listener %r failed", listener)
+
+
+class OperationEvent(object):
+    """Describes a single, completed Document operation.
+
+    operation    -- name of the operation, e.g. "find" or "insert"
+    class_name   -- name of the Document class
+    collection   -- name of the Document collection
+    phases       -- dictionary of phase name ("validate", "serialize",
+                    "network" or "hydrate") to duration in seconds
+    duration     -- total duration of the operation in seconds
+    count        -- number of documents affected or returned
+    payload_size -- number of BSON bytes sent or received
+
+    """
+    def __init__(
+        self, operation, class_name, collection,
+        phases, duration, count, payload_size
+    ):
+        self.operation = operation
+        self.class_name = class_name
+        self.collection = collection
+        self.phases = phases
+        self.duration = duration
+        self.count = count
+        self.payload_size = payload_size
+
+    def __repr__(self):
+        return "<OperationEvent %s.%s %.6fs (%s document(s), %s bytes)>" % (
+            self.class_name,
+            self.operation,
+            self.duration,
+            self.count,
+            self.payload_size
+        )
+
+
+class Operation(Timer):
+    """Times a single Document operation and each of its phases. Used as a
+    context manager around the whole operation, with *phase* wrapping the
+    individual steps.
+
+    """
+    def __init__(self, name, document_class):
+        super(Operation, self).__init__()
+        self.name = name
+        self.document_class = document_class
+        self.phases = {}
+        self.count = 0
+        self.payload_size = 0
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Adds the time spent in the wrapped block to the *name* phase."""
+        start = clock()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + clock() - start
+
+    def measure(self, *records):
+        """Adds the encoded BSON size of *records* to the payload size. Only
+        done if there are listeners, since encoding is not free. Raw BSON
+        records (with a *raw* attribute) are not encoded again.
+
+        """
+        if enabled():
+            self.payload_size += sum(
+                len(r.raw) if hasattr(r, "raw") else len(BSON.encode(r))
+                for r in records
+            )
+
+    def emit(self):
+        """Sends the collected measurements to all registered listeners."""
+        if not enabled():
+            return
+
+        emit(OperationEvent(
+            self.name,
+            self.document_class.__name__,
+            self.document_class.collection_name,
+            dict(self.phases),
+            self.elapsed,
+            self.count,
+            self.payload_size
+        ))
+
+
+class Histogram(object):
+    """A fixed-memory histogram of durations. Values are counted in
+    logarithmic buckets, so percentiles are accurate to within *precision*
+    (relative) regardless of how many values are recorded.
+
+    """
+    def __init__(self, precision=0.01, lowest=1e-6):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self._lowest = lowest
+        self._log_base = math.log(1 + 2 * precision)
+        self._buckets = {}
+
+    def record(self, value):
+        """Adds *value* to the histogram."""
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+        index = self._index(value)
+        self._buckets[index] = self._buckets.get(index, 0) + 1
+
+    def percentile(self, percent):
+        """Returns the value below which *percent* of the recorded values
+        fall, or None if nothing has been recorded.
+
+        """
+        if not self.count:
+            return None
+
+        rank = max(1, int(math.ceil(self.count * percent / 100.0)))
+        seen = 0
+        for index in sorted(self._buckets):
+            seen += self._buckets[index]
+            if seen >= rank:
+                return min(max(self._value(index), self.min), self.max)
+
+    def summary(self):
+        """Returns a dictionary with the count, mean, min, max, p50, p95 and
+        p99 of the recorded values.
+
+        """
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else None,
+            "min": self.min,
+            "max": self.max,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99)
+        }
+
+    def _index(self, value):
+        if value <= self._lowest:
+            return 0
+        return int(math.log(value / self._lowest) / self._log_base) + 1
+
+    def _value(self, index):
+        if 0 == index:
+            return self._lowest
+        return self._lowest * math.exp((index - 0.5) * self._log_base)
+
+
+class HistogramAggregator(object):
+    """A listener that keeps in-process latency histograms of every
+    operation, both overall and per Document class.
+
+    """
+    def __init__(self, precision=0.01):
+        self._precision = precision
+        self._lock = threading.Lock()
+        self.reset()
+
+    def __call__(self, event):
+        with self._lock:
+            for key in [event.operation, (event.class_name, event.operation)]:
+                if key not in self._histograms:
+                    self._histograms[key] = Histogram(self._precision)
+                self._histograms[key].record(event.duration)
+
+    def reset(self):
+        """Discards all recorded values."""
+        self._histograms = {}
+
+    def dump(self):
+        """Returns the p50/p95/p99 summaries. Summaries by operation are under
+        the "operations" key and summaries by Document class and operation
+        are under the "classes" key.
+
+        """
+        result = {"operations": {}, "classes": {}}
+        with self._lock:
+            for key, histogram in self._histograms.items():
+                if isinstance(key, tuple):
+                    class_name, operation = key
+                    by_class = result["classes"].setdefault(class_name, {})
+                    by_class[operation] = histogram.summary()
+                else:
+                    result["operations"][key] = histogram.summary()
+        return result
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""Provides streaming JSON Lines export and import for Documents.
+
+Each line holds one document as MongoDB Extended JSON (see
+bson.json_util), keyed by the field attribute names like
+*BaseDocument.to_json*, with the document's ObjectId under "id".
+
+"""
+import itertools
+import logging
+from bson.json_util import dumps, loads
+from tavi.columns import fields_for
+from tavi.instrumentation import Operation
+from tavi import read_preferences
+
+logger = logging.getLogger(__name__)
+
+
+class TransferReport(object):
+    """Describes a completed export or import.
+
+    rows    -- number of documents written or inserted
+    invalid -- number of lines that failed validation and were skipped
+    errors  -- list of (line number, error messages) of the invalid lines
+    seconds -- duration of the transfer in seconds
+
+    """
+    def __init__(self, rows, invalid, errors, seconds):
+        self.rows = rows
+        self.invalid = invalid
+        self.errors = errors
+        self.seconds = seconds
+
+    @property
+    def rows_per_second(self):
+        """The throughput of the transfer."""
+        return self.rows / self.seconds if self.seconds else float(self.rows)
+
+    def __repr__(self):
+        return "<TransferReport %s row(s) in %.3fs (%.0f rows/s)>" % (
+            self.rows, self.seconds, self.rows_per_second)
+
+
+def _log(operation, name, report):
+    logger.info(
+        "(%ss) %s %s %s row(s), %s invalid (%.0f rows/s)",
+        operation.duration_in_seconds(),
+        operation.document_class.__name__,
+        name,
+        report.rows,
+        report.invalid,
+        report.rows_per_second
+    )
+
+
+def export_jsonl(document_class, fileobj, spec=None, fields=None, **kwargs):
+    """Writes the documents of *document_class* that match *spec* to
+    *fileobj*, one JSON document per line. The cursor is streamed as is,
+    without creating Documents. Returns a TransferReport.
+
+    fields -- the attribute names of the fields to export; all fields by
+              default
+
+    Other keyword arguments are passed on to *find*.
+
+    """
+    names = document_class._attribute_names
+    projection = None
+    if fields is not None:
+        projection = dict(
+            (field.name, True)
+            for _, field in fields_for(document_class, fields)
+        )
+
+    operation = Operation("export_jsonl", document_class)
+    with operation:
+        collection = document_class._collection_for_read(kwargs)
+        with operation.phase("network"):
+            for record in collection.find(spec, projection, **kwargs):
+                document = dict(
+                    ("id" if "_id" == key else names.get(key, key), value)
+                    for key, value in record.items()
+                )
+                fileobj.write(dumps(document))
+                fileobj.write("\n")
+                operation.count += 1
+
+    report = TransferReport(operation.count, 0, [], operation.elapsed)
+    _log(operation, "EXPORT_JSONL", report)
+    operation.emit()
+    return report
+
+
+def _records(document_class, lines, validate, errors):
+    """Yields the Mongo records for the JSON *lines*, skipping blank lines
+    and, if *validate* is True, invalid documents, whose errors are added to
+    *errors*.
+
+    """
+    descriptors = document_class._field_descriptors
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+
+        attrs = loads(line)
+        bson_id = attrs.pop("id", attrs.pop("_id", None))
+
+        if validate:
+            document = document_class(**attrs)
+            if not document.valid:
+                errors.append((number, document.errors.full_messages))
+                continue
+            record = document.mongo_field_values
+            document_class._pop_sparse_nulls(record)
+        else:
+            record = dict(
+                (descriptors[key].name if key in descriptors else key, value)
+                for key, value in attrs.items()
+            )
+
+        if bson_id is not None:
+            record["_id"] = bson_id
+        yield record
+
+
+def import_jsonl(document_class, fileobj, batch_size=1000, validate=True):
+    """Inserts the documents in *fileobj*, one JSON document per line, into
+    the collection of *document_class*. Lines are parsed as they are read
+    and inserted in batches of *batch_size*. Returns a TransferReport.
+
+    validate -- check each document with the field validators (and
+                *__validate__*) and skip the invalid ones; default is True
+
+    Errors raised by Mongo, such as duplicate keys, are not caught; the
+    batches inserted before the error stay inserted.
+
+    """
+    errors = []
+    records = _records(document_class, fileobj, validate, errors)
+
+    operation = Operation("import_jsonl", document_class)
+    with operation:
+        collection = document_class.collection
+        while True:
+            with operation.phase("serialize"):
+                batch = list(itertools.islice(records, batch_size))
+            if not batch:
+                break
+
+            read_preferences.record_write()
+            with operation.phase("network"):
+                collection.insert(batch)
+            document_class._invalidate_counts()
+            operation.count += len(batch)
+
+    report = TransferReport(
+        operation.count, len(errors), errors, operation.elapsed)
+    _log(operation, "IMPORT_JSONL", report)
+    operation.emit()
+    return report
@@ -0,0 +1,507 @@
+# -*- coding: utf-8 -*-
+"""Provides a chainable query builder for Documents.
+
+Queries are built with the field attribute names of a Document, which are
+translated to the names persisted in Mongo::
+
+    User.where(last_name="Smith", age__gte=21).order_by("-created_at")
+
+Conditions are keyword arguments; an optional suffix after a double
+underscore selects an operator (e.g. *age__gte*) and double underscores
+also separate the fields of embedded documents (*address__city*). Query
+specs given as dictionaries are translated too.
+
+Nothing is sent to Mongo until a terminal operation is used: iterating the
+query or calling *all*, *stream*, *first*, *count*, *exists*, *distinct* or
+*to_columns*.
+
+"""
+import itertools
+import logging
+from tavi import columns
+from tavi.errors import TaviError
+from tavi.instrumentation import Operation
+from tavi import references
+
+logger = logging.getLogger(__name__)
+
+# Number of Documents whose references *stream* prefetches at once
+STREAM_BATCH_SIZE = 100
+
+OPERATORS = frozenset([
+    "all", "elemMatch", "exists", "gt", "gte", "in", "lt", "lte", "ne",
+    "nin", "regex", "size"
+])
+
+
+def mongo_name(document_class, attribute_name):
+    """Translates the field attribute name at the start of the dotted
+    *attribute_name* to the name persisted in Mongo. Embedded documents are
+    persisted with their attribute names, so the rest is left as is.
+
+    """
+    head, _, tail = attribute_name.partition(".")
+    field = document_class._field_descriptors.get(head)
+    if field is None:
+        if "_id" == head:
+            return attribute_name
+        raise TaviError(
+            "%s has no field named '%s'" % (document_class.__name__, head))
+    return field.name + ("." + tail if tail else "")
+
+
+def translate_spec(document_class, spec, strict=True):
+    """Translates the field attribute names used as keys in the query *spec*
+    to the names persisted in Mongo. Unless *strict*, names that are not
+    fields are left as they are instead of raising a TaviError.
+
+    """
+    if isinstance(spec, list):
+        return [translate_spec(document_class, s, strict) for s in spec]
+
+    if not isinstance(spec, dict):
+        return spec
+
+    name = mongo_name if strict else _stored_name
+    translated = {}
+    for key, value in spec.items():
+        if key.startswith("$"):
+            translated[key] = translate_spec(document_class, value, strict)
+        else:
+            translated[name(document_class, key)] = value
+    return translated
+
+
+# Stages after which documents no longer have the Document's fields
+_RESHAPING_STAGES = frozenset([
+    "$group", "$replaceRoot", "$count", "$bucket", "$bucketAuto", "$facet",
+    "$sortByCount"
+])
+
+# Stages that add fields of their own, which later stages may use
+_EXTENDING_STAGES = frozenset(["$project", "$addFields", "$set", "$lookup"])
+
+
+def _stored_name(document_class, name):
+    try:
+        return mongo_name(document_class, name)
+    except TaviError:
+        return name
+
+
+def translate_expression(document_class, expression):
+    """Translates the "$field" references in the aggregation *expression*
+    to the names persisted in Mongo. References to names that are not
+    fields, such as the outputs of earlier stages, are left as they are.
+
+    """
+    if isinstance(expression, basestring):
+        if expression.startswith("$") and not expression.startswith("$$"):
+            return "$" + _stored_name(document_class, expression[1:])
+        return expression
+
+    if isinstance(expression, list):
+        return [translate_expression(document_class, e) for e in expression]
+
+    if isinstance(expression, dict):
+        return dict(
+            (key, translate_expression(document_class, value))
+            for key, value in expression.items()
+        )
+
+    return expression
+
+
+def _translate_stage(document_class, name, spec, extended):
+    if "$match" == name:
+        return translate_spec(document_class, spec, strict=not extended)
+
+    if "$lookup" == name:
+        lookup = dict(spec)
+        if "localField" in lookup:
+            lookup["localField"] = _stored_name(
+                document_class, lookup["localField"])
+        return lookup
+
+    if "$sort" == name:
+        return type(spec)(
+            (_stored_name(document_class, key), direction)
+            for key, direction in spec.items()
+        )
+
+    if "$project" == name:
+        # Included fields keep their stored names; computed fields are
+        # output under the given names.
+        return dict(
+            (
+                _stored_name(document_class, key)
+                if value in (0, 1, True, False) else key,
+                translate_expression(document_class, value)
+            )
+            for key, value in spec.items()
+        )
+
+    return translate_expression(document_class, spec)
+
+
+def translate_pipeline(document_class, pipeline):
+    """Translates the field attribute names used in the aggregation
+    *pipeline* to the names persisted in Mongo. Stages are translated up to
+    and including the first stage, such as $group, that reshapes the
+    documents. After a stage that adds fields, such as $addFields, names
+    that are not fields of the Document are left as they are.
+
+    """
+    translated, reshaped, extended = [], False, False
+    for stage in pipeline:
+        if reshaped:
+            translated.append(stage)
+            continue
+
+        (name, spec), = stage.items()
+        translated.append(
+            {name: _translate_stage(document_class, name, spec, extended)})
+        reshaped = name in _RESHAPING_STAGES
+        extended = extended or name in _EXTENDING_STAGES
+    return translated
+
+
+def _is_operators(value):
+    return isinstance(value, dict) and value and \
+        all(k.startswith("$") for k in value)
+
+
+def _merge(spec, other):
+    merged = dict(spec)
+    for key, value in other.items():
+        if key not in merged:
+            merged[key] = value
+        elif _is_operators(merged[key]) and _is_operators(value) and \
+                not set(merged[key]) & set(value):
+            merged[key] = dict(merged[key], **value)
+        else:
+            return {"$and": [spec, other]}
+    return merged
+
+
+class ResultSet(list):
+    """The list of Documents found by Document.find. The find is only run
+    when the list is first used: *load* reads and returns the Documents.
+    Until then *to_columns* can instead read the results straight into
+    columns, with *find*, which runs the find with another projection and
+    returns the cursor.
+
+    """
+    def __init__(self, document_class, load, find):
+        super(ResultSet, self).__init__()
+        self._document_class = document_class
+        self._load = load
+        self._find = find
+        self._loaded = False
+
+    def _fetch(self):
+        if not self._loaded:
+            self._loaded = True
+            list.extend(self, self._load())
+
+    def __radd__(self, other):
+        return list(other) + list(self)
+
+    def to_columns(self, fields=None, encode_strings=False):
+        """Returns the values of *fields* (attribute names; all fields by
+        default) as columns; see tavi.columns.to_columns. Unless the
+        Documents were already read, the results are read with only
+        *fields*, like Query#to_columns, and streamed into the columns
+        without creating Documents.
+
+        """
+        cls = self._document_class
+        operation = Operation("to_columns", cls)
+        with operation:
+            with operation.phase("network"):
+                if self._loaded:
+                    records = (document.mongo_field_values
+                               for document in self)
+                else:
+                    records = self._find(columns.projection(cls, fields))
+                result = columns.to_columns(
+                    cls, records, fields, encode_strings)
+
+        logger.info(
+            "(%ss) %s TO_COLUMNS %s",
+            operation.duration_in_seconds(),
+            cls.__name__,
+            fields
+        )
+
+        operation.emit()
+        return result
+
+    def prefetch(self, *fields):
+        """Resolves the reference *fields* (attribute names) of all the
+        Documents with one query per referenced Document class, and returns
+        the ResultSet; see tavi.references.prefetch.
+
+        """
+        references.prefetch(self._document_class, self, fields)
+        return self
+
+
+def _fetching(name):
+    method = getattr(list, name)
+
+    def fetch_first(self, *args):
+        self._fetch()
+        return method(self, *args)
+    fetch_first.__name__ = name
+    fetch_first.__doc__ = method.__doc__
+    return fetch_first
+
+
+# Every list method that reads or changes the items runs the find first
+for _name in (
+    "__add__", "__contains__", "__delitem__", "__delslice__", "__eq__",
+    "__ge__", "__getitem__", "__getslice__", "__gt__", "__iadd__",
+    "__imul__", "__iter__", "__le__", "__len__", "__lt__", "__mul__",
+    "__ne__", "__repr__", "__reversed__", "__rmul__", "__setitem__",
+    "__setslice__", "append", "count", "extend", "index", "insert", "pop",
+    "remove", "reverse", "sort"
+):
+    setattr(ResultSet, _name, _fetching(_name))
+
+
+class Query(object):
+    """A query on the collection of *document_class*. Every method that
+    refines the query returns a new Query.
+
+    """
+    def __init__(self, document_class):
+        self._document_class = document_class
+        self._spec = {}
+        self._sort = []
+        self._skip = 0
+        self._limit = 0
+        self._read_options = {}
+        self._prefetch = ()
+
+    def __iter__(self):
+        return iter(self.all())
+
+    def __repr__(self):
+        return "<Query %s %s sort=%s skip=%s limit=%s>" % (
+            self._document_class.__name__,
+            self._spec,
+            self._sort,
+            self._skip,
+            self._limit
+        )
+
+    def _clone(self):
+        query = Query(self._document_class)
+        query.__dict__.update(self.__dict__)
+        query._read_options = dict(self._read_options)
+        return query
+
+    @property
+    def spec(self):
+        """The Mongo query spec."""
+        return self._spec
+
+    def where(self, *specs, **conditions):
+        """Returns a Query that also matches the query *specs* and the
+        *conditions*.
+
+        """
+        query = self._clone()
+        for spec in specs:
+            query._spec = _merge(
+                query._spec, translate_spec(self._document_class, spec))
+
+        for key, value in sorted(conditions.items()):
+            parts = key.split("__")
+            if len(parts) > 1 and parts[-1] in OPERATORS:
+                value = {"$" + parts.pop(): value}
+
+            name = mongo_name(self._document_class, ".".join(parts))
+            query._spec = _merge(query._spec, {name: value})
+        return query
+
+    def order_by(self, *keys):
+        """Returns a Query sorted by *keys*, field attribute names prefixed
+        with "-" for descending order.
+
+        """
+        query = self._clone()
+        query._sort = [
+            (
+                mongo_name(self._document_class, key.lstrip("-")),
+                -1 if key.startswith("-") else 1
+            )
+            for key in keys
+        ]
+        return query
+
+    def skip(self, skip):
+        """Returns a Query that skips the first *skip* matches."""
+        query = self._clone()
+        query._skip = skip
+        return query
+
+    def limit(self, limit):
+        """Returns a Query that returns at most *limit* matches."""
+        query = self._clone()
+        query._limit = limit
+        return query
+
+    def read_preference(self, mode, tag_sets=None, max_staleness=None):
+        """Returns a Query that reads with the given read preference; see
+        tavi.read_preferences.
+
+        """
+        query = self._clone()
+        query._read_options = {
+            "read_preference": mode,
+            "tag_sets": tag_sets,
+            "max_staleness": max_staleness
+        }
+        return query
+
+    def prefetch(self, *fields):
+        """Returns a Query that resolves the reference *fields* (attribute
+        names) of the matching Documents with one query per referenced
+        Document class; *stream* does so for each batch it reads.
+
+        """
+        references.reference_fields(self._document_class, fields)
+        query = self._clone()
+        query._prefetch = query._prefetch + fields
+        return query
+
+    def _find_options(self):
+        options = dict(self._read_options)
+        if self._sort:
+            options["sort"] = self._sort
+        if self._skip:
+            options["skip"] = self._skip
+        return options
+
+    def all(self):
+        """Returns the list of matching Documents."""
+        documents = self._document_class.find(
+            self._spec, limit=self._limit, **self._find_options())
+        if self._prefetch:
+            documents.prefetch(*self._prefetch)
+        return documents
+
+    def stream(self):
+        """Yields the matching Documents one at a time as the cursor is
+        read, instead of reading them all into a list first.
+
+        """
+        cls = self._document_class
+        collection = cls._collection_for_read(dict(self._read_options))
+        cursor = collection.find(
+            self._spec,
+            skip=self._skip,
+            limit=self._limit,
+            sort=self._sort or None
+        )
+        hydrate = references.identity(cls, cls._from_mongo)
+        documents = (hydrate(record) for record in cursor)
+        if not self._prefetch:
+            for document in documents:
+                yield document
+            return
+
+        while True:
+            batch = list(itertools.islice(documents, STREAM_BATCH_SIZE))
+            if not batch:
+                return
+            references.prefetch(cls, batch, self._prefetch)
+            for document in batch:
+                yield document
+
+    def first(self):
+        """Returns the first matching Document or None."""
+        return self._document_class.find_one(
+            self._spec, **self._find_options())
+
+    def _read(self, name, read):
+        cls = self._document_class
+        operation = Operation(name, cls)
+        with operation:
+            collection = cls._collection_for_read(dict(self._read_options))
+            with operation.phase("network"):
+                result = read(collection)
+
+        logger.info(
+            "(%ss) %s %s %s",
+            operation.duration_in_seconds(),
+            cls.__name__,
+            name.upper(),
+            self._spec
+        )
+
+        operation.emit()
+        return result
+
+    def count(self):
+        """Returns the number of matching documents, honouring *skip* and
+        *limit*. The count is done by the server.
+
+        """
+        def count(collection):
+            if hasattr(collection, "count_documents"):
+                options = dict(skip=self._skip)
+                if self._limit:
+                    options["limit"] = self._limit
+                return collection.count_documents(self._spec, **options)
+
+            cursor = collection.find(
+                self._spec, skip=self._skip, limit=self._limit)
+            return cursor.count(with_limit_and_skip=True)
+
+        return self._read("count", count)
+
+    def exists(self):
+        """Returns True if any document matches. Only the _id of a single
+        document is transferred.
+
+        """
+        return self._read("exists", lambda collection: bool(list(
+            collection.find(
+                self._spec, {"_id": True}, skip=self._skip, limit=1)
+        )))
+
+    def distinct(self, field):
+        """Returns the distinct values of the field named *field* in the
+        matching documents.
+
+        """
+        name = mongo_name(self._document_class, field)
+        return self._read(
+            "distinct",
+            lambda collection: collection.find(self._spec).distinct(name)
+        )
+
+    def to_columns(self, fields=None, encode_strings=False):
+        """Streams the matching documents into columns of the values of
+        *fields* (attribute names; all fields by default) without creating
+        Documents; see tavi.columns.to_columns. Only *fields* are read from
+        Mongo.
+
+        """
+        cls = self._document_class
+        projection = columns.projection(cls, fields)
+
+        def export(collection):
+            cursor = collection.find(
+                self._spec,
+                projection,
+                skip=self._skip,
+                limit=self._limit,
+                sort=self._sort or None
+            )
+            return columns.to_columns(cls, cursor, fields, encode_strings)
+
+        return self._read("to_columns", export)
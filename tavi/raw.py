@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""Provides raw BSON documents that decode their fields on demand.
+
+A RawDocument keeps the BSON bytes of a document read from Mongo. The first
+lookup indexes where each element starts and ends, without decoding any of
+them; every value is then decoded on its own when it is asked for.
+
+RawDocument can be used as the *document_class* of a collection's codec
+options: like pymongo's RawBSONDocument it is constructed from the BSON
+bytes of each result. pymongo supports that from version 3.2; the memory
+backend always does.
+
+"""
+import struct
+import pymongo
+from bson import BSON
+from bson.codec_options import CodecOptions
+from bson.errors import InvalidBSON
+
+_INT32 = struct.Struct("<i")
+
+# Sizes of the values of the element types with a fixed size
+_FIXED_SIZES = {
+    "\x01": 8,   # double
+    "\x06": 0,   # undefined
+    "\x07": 12,  # ObjectId
+    "\x08": 1,   # boolean
+    "\x09": 8,   # UTC datetime
+    "\x0a": 0,   # null
+    "\x10": 4,   # int32
+    "\x11": 8,   # timestamp
+    "\x12": 8,   # int64
+    "\x13": 16,  # decimal128
+    "\x7f": 0,   # max key
+    "\xff": 0    # min key
+}
+
+_STRINGS = frozenset(["\x02", "\x0d", "\x0e"])      # string, code, symbol
+_EMBEDDED = frozenset(["\x03", "\x04", "\x0f"])     # document, array, code_w_s
+
+
+def supported(collection):
+    """Indicates if reads from *collection* can return RawDocuments."""
+    return getattr(
+        collection, "supports_raw_bson", pymongo.version_tuple >= (3, 2))
+
+
+def raw_collection(collection):
+    """Returns a handle to *collection* that reads RawDocuments."""
+    return collection.with_options(
+        codec_options=CodecOptions(document_class=RawDocument))
+
+
+def _value_end(data, kind, offset):
+    size = _FIXED_SIZES.get(kind)
+    if size is not None:
+        return offset + size
+    if kind in _STRINGS:
+        return offset + 4 + _INT32.unpack_from(data, offset)[0]
+    if kind in _EMBEDDED:
+        return offset + _INT32.unpack_from(data, offset)[0]
+    if "\x05" == kind:    # binary: length, subtype, bytes
+        return offset + 5 + _INT32.unpack_from(data, offset)[0]
+    if "\x0b" == kind:    # regular expression: pattern and options
+        return data.index("\x00", data.index("\x00", offset) + 1) + 1
+    if "\x0c" == kind:    # DBPointer: string and ObjectId
+        return offset + 16 + _INT32.unpack_from(data, offset)[0]
+    raise InvalidBSON("unknown element type %r" % kind)
+
+
+class RawDocument(object):
+    """A document read from Mongo as BSON bytes. Supports read-only mapping
+    access; each value is decoded when it is looked up.
+
+    """
+    _type_marker = 101  # pymongo's marker for raw BSON document classes
+
+    def __init__(self, bson_bytes, codec_options=None):
+        self.raw = bson_bytes
+        self._elements = None
+
+    def _index(self):
+        if self._elements is None:
+            data, elements = self.raw, {}
+            offset, end = 4, len(self.raw) - 1
+            while offset < end:
+                name_end = data.index("\x00", offset + 1)
+                value_end = _value_end(data, data[offset], name_end + 1)
+                name = data[offset + 1:name_end].decode("utf-8")
+                elements[name] = (offset, value_end)
+                offset = value_end
+            self._elements = elements
+        return self._elements
+
+    def get(self, key, default=None):
+        """Returns the decoded value of *key*, or *default*."""
+        element = self._index().get(key)
+        if element is None:
+            return default
+
+        start, end = element
+        document = _INT32.pack(end - start + 5) + self.raw[start:end] + "\x00"
+        return BSON(document).decode()[key]
+
+    def __getitem__(self, key):
+        if key not in self._index():
+            raise KeyError(key)
+        return self.get(key)
+
+    def __contains__(self, key):
+        return key in self._index()
+
+    def __iter__(self):
+        return iter(self._index())
+
+    def __len__(self):
+        return len(self._index())
+
+    def keys(self):
+        return self._index().keys()
+
+    def decode(self):
+        """Returns the whole document as a dictionary."""
+        return BSON(self.raw).decode()
+
+    def __repr__(self):
+        return "RawDocument(%r)" % (self.raw,)
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""Provides read preference routing for Document queries.
+
+A read preference decides which replica set members serve a query. It can
+be set for a Document class::
+
+    class Event(Document):
+        __read_preference__ = "secondaryPreferred"
+        __tag_sets__ = [{"dc": "east"}, {}]
+        __max_staleness__ = 120
+
+or for a single call, which takes precedence::
+
+    Event.find({"kind": "click"}, read_preference="nearest")
+
+Reads made inside a *session* after the thread has written go to the
+primary, so they always see the thread's own writes.
+
+"""
+import contextlib
+import logging
+import threading
+from pymongo import read_preferences
+from tavi.errors import TaviError
+
+logger = logging.getLogger(__name__)
+
+MODES = {
+    "primary": read_preferences.Primary,
+    "primaryPreferred": read_preferences.PrimaryPreferred,
+    "secondary": read_preferences.Secondary,
+    "secondaryPreferred": read_preferences.SecondaryPreferred,
+    "nearest": read_preferences.Nearest
+}
+
+_local = threading.local()
+
+
+class Session(object):
+    """Tracks whether the thread has written during a *session* block."""
+    def __init__(self):
+        self.wrote = False
+
+
+@contextlib.contextmanager
+def session():
+    """Starts a session for the current thread. Once a Document is saved or
+    deleted in the session, subsequent reads use the primary. Nested
+    sessions share the outer session.
+
+    """
+    current = current_session()
+    if current is not None:
+        yield current
+        return
+
+    _local.session = Session()
+    try:
+        yield _local.session
+    finally:
+        _local.session = None
+
+
+def current_session():
+    """Returns the Session of the current thread or None."""
+    return getattr(_local, "session", None)
+
+
+def record_write():
+    """Marks the session of the current thread, if any, as having written."""
+    current = current_session()
+    if current is not None:
+        current.wrote = True
+
+
+def make(mode, tag_sets=None, max_staleness=None):
+    """Returns the pymongo read preference for *mode*, one of the names in
+    MODES. *tag_sets* and *max_staleness* (in seconds) do not apply to
+    "primary". *max_staleness* is ignored, with a warning, by pymongo
+    versions that do not support it.
+
+    """
+    if not isinstance(mode, basestring):
+        return mode
+
+    if mode not in MODES:
+        raise TaviError(
+            "unknown read preference '%s'; expected one of %s" % (
+                mode, ", ".join(sorted(MODES))))
+
+    if "primary" == mode:
+        return MODES[mode]()
+
+    options = {"tag_sets": tag_sets}
+    if max_staleness is not None:
+        options["max_staleness"] = max_staleness
+
+    try:
+        return MODES[mode](**options)
+    except TypeError:
+        logger.warn(
+            "max_staleness is not supported by this version of pymongo")
+        return MODES[mode](tag_sets)
+
+
+def resolve(
+    document_class, read_preference=None, tag_sets=None, max_staleness=None
+):
+    """Returns the pymongo read preference for a read of *document_class*,
+    or None to use the client's default. The arguments override the
+    Document's *__read_preference__*, *__tag_sets__* and
+    *__max_staleness__*.
+
+    """
+    current = current_session()
+    if current is not None and current.wrote:
+        return read_preferences.Primary()
+
+    mode = read_preference or document_class.__read_preference__
+    if mode is None:
+        return None
+
+    return make(
+        mode,
+        tag_sets if tag_sets is not None else document_class.__tag_sets__,
+        max_staleness if max_staleness is not None
+        else document_class.__max_staleness__
+    )
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""Provides references between Documents and an identity map.
+
+A tavi.fields.ReferenceField stores the ObjectId of another Document and
+reads that Document the first time the field is used. Reading the
+references of a list of Documents that way takes one query per Document;
+*prefetch* resolves them with one $in query per referenced Document class::
+
+    orders = Order.find({"status": "open"}).prefetch("customer")
+    orders = Order.where(status="open").prefetch("customer").all()
+
+Inside an *identity_map* block, each Document the current thread reads is
+kept by its class and id. Reading it again, directly or through a
+reference, returns the same instance without another query::
+
+    with references.identity_map():
+        orders = Order.find().prefetch("customer")
+        orders[0].customer is Customer.find_by_id(...)    # True
+
+"""
+import collections
+import contextlib
+import threading
+from tavi.errors import TaviError
+
+_local = threading.local()
+
+
+class IdentityMap(object):
+    """The Documents read by the current thread in an *identity_map* block,
+    keyed by their class and id.
+
+    """
+    def __init__(self):
+        self._documents = {}
+
+    def get(self, document_class, bson_id):
+        """Returns the *document_class* Document with *bson_id* or None."""
+        return self._documents.get((document_class, bson_id))
+
+    def add(self, document):
+        """Adds *document*, if it has an id, and returns it."""
+        if document.bson_id is not None:
+            self._documents[(document.__class__, document.bson_id)] = document
+        return document
+
+    def remove(self, document):
+        """Removes *document*, if it is in the map."""
+        self._documents.pop((document.__class__, document.bson_id), None)
+
+    def __len__(self):
+        return len(self._documents)
+
+
+@contextlib.contextmanager
+def identity_map():
+    """Starts an identity map for the current thread. Nested blocks share
+    the outer map.
+
+    """
+    current = current_identity_map()
+    if current is not None:
+        yield current
+        return
+
+    _local.identity_map = IdentityMap()
+    try:
+        yield _local.identity_map
+    finally:
+        _local.identity_map = None
+
+
+def current_identity_map():
+    """Returns the IdentityMap of the current thread or None."""
+    return getattr(_local, "identity_map", None)
+
+
+def identity(document_class, hydrate):
+    """Wraps *hydrate*, which creates a *document_class* Document from a
+    record read from Mongo, so that it returns the Document in the identity
+    map of the current thread, if any, instead of creating another one.
+
+    """
+    current = current_identity_map()
+    if current is None:
+        return hydrate
+
+    def load(record):
+        document = current.get(document_class, record.get("_id"))
+        if document is None:
+            document = current.add(hydrate(record))
+        return document
+    return load
+
+
+def resolve(document_class, bson_id):
+    """Returns the *document_class* Document with *bson_id*, from the
+    identity map if possible, or None if it does not exist.
+
+    """
+    current = current_identity_map()
+    if current is not None:
+        document = current.get(document_class, bson_id)
+        if document is not None:
+            return document
+    return document_class.find_one({"_id": bson_id})
+
+
+def reference_fields(document_class, fields):
+    """Returns the ReferenceField descriptors of *document_class* named by
+    the attribute names in *fields*. Raises a TaviError for names that are
+    not reference fields.
+
+    """
+    descriptors = []
+    for field in fields:
+        descriptor = document_class._field_descriptors.get(field)
+        if not hasattr(descriptor, "reference_id"):
+            raise TaviError(
+                "%s has no reference field named '%s'" % (
+                    document_class.__name__, field))
+        descriptors.append(descriptor)
+    return descriptors
+
+
+def prefetch(document_class, documents, fields):
+    """Resolves the reference *fields* (attribute names) of *documents*,
+    Documents of *document_class*, with one $in query per referenced class.
+    References that are already resolved, or whose Documents are in the
+    identity map, are not read again.
+
+    """
+    descriptors = reference_fields(document_class, fields)
+    current = current_identity_map()
+
+    unresolved = []
+    ids = collections.OrderedDict()
+    for document in documents:
+        for descriptor in descriptors:
+            bson_id = descriptor.reference_id(document)
+            if bson_id is None or descriptor.cached(document) is not None:
+                continue
+
+            target = descriptor.document_class
+            mapped = None
+            if current is not None:
+                mapped = current.get(target, bson_id)
+            if mapped is not None:
+                descriptor.cache(document, mapped)
+                continue
+
+            ids.setdefault(target, set()).add(bson_id)
+            unresolved.append((document, descriptor, bson_id))
+
+    found = {}
+    for target, target_ids in ids.items():
+        for referenced in target.find({"_id": {"$in": sorted(target_ids)}}):
+            found[(target, referenced.bson_id)] = referenced
+
+    for document, descriptor, bson_id in unresolved:
+        referenced = found.get((descriptor.document_class, bson_id))
+        if referenced is not None:
+            descriptor.cache(document, referenced)
@@ -1,13 +1,17 @@
 # -*- coding: utf-8 -*-
+import os
 import unittest
 from tavi import Connection
 
+# Set TAVI_TEST_BACKEND=memory to run the tests without a MongoDB server.
+BACKEND = os.environ.get("TAVI_TEST_BACKEND", "mongo")
+
 
 class BaseMongoTest(unittest.TestCase):
     def setUp(self):
         super(BaseMongoTest, self).setUp()
         self._DB_NAME = "test_database"
-        Connection.setup(self._DB_NAME)
+        Connection.setup(self._DB_NAME, backend=BACKEND)
         Connection.client.drop_database(self._DB_NAME)
 
         # Convenience attribute for integration tests
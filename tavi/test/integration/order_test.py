@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
+import datetime
 from integration import BaseMongoTest
+from mock import patch
 from tavi.documents import Document, EmbeddedDocument
 from tavi import fields
 
@@ -217,8 +219,14 @@ class OrderTest(BaseMongoTest):
         self.assertEqual(1, len(orders))
         self.assertEqual(2, len(orders[0]["order_lines"]))
 
+        # Timestamps are stored with millisecond precision, so the update
+        # is stamped a second later than the insert
+        later = orders[0]["order_lines"][0]["created_at"] + \
+            datetime.timedelta(seconds=1)
         order.order_lines[0].quantity = 42
-        assert order.save(), order.errors.full_messages
+        with patch("tavi.commands.datetime") as clock:
+            clock.datetime.utcnow.return_value = later
+            assert order.save(), order.errors.full_messages
 
         orders = list(self.db.orders.find())
         lines = orders[0]["order_lines"]
@@ -227,6 +235,7 @@ class OrderTest(BaseMongoTest):
 
         self.assertEqual(42, lines[0]["quantity"])
         self.assertEqual(19.99, lines[0]["total_price"])
+        self.assertEqual(later, lines[0]["last_modified_at"])
         self.assertNotEqual(
             lines[0]["created_at"],
             lines[0]["last_modified_at"]
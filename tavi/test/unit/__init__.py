@@ -1,8 +1,12 @@
 # -*- coding: utf-8 -*-
 from tavi import Connection
 import logging
+import os
 
-Connection.setup("test_database")
+# Set TAVI_TEST_BACKEND=memory to run the tests without a MongoDB server.
+BACKEND = os.environ.get("TAVI_TEST_BACKEND", "mongo")
+
+Connection.setup("test_database", backend=BACKEND)
 
 
 class LogCapture(logging.Handler):
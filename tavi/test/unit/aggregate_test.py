@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+import collections
+import types
+import unittest
+from mock import patch
+from tavi import Connection
+from tavi.documents import Document
+from tavi.query import translate_pipeline
+from tavi import fields
+
+
+class Sale(Document):
+    sku = fields.StringField("s")
+    quantity = fields.IntegerField("q")
+    tags = fields.ArrayField("t")
+
+
+class TranslatePipelineTest(unittest.TestCase):
+    def test_translates_until_documents_are_reshaped(self):
+        pipeline = translate_pipeline(Sale, [
+            {"$match": {"quantity": {"$gt": 1}}},
+            {"$unwind": "$tags"},
+            {"$group": {"_id": "$sku", "total": {"$sum": "$quantity"}}},
+            {"$match": {"total": {"$gt": 2}}},
+            {"$sort": {"total": -1}}
+        ])
+
+        self.assertEqual([
+            {"$match": {"q": {"$gt": 1}}},
+            {"$unwind": "$t"},
+            {"$group": {"_id": "$s", "total": {"$sum": "$q"}}},
+            {"$match": {"total": {"$gt": 2}}},
+            {"$sort": {"total": -1}}
+        ], pipeline)
+
+    def test_project(self):
+        pipeline = translate_pipeline(Sale, [
+            {"$project": {"sku": 1, "amount": "$quantity", "_id": 0}}
+        ])
+        self.assertEqual(
+            [{"$project": {"s": 1, "amount": "$q", "_id": 0}}], pipeline)
+
+    def test_lookup(self):
+        pipeline = translate_pipeline(Sale, [
+            {"$lookup": {
+                "from": "skus", "localField": "sku",
+                "foreignField": "_id", "as": "details"
+            }},
+            {"$match": {"details.name": "x", "quantity": 1}}
+        ])
+        self.assertEqual([
+            {"$lookup": {
+                "from": "skus", "localField": "s",
+                "foreignField": "_id", "as": "details"
+            }},
+            {"$match": {"details.name": "x", "q": 1}}
+        ], pipeline)
+
+    def test_sort_keeps_key_order(self):
+        sort = collections.OrderedDict([("sku", 1), ("quantity", -1)])
+        pipeline = translate_pipeline(Sale, [{"$sort": sort}])
+        self.assertEqual([("s", 1), ("q", -1)], pipeline[0]["$sort"].items())
+
+
+class AggregateTest(unittest.TestCase):
+    def setUp(self):
+        super(AggregateTest, self).setUp()
+        Connection.client.drop_database("test_database")
+        for sku, quantity, tags in [
+            ("a", 1, ["x"]), ("b", 5, ["x", "y"]), ("a", 3, ["y"])
+        ]:
+            Sale(sku=sku, quantity=quantity, tags=tags).save()
+
+    def test_streams_results(self):
+        results = Sale.aggregate([
+            {"$group": {"_id": "$sku", "total": {"$sum": "$quantity"}}},
+            {"$sort": {"_id": 1}}
+        ], batch_size=10)
+
+        self.assertNotIsInstance(results, list)
+        self.assertEqual(
+            [{"_id": "a", "total": 4}, {"_id": "b", "total": 5}],
+            list(results)
+        )
+
+    def test_match_unwind_and_count(self):
+        results = Sale.aggregate([
+            {"$match": {"quantity": {"$gte": 3}}},
+            {"$unwind": "$tags"},
+            {"$count": "tags"}
+        ])
+        self.assertEqual([{"tags": 3}], list(results))
+
+    def test_match_on_added_fields(self):
+        results = Sale.aggregate([
+            {"$addFields": {"amount": "$quantity"}},
+            {"$match": {"amount": {"$gt": 1}, "sku": "a"}}
+        ])
+        self.assertEqual([3], [result["amount"] for result in results])
+
+    def test_match_on_projected_fields(self):
+        results = Sale.aggregate([
+            {"$project": {"amount": "$quantity", "_id": 0}},
+            {"$match": {"amount": {"$gt": 1}}},
+            {"$sort": {"amount": 1}}
+        ])
+        self.assertEqual([{"amount": 3}, {"amount": 5}], list(results))
+
+    def test_hydrate(self):
+        results = Sale.aggregate([
+            {"$match": {"sku": "a"}},
+            {"$project": {"sku": 1, "quantity": 1}},
+            {"$sort": {"quantity": -1}}
+        ], hydrate=True)
+
+        self.assertIsInstance(results, types.GeneratorType)
+        with patch.object(fields.IntegerField, "validate") as validate:
+            sales = list(results)
+        self.assertFalse(validate.called)
+        self.assertEqual([3, 1], [sale.quantity for sale in sales])
+        self.assertEqual(["a", "a"], [sale.sku for sale in sales])
+        self.assertEqual([], sales[0].tags)
+        self.assertIsNotNone(sales[0].bson_id)
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+import array
+import json
+import unittest
+from bson.binary import Binary
+from mock import patch
+from tavi import arrays
+from tavi import Connection
+from tavi.documents import Document, EmbeddedDocument
+from tavi.errors import TaviError
+from tavi import fields
+
+
+class Sensor(Document):
+    name = fields.StringField("n")
+    readings = fields.TypedArrayField(
+        "readings", max_length=5, min_value=0, max_value=100)
+    counts = fields.TypedArrayField("counts", dtype="int16")
+
+
+class Sample(EmbeddedDocument):
+    values = fields.TypedArrayField("values", dtype="int32")
+
+
+class PackingTest(unittest.TestCase):
+    def test_round_trip(self):
+        for dtype in arrays.DTYPES:
+            values = arrays.load([1, 2, 3], dtype)
+            self.assertTrue(arrays.is_array(values, dtype))
+            data = arrays.pack(values)
+            self.assertIsInstance(data, Binary)
+            self.assertEqual(3 * values.itemsize, len(data))
+            self.assertEqual([1, 2, 3], list(arrays.unpack(data, dtype)))
+
+    def test_little_endian(self):
+        values = arrays.load([1, 258], "int16")
+        self.assertEqual("\x01\x00\x02\x01", bytes(arrays.pack(values)))
+
+    def test_rejects_other_kinds_of_numbers(self):
+        for values in ([1.5], ["a"], [[1]], [300]):
+            with self.assertRaises((TypeError, ValueError, OverflowError)):
+                arrays.load(values, "int8")
+
+    def test_floats_are_rounded(self):
+        values = arrays.load([0.1, 2 ** 24 + 1], "float32")
+        self.assertTrue(arrays.is_array(values, "float32"))
+        self.assertNotEqual(0.1, values[0])
+        self.assertEqual(2 ** 24, values[1])
+
+    def test_unsupported_dtype(self):
+        with self.assertRaises(TaviError):
+            arrays.check_dtype("complex128")
+        with self.assertRaises(TaviError):
+            fields.TypedArrayField("x", dtype="object")
+
+    @unittest.skipIf(arrays.numpy is None, "requires NumPy")
+    def test_numpy_view(self):
+        data = arrays.pack(arrays.load([0.5, 1.5], "float64"))
+        values = arrays.unpack(data, "float64")
+        self.assertIsInstance(values, arrays.numpy.ndarray)
+        self.assertFalse(values.flags.writeable)
+        self.assertEqual([0.5, 1.5], values.tolist())
+
+    @patch.object(arrays, "numpy", None)
+    def test_without_numpy(self):
+        values = arrays.load([0.5, 1.5], "float64")
+        self.assertIsInstance(values, array.array)
+        self.assertEqual(
+            values, arrays.unpack(arrays.pack(values), "float64"))
+        self.assertEqual((0.5, 1.5), arrays.bounds(values))
+
+
+class TypedArrayFieldTest(unittest.TestCase):
+    def setUp(self):
+        super(TypedArrayFieldTest, self).setUp()
+        Connection.client.drop_database("test_database")
+
+    def test_stores_a_binary_value(self):
+        sensor = Sensor(name="north", readings=[1.5, 2.5], counts=[3])
+        self.assertTrue(sensor.valid)
+        self.assertTrue(sensor.save())
+
+        record = Connection.database["sensors"].find_one()
+        self.assertIsInstance(record["readings"], Binary)
+        self.assertEqual(16, len(record["readings"]))
+
+        sensor = Sensor.find_one()
+        self.assertTrue(arrays.is_array(sensor.readings, "float64"))
+        self.assertEqual([1.5, 2.5], list(sensor.readings))
+        self.assertEqual([3], list(sensor.counts))
+        self.assertTrue(sensor.valid)
+
+    def test_missing_value(self):
+        Sensor(name="south").save()
+        sensor = Sensor.find_one()
+        self.assertIsNone(sensor.readings)
+        self.assertIsNone(sensor.mongo_field_values["readings"])
+
+    def test_validates_the_whole_array(self):
+        sensor = Sensor(readings=range(6), counts=[1])
+        self.assertEqual(
+            ["Readings is too long (maximum is 5 items)"],
+            sensor.errors.full_messages
+        )
+
+        sensor.readings = [-1, 101]
+        self.assertEqual(
+            [
+                "Readings has an item that is too small (minimum is 0)",
+                "Readings has an item that is too big (maximum is 100)"
+            ],
+            sensor.errors.full_messages
+        )
+
+    def test_invalid_values(self):
+        sensor = Sensor(counts=[1.5])
+        self.assertEqual(
+            ["Counts must be an array of int16 numbers"],
+            sensor.errors.full_messages
+        )
+        self.assertEqual([1.5], sensor.counts)
+
+    def test_columns_hold_the_arrays(self):
+        Sensor(name="north", readings=[1.5, 2.5]).save()
+        Sensor(name="south").save()
+
+        column = Sensor.find().to_columns(["readings"])["readings"]
+        self.assertTrue(arrays.is_array(column.values[0], "float64"))
+        self.assertEqual([1.5, 2.5], list(column.values[0]))
+        self.assertIsNone(column.values[1])
+        self.assertEqual([False, True], list(column.mask))
+
+    def test_json_round_trip(self):
+        sensor = Sensor(readings=[1.0, 2.0])
+        self.assertEqual(
+            {"readings": [1.0, 2.0]}, json.loads(sensor.to_json(["readings"])))
+        copy = Sensor.from_json(sensor.to_json())
+        self.assertEqual([1.0, 2.0], list(copy.readings))
+        self.assertTrue(arrays.is_array(copy.readings, "float64"))
+
+    @patch.object(arrays, "numpy", None)
+    def test_json_without_numpy(self):
+        sample = Sample(values=[1, 2])
+        self.assertIsInstance(sample.values, array.array)
+        self.assertEqual(
+            {"values": [1, 2]}, json.loads(sample.to_json(["values"])))
+
+    def test_embedded_documents_compare_the_arrays(self):
+        self.assertEqual(Sample(values=[1, 2]), Sample(values=[1, 2]))
+        self.assertNotEqual(Sample(values=[1, 2]), Sample(values=[1, 3]))
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+import threading
+import unittest
+from mock import patch
+from tavi import Connection
+from tavi.async_documents import AsyncDocument, StopAsyncIteration, asyncio
+from tavi import fields
+
+
+class Sample(AsyncDocument):
+    name = fields.StringField("name", required=True, unique=True)
+    created_at = fields.DateTimeField("created_at")
+
+
+@unittest.skipIf(asyncio is None, "asyncio (or trollius) is not installed")
+class AsyncDocumentTest(unittest.TestCase):
+    def setUp(self):
+        super(AsyncDocumentTest, self).setUp()
+        Connection.client.drop_database("test_database")
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        super(AsyncDocumentTest, self).tearDown()
+        self.loop.close()
+        asyncio.set_event_loop(None)
+
+    def complete(self, future):
+        return self.loop.run_until_complete(future)
+
+    def test_asave(self):
+        sample = Sample(name="John")
+        self.assertTrue(self.complete(sample.asave()))
+        self.assertIsNotNone(sample.bson_id)
+        self.assertIsNotNone(sample.created_at)
+        self.assertEqual(1, self.complete(Sample.acount()))
+
+    def test_asave_invalid(self):
+        sample = Sample()
+        self.assertFalse(self.complete(sample.asave()))
+        self.assertEqual(["Name is required"], sample.errors.full_messages)
+
+    def test_asave_unique_violation(self):
+        self.complete(Sample(name="John").asave())
+
+        sample = Sample(name="John")
+        self.assertFalse(self.complete(sample.asave()))
+        self.assertEqual(["Name must be unique"], sample.errors.full_messages)
+
+    def test_many_in_flight(self):
+        samples = [Sample(name="sample %s" % i) for i in range(2000)]
+        results = self.complete(asyncio.gather(
+            *[sample.asave() for sample in samples]))
+
+        self.assertTrue(all(results))
+        self.assertEqual(2000, Sample.count())
+
+    def test_afind_one_and_adelete(self):
+        self.complete(Sample(name="John").asave())
+
+        found = self.complete(Sample.afind_one({"name": "John"}))
+        self.assertEqual("John", found.name)
+        self.assertEqual(found.name, self.complete(
+            Sample.afind_by_id(found.bson_id)).name)
+
+        self.complete(found.adelete())
+        self.assertEqual(0, Sample.count())
+
+    def test_afind_fetch_next(self):
+        for name in ["a", "b", "c"]:
+            Sample(name=name).save()
+
+        results = Sample.afind(sort=[("name", 1)], batch_size=2)
+        names = []
+        while self.complete(results.fetch_next):
+            names.append(results.next_object().name)
+
+        self.assertEqual(["a", "b", "c"], names)
+
+    def test_afind_anext(self):
+        Sample(name="a").save()
+
+        results = Sample.afind()
+        self.assertIs(results, results.__aiter__())
+        self.assertEqual("a", self.complete(results.__anext__()).name)
+        with self.assertRaises(StopAsyncIteration):
+            self.complete(results.__anext__())
+
+    def test_afind_to_list(self):
+        for name in ["a", "b", "c"]:
+            Sample(name=name).save()
+
+        results = Sample.afind({"name": {"$ne": "b"}}, sort=[("name", 1)])
+        self.assertEqual(
+            ["a", "c"],
+            [s.name for s in self.complete(results.to_list())]
+        )
+
+    def test_afind_resolves_the_collection_in_the_executor(self):
+        Sample(name="a").save()
+        resolved = []
+        resolve = Sample._collection_for_read.im_func
+
+        def collection_for_read(cls, kwargs):
+            resolved.append(threading.current_thread())
+            return resolve(cls, kwargs)
+
+        with patch.object(
+                Sample, "_collection_for_read",
+                classmethod(collection_for_read)):
+            results = Sample.afind()
+            self.assertEqual([], resolved)
+            self.assertEqual(1, len(self.complete(results.to_list())))
+
+        self.assertIsNot(threading.current_thread(), resolved[0])
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+import array
+import datetime
+import unittest
+from mock import Mock, patch
+from tavi import Connection
+from tavi import columns
+from tavi import instrumentation
+from tavi.documents import Document
+from tavi.errors import TaviError
+from tavi import fields
+
+
+class Reading(Document):
+    station = fields.StringField("st")
+    level = fields.IntegerField("lvl")
+    value = fields.FloatField("v")
+    checked = fields.BooleanField("ok")
+    taken_at = fields.DateTimeField("at")
+    tags = fields.ArrayField("tags")
+
+
+class ColumnsTest(unittest.TestCase):
+    def setUp(self):
+        super(ColumnsTest, self).setUp()
+        Connection.client.drop_database("test_database")
+        Reading(
+            station="north", level=3, value=1.5, checked=True,
+            taken_at=datetime.datetime(2015, 1, 1, 12, 0, 0, 5000)
+        ).save()
+        Reading(station="south", level=1).save()
+        Reading(station="north", value=2.5, checked=False).save()
+
+    def test_unknown_field(self):
+        with self.assertRaises(TaviError):
+            Reading.where().to_columns(["depth"])
+
+    def test_find_returns_a_list(self):
+        readings = Reading.find({"st": "north"})
+        self.assertIsInstance(readings, list)
+        self.assertEqual(2, len(readings))
+        self.assertEqual(list(readings), readings)
+        self.assertEqual(2, len([] + Reading.find({"st": "north"})))
+
+    @patch.object(columns, "numpy", None)
+    def test_find_streams_into_columns_without_documents(self):
+        collection = Mock(wraps=Connection.database["readings"])
+        events = []
+        instrumentation.register(events.append)
+        try:
+            with patch.object(
+                Reading, "_collection_for_read", return_value=collection
+            ), patch.object(Reading, "_from_mongo") as from_mongo:
+                readings = Reading.find({"st": "north"}, sort=[("lvl", -1)])
+                level = readings.to_columns(["level"])["level"]
+        finally:
+            instrumentation.unregister(events.append)
+
+        self.assertEqual([3, 0], level.values.tolist())
+        self.assertEqual([False, True], level.mask.tolist())
+        self.assertFalse(from_mongo.called)
+        self.assertEqual(1, collection.find.call_count)
+        self.assertEqual(
+            ({"st": "north"}, {"lvl": True}), collection.find.call_args[0])
+        self.assertEqual(["to_columns"], [e.operation for e in events])
+
+    def test_read_results_are_not_read_again(self):
+        readings = Reading.find({"st": "north"}, sort=[("lvl", -1)])
+        self.assertEqual(["north", "north"], [r.station for r in readings])
+
+        with patch.object(Reading, "_collection_for_read") as reader:
+            level = readings.to_columns(["level"])["level"]
+
+        self.assertFalse(reader.called)
+        self.assertEqual([3, 0], level.values.tolist())
+        self.assertEqual([False, True], level.mask.tolist())
+
+    @patch.object(columns, "numpy", None)
+    def test_array_columns(self):
+        result = Reading.find().to_columns(
+            ["level", "value", "checked", "taken_at", "station", "tags"])
+
+        self.assertEqual(
+            ["level", "value", "checked", "taken_at", "station", "tags"],
+            result.keys()
+        )
+
+        level = result["level"]
+        self.assertIsInstance(level.values, array.array)
+        self.assertEqual([3, 1, 0], level.values.tolist())
+        self.assertEqual([False, False, True], map(bool, level.mask))
+
+        self.assertEqual(2.5, result["value"].values[2])
+        self.assertEqual([0, 1, 0], result["checked"].mask.tolist())
+        self.assertEqual(
+            1420113600005000, result["taken_at"].values[0])
+        self.assertEqual(["north", "south", "north"], result["station"].values)
+        self.assertEqual([None, None, None], result["tags"].values)
+        self.assertEqual([1, 1, 1], result["tags"].mask.tolist())
+
+    @patch.object(columns, "numpy", None)
+    def test_dictionary_encoded_strings(self):
+        station = Reading.where().to_columns(
+            ["station"], encode_strings=True)["station"]
+        self.assertEqual([0, 1, 0], station.values.tolist())
+        self.assertEqual(["north", "south"], station.categories)
+
+    @unittest.skipIf(columns.numpy is None, "requires NumPy")
+    def test_numpy_columns(self):
+        numpy = columns.numpy
+        result = Reading.where().order_by("station").to_columns(
+            ["level", "value", "checked", "taken_at", "station"])
+
+        level = result["level"]
+        self.assertEqual(numpy.int64, level.values.dtype)
+        self.assertEqual([3, 0, 1], level.values.tolist())
+        self.assertEqual([False, True, False], level.mask.tolist())
+
+        value = result["value"]
+        self.assertEqual(numpy.float64, value.values.dtype)
+        self.assertTrue(numpy.isnan(value.values[2]))
+
+        self.assertEqual(numpy.bool_, result["checked"].values.dtype)
+
+        taken_at = result["taken_at"].values
+        self.assertEqual(numpy.dtype("datetime64[us]"), taken_at.dtype)
+        self.assertEqual(
+            numpy.datetime64("2015-01-01T12:00:00.005000"), taken_at[0])
+        self.assertTrue(numpy.isnat(taken_at[1]))
+
+        self.assertEqual(object, result["station"].values.dtype)
+        self.assertEqual(
+            ["north", "north", "south"], result["station"].values.tolist())
+
+    @unittest.skipIf(columns.numpy is None, "requires NumPy")
+    def test_numpy_dictionary_encoded_strings(self):
+        station = Reading.find().to_columns(
+            ["station"], encode_strings=True)["station"]
+        self.assertEqual([0, 1, 0], station.values.tolist())
+        self.assertEqual(["north", "south"], station.categories.tolist())
+
+    def test_empty(self):
+        Connection.client.drop_database("test_database")
+        result = Reading.where().to_columns(["level", "station"])
+        self.assertEqual(0, len(result["level"].values))
+        self.assertEqual(0, len(result["station"].mask))
@@ -1,9 +1,17 @@
 # -*- coding: utf-8 -*-
+import os
 import unittest
 from pymongo import MongoClient
 from tavi import Connection
+from tavi import executors
+from tavi.backends import MemoryBackend
+from tavi.documents import Document
+from tavi.errors import TaviConnectionError
+from tavi import fields
+from unit import BACKEND
 
 
+@unittest.skipUnless("mongo" == BACKEND, "requires a MongoDB server")
 class ConnectionTest(unittest.TestCase):
     def setUp(self):
         super(ConnectionTest, self).setUp()
@@ -22,3 +30,105 @@ class ConnectionTest(unittest.TestCase):
     def test_has_a_client_attribute(self):
         Connection.setup("test_database", host="mongodb://localhost:27017")
         self.assertEqual(self.client, Connection.client)
+
+
+class ForkTest(unittest.TestCase):
+    class CountingBackend(MemoryBackend):
+        def __init__(self):
+            self.reconnects = 0
+
+        def reconnect(self, client, database_name, **kwargs):
+            self.reconnects += 1
+            return self.connect(database_name, **kwargs)
+
+    def setUp(self):
+        super(ForkTest, self).setUp()
+        self.backend = self.CountingBackend()
+        Connection.setup("test_database", backend=self.backend)
+
+    def tearDown(self):
+        super(ForkTest, self).tearDown()
+        Connection.setup("test_database", backend=BACKEND)
+
+    def test_no_reconnect_in_same_process(self):
+        database = Connection.database
+        self.assertIs(database, Connection.get_database())
+        self.assertEqual(0, self.backend.reconnects)
+
+    def test_reconnects_when_pid_changes(self):
+        client = Connection.client
+        Connection.pid = -1
+
+        database = Connection.get_database()
+        self.assertEqual(1, self.backend.reconnects)
+        self.assertIsNot(client, Connection.client)
+        self.assertIs(database, Connection.database)
+        self.assertEqual(os.getpid(), Connection.pid)
+
+    def test_reset_after_fork_replaces_shared_executor(self):
+        executor = executors.shared()
+        Connection.reset_after_fork()
+
+        self.assertIsNot(executor, executors.shared())
+        self.assertEqual(1, self.backend.reconnects)
+
+    def test_forked_child_reconnects(self):
+        pid = os.fork()
+        if 0 == pid:
+            Connection.get_database()
+            os._exit(0 if 1 == self.backend.reconnects else 1)
+
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(0, status)
+        self.assertEqual(0, self.backend.reconnects)
+
+
+class NamedConnectionTest(unittest.TestCase):
+    class Event(Document):
+        __connection__ = "events"
+        name = fields.StringField("name", unique=True)
+
+    class Archive(Document):
+        __connection__ = "events"
+        __database__ = "archive_database"
+        name = fields.StringField("name")
+
+    def setUp(self):
+        super(NamedConnectionTest, self).setUp()
+        Connection.setup("events_database", backend="memory", alias="events")
+        self.events_client = Connection.get_database("events").client
+
+    def tearDown(self):
+        super(NamedConnectionTest, self).tearDown()
+        Connection._connections.pop("events")
+
+    def test_default_connection_is_unchanged(self):
+        self.assertIs(Connection.database, Connection.get_database())
+        self.assertIsNot(Connection.client, self.events_client)
+
+    def test_document_uses_named_connection(self):
+        self.assertTrue(self.Event(name="click").save())
+
+        self.assertEqual(
+            1, self.events_client["events_database"]["events"].count())
+        self.assertEqual(0, Connection.database["events"].count())
+
+    def test_indexes_are_ensured_on_named_connection(self):
+        self.Event.collection
+        self.assertIn(
+            "name_unique_index",
+            self.events_client["events_database"]["events"]
+                .index_information()
+        )
+
+    def test_document_uses_named_database(self):
+        self.Archive(name="click").save()
+        self.assertEqual(
+            1, self.events_client["archive_database"]["archives"].count())
+
+    def test_unknown_connection(self):
+        class Metric(Document):
+            __connection__ = "metrics"
+
+        with self.assertRaises(TaviConnectionError):
+            Metric.collection
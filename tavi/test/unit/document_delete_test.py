@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 import unittest
-from pymongo import MongoClient
+from tavi import Connection
 from tavi.documents import Document
 from tavi import fields
 
@@ -10,7 +10,7 @@ class DocumentDeleteTest(unittest.TestCase):
         name = fields.StringField("name", required=True)
 
     def test_successful_delete(self):
-        client = MongoClient()
+        client = Connection.client
         client.drop_database("test_database")
         self.db = client['test_database']
 
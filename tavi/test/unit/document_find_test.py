@@ -1,7 +1,12 @@
 # -*- coding: utf-8 -*-
+import time
 import unittest
-from pymongo import MongoClient
+from bson import ObjectId
+from bson.json_util import loads
+from mock import patch
+from tavi import Connection
 from tavi.documents import Document
+from tavi.errors import TaviError
 from tavi import fields
 
 
@@ -10,9 +15,13 @@ class DocumentFindTest(unittest.TestCase):
         first_name = fields.StringField("first_name", required=True)
         last_name = fields.StringField("last_name",  required=True)
 
+    class Person(Document):
+        first_name = fields.StringField("fn")
+        last_name = fields.StringField("ln")
+
     def setUp(self):
         super(DocumentFindTest, self).setUp()
-        client = MongoClient()
+        client = Connection.client
         client.drop_database("test_database")
         self.db = client['test_database']
         self.ids = self.db.samples.insert(
@@ -43,6 +52,14 @@ class DocumentFindTest(unittest.TestCase):
         self.assertEqual("Joe", result.first_name)
         self.assertEqual(self.ids[1], result.bson_id)
 
+    def test_fields_with_other_persisted_names(self):
+        self.db.people.insert({"fn": "Ann", "ln": "Lee"})
+
+        person = self.Person.find_one({"ln": "Lee"})
+        self.assertEqual(("Ann", "Lee"), (person.first_name, person.last_name))
+        self.assertEqual(
+            ["Ann"], [found.first_name for found in self.Person.find()])
+
     def test_find(self):
         result = self.Sample.find({"last_name": "Smith"})
         self.assertEqual(2, len(result))
@@ -62,3 +79,73 @@ class DocumentFindTest(unittest.TestCase):
 
     def test_count(self):
         self.assertEqual(3, self.Sample.count())
+
+    def test_count_with_spec(self):
+        self.assertEqual(2, self.Sample.count({"last_name": "Smith"}))
+
+    def test_estimated_count(self):
+        self.assertEqual(3, self.Sample.count(estimated=True))
+
+    def test_estimated_count_with_spec(self):
+        with self.assertRaises(TaviError):
+            self.Sample.count({"last_name": "Smith"}, estimated=True)
+
+    def test_cached_count(self):
+        spec = {"last_name": "Smith"}
+        self.assertEqual(2, self.Sample.count(spec, cache_ttl=60))
+
+        self.db.samples.insert({"first_name": "Jim", "last_name": "Smith"})
+        self.assertEqual(2, self.Sample.count(spec, cache_ttl=60))
+        self.assertEqual(3, self.Sample.count(spec))
+
+    def test_cached_count_is_cleared_by_insert_and_delete(self):
+        spec = {"last_name": "Smith"}
+        self.assertEqual(2, self.Sample.count(spec, cache_ttl=60))
+
+        sample = self.Sample(first_name="Jim", last_name="Smith")
+        sample.save()
+        self.assertEqual(3, self.Sample.count(spec, cache_ttl=60))
+
+        sample.delete()
+        self.assertEqual(2, self.Sample.count(spec, cache_ttl=60))
+
+    def test_cached_count_is_cleared_by_upsert(self):
+        spec = {"last_name": "Smith"}
+        self.assertEqual(2, self.Sample.count(spec, cache_ttl=60))
+
+        sample = self.Sample(first_name="Jim", last_name="Smith")
+        sample._id = ObjectId()
+        sample.save()
+        self.assertEqual(3, self.Sample.count(spec, cache_ttl=60))
+
+    @patch("tavi.documents.COUNT_CACHE_SIZE", 2)
+    def test_cached_counts_are_bounded(self):
+        self.Sample._invalidate_counts()
+        self.Sample.count({"first_name": "a"}, cache_ttl=0.001)
+        self.Sample.count({"first_name": "b"}, cache_ttl=60)
+        time.sleep(0.002)
+        self.Sample.count({"first_name": "c"}, cache_ttl=60)
+        self.Sample.count({"first_name": "d"}, cache_ttl=30)
+        self.Sample.count({"first_name": "e"}, cache_ttl=60)
+
+        self.assertEqual(2, len(self.Sample._count_cache))
+        self.assertEqual(
+            ["c", "e"],
+            sorted(loads(key)[0]["first_name"]
+                   for key in self.Sample._count_cache)
+        )
+
+    def test_expired_counts_are_removed(self):
+        self.Sample._invalidate_counts()
+        self.Sample.count(cache_ttl=0.001)
+        time.sleep(0.002)
+        self.db.samples.insert({"first_name": "Jim", "last_name": "Smith"})
+        self.assertEqual(4, self.Sample.count())
+        self.assertEqual(4, self.Sample.count(cache_ttl=0.001))
+        self.assertEqual(1, len(self.Sample._count_cache))
+
+    def test_cached_count_expires(self):
+        self.assertEqual(3, self.Sample.count(cache_ttl=0.001))
+        self.db.samples.insert({"first_name": "Jim", "last_name": "Smith"})
+        time.sleep(0.002)
+        self.assertEqual(4, self.Sample.count(cache_ttl=0.001))
@@ -2,7 +2,7 @@
 import pymongo
 import unittest
 from bson.objectid import ObjectId
-from pymongo import MongoClient
+from tavi import Connection
 from tavi.documents import EmbeddedDocument, Document
 from tavi import fields
 
@@ -31,7 +31,7 @@ class DocumentInsertTest(unittest.TestCase):
 
     def setUp(self):
         super(DocumentInsertTest, self).setUp()
-        client = MongoClient()
+        client = Connection.client
         client.drop_database("test_database")
         self.db = client['test_database']
         self.sample = self.Sample()
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+import datetime
+import re
+import unittest
+from bson import BSON, Binary, Code, ObjectId, Timestamp
+from bson.max_key import MaxKey
+from bson.min_key import MinKey
+from tavi import Connection
+from tavi.documents import Document, EmbeddedDocument
+from tavi.raw import RawDocument
+from tavi import fields
+from unit import BACKEND
+
+
+class RawDocumentTest(unittest.TestCase):
+    def test_decodes_each_value(self):
+        values = {
+            "double": 1.5,
+            "string": u"h\xe9llo",
+            u"\xfcber": 1,
+            "document": {"x": [1, 2, {"y": None}]},
+            "array": [1, "2"],
+            "binary": Binary("abc", 5),
+            "object_id": ObjectId(),
+            "boolean": True,
+            "datetime": datetime.datetime(2015, 1, 1),
+            "null": None,
+            "code": Code("y"),
+            "code_w_scope": Code("x = 1", {"s": 1}),
+            "int32": 7,
+            "int64": 2 ** 40,
+            "timestamp": Timestamp(1, 2),
+            "min_key": MinKey(),
+            "max_key": MaxKey()
+        }
+        document = RawDocument(BSON.encode(values))
+
+        self.assertEqual(sorted(values), sorted(document.keys()))
+        for key, value in values.items():
+            self.assertEqual(value, document[key])
+
+    def test_regex(self):
+        document = RawDocument(BSON.encode({"re": re.compile("a.b"), "n": 1}))
+        self.assertEqual("a.b", document["re"].pattern)
+        self.assertEqual(1, document["n"])
+
+    def test_missing_keys(self):
+        document = RawDocument(BSON.encode({"a": 1}))
+        self.assertIsNone(document.get("b"))
+        self.assertNotIn("b", document)
+        with self.assertRaises(KeyError):
+            document["b"]
+
+
+class Size(EmbeddedDocument):
+    width = fields.IntegerField("width")
+
+
+class Line(EmbeddedDocument):
+    sku = fields.StringField("sku")
+
+
+class Wide(Document):
+    name = fields.StringField("n")
+    quantity = fields.IntegerField("q", default=0)
+    tags = fields.ArrayField("t")
+    size = fields.EmbeddedField("s", Size)
+    lines = fields.ListField("ls", Line)
+    last_modified_at = fields.DateTimeField("m")
+
+
+class LazyWide(Document):
+    __lazy__ = True
+
+    name = fields.StringField("n")
+
+
+class Noted(Document):
+    name = fields.StringField("n")
+
+    def __init__(self, **kwargs):
+        super(Noted, self).__init__(**kwargs)
+        self.note = "noted"
+
+
+@unittest.skipUnless("memory" == BACKEND, "raw BSON reads need pymongo 3.2")
+class LazyDocumentTest(unittest.TestCase):
+    def setUp(self):
+        super(LazyDocumentTest, self).setUp()
+        Connection.client.drop_database("test_database")
+        Wide(
+            name="John",
+            quantity=3,
+            tags=["a"],
+            size=Size(width=2),
+            lines=[{"sku": "A-1"}]
+        ).save()
+        self.collection = Connection.database["wides"]
+
+    def test_fields_are_decoded_on_first_access(self):
+        wide = Wide.find(lazy=True)[0]
+        self.assertNotIn("_n", wide.__dict__)
+        self.assertIsNotNone(wide.bson_id)
+
+        self.assertEqual("John", wide.name)
+        self.assertIn("_n", wide.__dict__)
+        self.assertNotIn("_q", wide.__dict__)
+
+        self.assertEqual(3, wide.quantity)
+        self.assertEqual(["a"], wide.tags)
+        self.assertEqual(2, wide.size.width)
+        self.assertEqual(["A-1"], [line.sku for line in wide.lines])
+        self.assertEqual(set(), wide.changed_fields)
+
+    def test_find_one(self):
+        wide = Wide.find_one({"n": "John"}, lazy=True)
+        self.assertEqual(3, wide.quantity)
+        self.assertIsNone(Wide.find_one({"n": "Jane"}, lazy=True))
+
+    def test_init_of_subclasses_is_called(self):
+        Noted(name="John").save()
+        noted = Noted.find_one(lazy=True)
+        self.assertEqual("noted", noted.note)
+        self.assertEqual("John", noted.name)
+
+    def test_per_class_default(self):
+        LazyWide(name="John").save()
+        wide = LazyWide.find_one()
+        self.assertIn("_lazy", wide.__dict__)
+        self.assertEqual("John", wide.name)
+        self.assertNotIn("_lazy", LazyWide.find_one(lazy=False).__dict__)
+
+    def test_assigning_a_pending_field(self):
+        wide = Wide.find_one(lazy=True)
+        wide.quantity = 5
+        self.assertEqual(5, wide.quantity)
+        self.assertEqual(set(["q"]), wide.changed_fields)
+
+    def test_save_sends_dirty_fields_only(self):
+        wide = Wide.find_one(lazy=True)
+        self.collection.update({}, {"$set": {"n": "Jack", "q": 9}})
+
+        wide.quantity = 4
+        self.assertTrue(wide.save())
+
+        record = self.collection.find_one()
+        self.assertEqual("Jack", record["n"])
+        self.assertEqual(4, record["q"])
+        self.assertIsNotNone(record["m"])
+        self.assertEqual(1, Wide.count())
+
+    def test_save_sends_decoded_lists(self):
+        wide = Wide.find_one(lazy=True)
+        wide.tags.append("b")
+        wide.save()
+        self.assertEqual(["a", "b"], self.collection.find_one()["t"])
+
+    def test_to_columns(self):
+        columns = Wide.find(lazy=True).to_columns(["name", "quantity"])
+        self.assertEqual(["John"], columns["name"].values.tolist())
+        self.assertEqual([3], columns["quantity"].values.tolist())
@@ -1,10 +1,37 @@
 # -*- coding: utf-8 -*-
 import unittest
-from pymongo import MongoClient
-from tavi.documents import Document
+from tavi import Connection
+from tavi.documents import Document, EmbeddedDocument
 from tavi import fields
 
 
+class Line(EmbeddedDocument):
+    sku = fields.StringField("sku", required=True)
+    quantity = fields.IntegerField("quantity")
+
+
+class Invoice(Document):
+    number = fields.IntegerField("number", required=True)
+    lines = fields.ListField("lines", Line)
+
+
+class NotedLine(EmbeddedDocument):
+    sku = fields.StringField("sku")
+
+    def __init__(self, **kwargs):
+        super(NotedLine, self).__init__(**kwargs)
+        self.note = "line"
+
+
+class NotedInvoice(Document):
+    number = fields.IntegerField("number")
+    lines = fields.ListField("lines", NotedLine)
+
+    def __init__(self, **kwargs):
+        super(NotedInvoice, self).__init__(**kwargs)
+        self.note = "invoice"
+
+
 class DocumentLoadOldSchemaTest(unittest.TestCase):
     """Tests the loading of data without fields which now exist in model"""
     class Sample(Document):
@@ -19,7 +46,7 @@ class DocumentLoadOldSchemaTest(unittest.TestCase):
 
     def setUp(self):
         super(DocumentLoadOldSchemaTest, self).setUp()
-        client = MongoClient()
+        client = Connection.client
         client.drop_database("test_database")
         self.db = client['test_database']
         self.ids = self.db.samples.insert(
@@ -41,3 +68,24 @@ class DocumentLoadOldSchemaTest(unittest.TestCase):
     def test_new_field_with_default(self):
         item = self.Sample.find_by_id(self.ids[0])
         self.assertEqual('default email', item.email)
+
+    def test_list_items_are_not_validated_again(self):
+        self.db.invoices.insert({
+            "lines": [{"sku": "A-1", "quantity": 1}, {"quantity": 2}]
+        })
+        invoice = Invoice.find_one()
+
+        self.assertEqual([1, 2], [line.quantity for line in invoice.lines])
+        self.assertIs(invoice, invoice.lines[1].owner)
+        self.assertEqual(['Number is required'], invoice.errors.full_messages)
+
+    def test_init_of_subclasses_is_called(self):
+        NotedInvoice(number=1, lines=[{"sku": "A-1"}]).save()
+
+        invoice = NotedInvoice.find_one()
+        for invoice in (invoice, NotedInvoice.from_bson(invoice.to_bson())):
+            self.assertEqual("invoice", invoice.note)
+            self.assertEqual(1, invoice.number)
+            self.assertIsNotNone(invoice.bson_id)
+            self.assertEqual(["line"], [line.note for line in invoice.lines])
+            self.assertEqual(["A-1"], [line.sku for line in invoice.lines])
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+import copy
+import cPickle
+import datetime
+import pickle
+import unittest
+from bson import ObjectId
+from mock import patch
+from tavi.documents import Document, EmbeddedDocument
+from tavi import fields
+
+
+class Dimensions(EmbeddedDocument):
+    width = fields.FloatField("width")
+
+
+class Line(EmbeddedDocument):
+    sku = fields.StringField("sku")
+
+
+class Shipment(Document):
+    label = fields.StringField("l", required=True)
+    weight = fields.FloatField("w", min_value=0)
+    pieces = fields.IntegerField("p", default=1)
+    shipped_at = fields.DateTimeField("at")
+    tags = fields.ArrayField("t")
+    dimensions = fields.EmbeddedField("d", Dimensions)
+    lines = fields.ListField("ls", Line)
+    note = fields.StringField("note", persist=False)
+
+
+class DocumentSnapshotTest(unittest.TestCase):
+    def setUp(self):
+        super(DocumentSnapshotTest, self).setUp()
+        self.shipment = Shipment(
+            label="Crate",
+            weight=12.5,
+            shipped_at=datetime.datetime(2015, 3, 4, 5, 6, 7, 8000),
+            tags=["fragile"],
+            dimensions=Dimensions(width=2.0),
+            lines=[{"sku": "A-1"}, {"sku": "B-2"}]
+        )
+        self.shipment._id = ObjectId("520a5fca4f8a1e1c32000001")
+
+    def assertSameShipment(self, copy):
+        self.assertIsInstance(copy, Shipment)
+        self.assertEqual(self.shipment.bson_id, copy.bson_id)
+        self.assertEqual(self.shipment.field_values, copy.field_values)
+        self.assertEqual(set(), copy.changed_fields)
+        self.assertTrue(copy.valid)
+
+    def test_bson_round_trip(self):
+        data = self.shipment.to_bson()
+        self.assertIsInstance(data, bytes)
+        self.assertSameShipment(Shipment.from_bson(data))
+
+    def test_snapshot_uses_persisted_names(self):
+        data = self.shipment.to_bson()
+        self.assertIn(b"\x02l\x00", data)
+        self.assertNotIn(b"label", data)
+
+    def test_unsaved_document(self):
+        copy = Shipment.from_bson(Shipment(label="Box").to_bson())
+        self.assertIsNone(copy.bson_id)
+        self.assertEqual("Box", copy.label)
+        self.assertEqual(1, copy.pieces)
+        self.assertEqual([], copy.tags)
+
+    def test_from_bson_does_not_validate_plain_fields(self):
+        data = self.shipment.to_bson()
+        with patch.object(fields.IntegerField, "validate") as validate:
+            Shipment.from_bson(data)
+        self.assertFalse(validate.called)
+
+    def test_pickle(self):
+        for dumps, loads in [(pickle.dumps, pickle.loads),
+                             (cPickle.dumps, cPickle.loads)]:
+            for protocol in (0, 2):
+                copy = loads(dumps(self.shipment, protocol))
+                self.assertSameShipment(copy)
+
+    def test_copies_keep_their_state(self):
+        self.shipment.note = "handle with care"
+        self.shipment.changed_fields = set(["l"])
+        self.shipment.tmp = object()
+
+        for copied in (copy.copy(self.shipment),
+                       copy.deepcopy(self.shipment)):
+            self.assertEqual(set(["l"]), copied.changed_fields)
+            self.assertEqual("handle with care", copied.note)
+            self.assertTrue(hasattr(copied, "tmp"))
+            self.assertEqual(self.shipment.field_values, copied.field_values)
+
+        copied = copy.deepcopy(self.shipment)
+        copied.lines[0].sku = "C-3"
+        self.assertEqual("A-1", self.shipment.lines[0].sku)
+        self.assertIs(copied, copied.lines.owner)
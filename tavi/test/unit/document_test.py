@@ -1,8 +1,6 @@
 # -*- coding: utf-8 -*-
 import unittest
-from pymongo import MongoClient
-from pymongo.collection import Collection
-from pymongo.database import Database
+from tavi import Connection
 from tavi.documents import Document
 from tavi import fields
 
@@ -20,10 +18,7 @@ class DocumentTest(unittest.TestCase):
 
     def test_has_a_collection(self):
         self.assertEqual(
-            Collection(
-                Database(MongoClient('localhost', 27017), 'test_database'),
-                'samples'
-            ),
+            Connection.database['samples'],
             self.Sample.collection
         )
 
@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 import unittest
-from pymongo import MongoClient
+from tavi import Connection
 from tavi.documents import EmbeddedDocument, Document
 from tavi import fields
 
@@ -21,7 +21,7 @@ class DocumentUpdateTest(unittest.TestCase):
 
     def setUp(self):
         super(DocumentUpdateTest, self).setUp()
-        client = MongoClient()
+        client = Connection.client
         client.drop_database("test_database")
         self.db = client['test_database']
         self.sample = self.Sample()
@@ -4,6 +4,15 @@ from tavi.documents import EmbeddedDocument
 from tavi import fields
 
 
+class Tag(EmbeddedDocument):
+    label = fields.StringField("label")
+
+
+class Tagged(EmbeddedDocument):
+    tags = fields.ListField("tags", Tag)
+    codes = fields.ArrayField("codes")
+
+
 class EmbeddedDocumentTest(unittest.TestCase):
     class Sample(EmbeddedDocument):
         first_name = fields.StringField("first_name")
@@ -56,3 +65,19 @@ class EmbeddedDocumentTest(unittest.TestCase):
 
     def test_unequal_if_one_is_none(self):
         self.assertFalse(self.Sample is None)
+
+    def test_not_equal_operator(self):
+        sample_a = self.Sample(first_name="John")
+        self.assertFalse(sample_a != self.Sample(first_name="John"))
+        self.assertTrue(sample_a != self.Sample(first_name="James"))
+        self.assertTrue(sample_a != None)  # noqa: E711
+
+    def test_compares_lists_of_embedded_documents(self):
+        tagged = Tagged(tags=[{"label": "a"}], codes=[1])
+        self.assertEqual(Tagged(tags=[{"label": "a"}], codes=[1]), tagged)
+        self.assertNotEqual(Tagged(tags=[{"label": "b"}], codes=[1]), tagged)
+        self.assertNotEqual(Tagged(tags=[{"label": "a"}], codes=[2]), tagged)
+
+    def test_empty_lists_equal_missing_values(self):
+        self.assertEqual(Tagged(), Tagged(tags=[], codes=[]))
+        self.assertEqual(Tagged().field_values, Tagged(codes=[]).field_values)
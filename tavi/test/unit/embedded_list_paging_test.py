@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+import unittest
+from tavi import Connection
+from tavi import instrumentation
+from tavi.documents import Document, EmbeddedDocument
+from tavi import fields
+
+
+class Entry(EmbeddedDocument):
+    number = fields.IntegerField("number", required=True)
+
+
+class Ledger(Document):
+    name = fields.StringField("name")
+    entries = fields.ListField("e", Entry, lazy=True, page_size=3)
+
+
+class EmbeddedListPagingTest(unittest.TestCase):
+    def setUp(self):
+        super(EmbeddedListPagingTest, self).setUp()
+        Connection.client.drop_database("test_database")
+        Ledger(
+            name="Big",
+            entries=[{"number": i} for i in range(8)]
+        ).save()
+        Ledger(name="Small", entries=[{"number": 0}]).save()
+
+        self.events = []
+        instrumentation.register(self.events.append)
+
+    def tearDown(self):
+        super(EmbeddedListPagingTest, self).tearDown()
+        instrumentation.unregister(self.events.append)
+
+    def reads(self):
+        return [e.operation for e in self.events]
+
+    def numbers(self, entries):
+        return [entry.number for entry in entries]
+
+    def test_reads_the_first_page(self):
+        ledger = Ledger.find_one({"name": "Big"})
+        self.assertEqual([0, 1, 2], self.numbers(ledger.entries.list_))
+        self.assertEqual(["find_one"], self.reads())
+
+    def test_len_is_counted_by_the_server(self):
+        ledger = Ledger.find_one({"name": "Big"})
+        self.assertEqual(8, len(ledger.entries))
+        self.assertEqual(8, len(ledger.entries))
+        self.assertEqual(3, len(ledger.entries.list_))
+        self.assertEqual(["find_one", "list_size"], self.reads())
+
+    def test_iterating_reads_the_next_pages(self):
+        ledger = Ledger.find_one({"name": "Big"})
+        self.assertEqual(range(8), self.numbers(ledger.entries))
+        self.assertEqual(
+            ["find_one", "list_page", "list_page"], self.reads())
+
+        self.assertEqual(range(8), self.numbers(ledger.entries))
+        self.assertEqual(8, len(ledger.entries))
+        self.assertEqual(3, len(self.reads()))
+
+    def test_indexing_past_the_first_page(self):
+        ledger = Ledger.find({"name": "Big"})[0]
+        self.assertEqual(4, ledger.entries[4].number)
+        self.assertEqual(["find", "list_page"], self.reads())
+        self.assertEqual(7, ledger.entries[-1].number)
+        with self.assertRaises(IndexError):
+            ledger.entries[8]
+
+    def test_short_lists_are_complete(self):
+        ledger = Ledger.find_one({"name": "Small"})
+        self.assertEqual(1, len(ledger.entries))
+        self.assertEqual([0], self.numbers(ledger.entries))
+        self.assertEqual(["find_one"], self.reads())
+
+    def test_changes_read_all_the_items_first(self):
+        ledger = Ledger.find_one({"name": "Big"})
+        ledger.entries.append(Entry(number=8))
+        self.assertTrue(ledger.save())
+
+        record = Ledger.collection.find_one({"name": "Big"})
+        self.assertEqual(range(9), [e["number"] for e in record["e"]])
+
+    def test_saving_an_unchanged_list_keeps_all_the_items(self):
+        ledger = Ledger.find_one({"name": "Big"})
+        ledger.name = "Bigger"
+        ledger.save()
+
+        record = Ledger.collection.find_one({"name": "Bigger"})
+        self.assertEqual(range(8), [e["number"] for e in record["e"]])
+
+    def test_projection_reads_whole_lists(self):
+        ledger = Ledger.find_one({"name": "Big"}, {"e": True})
+        self.assertEqual(8, len(ledger.entries.list_))
@@ -1,9 +1,10 @@
 # -*- coding: utf-8 -*-
 import unittest
+from mock import patch
 from tavi import fields
 from tavi.documents import Document, EmbeddedDocument
 from tavi import EmbeddedList
-from tavi.errors import TaviTypeError
+from tavi.errors import TaviError, TaviTypeError
 
 
 class EmbeddedListTest(unittest.TestCase):
@@ -95,6 +96,44 @@ class EmbeddedListTest(unittest.TestCase):
             self.owner.errors.full_messages
         )
 
+    def test_extend_checks_types_first(self):
+        with self.assertRaises(TaviTypeError):
+            self.my_list.extend([self.address1, "not an address"])
+        self.assertEqual([], self.my_list)
+
+    def test_extend_validates_each_item_once(self):
+        self.my_list.owner = self.owner
+        with patch.object(
+            self.Address, "__validate__", autospec=True
+        ) as validate:
+            self.my_list.extend([self.address1, self.address2])
+
+        self.assertEqual(2, validate.call_count)
+        self.assertEqual([self.address1, self.address2], self.my_list)
+        self.assertEqual(self.owner, self.address2.owner)
+
+    def test_extend_reports_errors_by_index(self):
+        self.my_list.owner = self.owner
+        self.my_list.extend([self.address1, self.Address(), self.address2])
+
+        self.assertEqual([self.address1, self.address2], self.my_list)
+        self.assertEqual(
+            ["Addresses[1] Error: Street is required"],
+            self.owner.errors.full_messages
+        )
+
+    def test_extend_trusted(self):
+        self.my_list.owner = self.owner
+        with patch.object(
+            self.Address, "__validate__", autospec=True
+        ) as validate:
+            self.my_list.extend_trusted([self.address1, self.Address()])
+
+        self.assertFalse(validate.called)
+        self.assertEqual(2, len(self.my_list))
+        self.assertEqual(self.owner, self.my_list[1].owner)
+        self.assertEqual([], self.owner.errors.full_messages)
+
     def test_find_item(self):
         self.my_list.append(self.address1)
         self.my_list.append(self.address2)
@@ -115,3 +154,66 @@ class EmbeddedListTest(unittest.TestCase):
 
         self.my_list.remove(self.address1)
         self.assertEqual([], self.my_list)
+
+
+class KeyedEmbeddedListTest(unittest.TestCase):
+    class Line(EmbeddedDocument):
+        sku = fields.StringField("sku", required=True)
+        quantity = fields.IntegerField("quantity")
+
+    def setUp(self):
+        super(KeyedEmbeddedListTest, self).setUp()
+        self.lines = EmbeddedList("lines", self.Line, key="sku")
+        self.lines.extend([
+            self.Line(sku="A", quantity=1),
+            self.Line(sku="B", quantity=2),
+            self.Line(sku="A", quantity=3)
+        ])
+
+    def test_key_must_be_a_field(self):
+        with self.assertRaises(TaviError):
+            EmbeddedList("lines", self.Line, key="price")
+
+    def test_get_by_key(self):
+        self.assertEqual(1, self.lines.get_by_key("A").quantity)
+        self.assertEqual(2, self.lines.get_by_key("B").quantity)
+        self.assertIsNone(self.lines.get_by_key("C"))
+        self.assertTrue(self.lines.contains_key("B"))
+        self.assertFalse(self.lines.contains_key("C"))
+
+    def test_requires_a_key(self):
+        with self.assertRaises(TaviError):
+            EmbeddedList("lines", self.Line).get_by_key("A")
+
+    def test_find(self):
+        found = self.lines.find(self.Line(sku="A", quantity=3))
+        self.assertEqual(3, found.quantity)
+        self.assertIsNone(self.lines.find(self.Line(sku="A", quantity=2)))
+        self.assertIn(self.Line(sku="B", quantity=2), self.lines)
+
+    def test_index_follows_changes(self):
+        self.lines.get_by_key("A")
+
+        del self.lines[0]
+        self.assertEqual(3, self.lines.get_by_key("A").quantity)
+
+        self.lines.insert(0, self.Line(sku="A", quantity=4))
+        self.assertEqual(4, self.lines.get_by_key("A").quantity)
+
+        self.lines.append(self.Line(sku="C", quantity=5))
+        self.assertEqual(5, self.lines.get_by_key("C").quantity)
+
+        self.lines[-1] = self.Line(sku="D", quantity=6)
+        self.assertFalse(self.lines.contains_key("C"))
+        self.assertEqual(6, self.lines.get_by_key("D").quantity)
+
+        self.lines.remove(self.lines.get_by_key("B"))
+        self.assertIsNone(self.lines.get_by_key("B"))
+        self.assertEqual(["A", "A", "D"], [line.sku for line in self.lines])
+
+    def test_list_field(self):
+        class Order(Document):
+            lines = fields.ListField("lines", self.Line, key="sku")
+
+        order = Order(lines=[{"sku": "A", "quantity": 1}])
+        self.assertEqual(1, order.lines.get_by_key("A").quantity)
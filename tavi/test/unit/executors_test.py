@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+import threading
+import unittest
+from concurrent.futures import Future
+from tavi import Connection
+from tavi import executors
+from tavi.documents import Document
+from tavi import fields
+
+
+class BoundedExecutorTest(unittest.TestCase):
+    def test_submit_returns_future(self):
+        with executors.BoundedExecutor(2) as executor:
+            future = executor.submit(lambda x: x * 2, 21)
+            self.assertIsInstance(future, Future)
+            self.assertEqual(42, future.result())
+
+    def test_submit_blocks_when_full(self):
+        release = threading.Event()
+        submitted = threading.Event()
+
+        with executors.BoundedExecutor(1, max_pending=1) as executor:
+            executor.submit(release.wait)
+
+            def producer():
+                executor.submit(lambda: None)
+                submitted.set()
+
+            thread = threading.Thread(target=producer)
+            thread.start()
+            self.assertFalse(submitted.wait(0.05))
+
+            release.set()
+            self.assertTrue(submitted.wait(1))
+            thread.join()
+
+    def test_shared_executor(self):
+        self.assertIs(executors.shared(), executors.shared())
+
+        executors.configure(max_workers=3)
+        try:
+            self.assertEqual(3, executors.shared().max_workers)
+        finally:
+            executors.configure()
+
+
+class ConcurrentSaveTest(unittest.TestCase):
+    class Sample(Document):
+        name = fields.StringField("name", required=True, unique=True)
+
+    def setUp(self):
+        super(ConcurrentSaveTest, self).setUp()
+        Connection.client.drop_database("test_database")
+
+    def test_save_async(self):
+        sample = self.Sample(name="John")
+        future = sample.save_async()
+
+        self.assertTrue(future.result())
+        self.assertIsNotNone(sample.bson_id)
+
+    def test_save_async_with_executor(self):
+        with executors.BoundedExecutor(1) as executor:
+            self.assertFalse(self.Sample().save_async(executor).result())
+
+    def test_save_many_concurrently(self):
+        samples = [self.Sample(name="sample %s" % i) for i in range(100)]
+        duplicate = self.Sample(name="sample 1")
+        invalid = self.Sample()
+
+        results = self.Sample.save_many_concurrently(
+            samples + [invalid], max_workers=4)
+        self.assertEqual([True] * 100 + [False], results)
+
+        self.assertEqual(
+            [False], self.Sample.save_many_concurrently([duplicate]))
+        self.assertEqual(
+            ["Name must be unique"], duplicate.errors.full_messages)
+        self.assertEqual(100, self.Sample.count())
+
+    def test_save_many_concurrently_from_generator(self):
+        samples = (self.Sample(name="sample %s" % i) for i in range(10))
+        self.assertTrue(all(self.Sample.save_many_concurrently(samples)))
+        self.assertEqual(10, self.Sample.count())
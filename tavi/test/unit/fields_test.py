@@ -3,6 +3,7 @@ import unittest
 from bson import ObjectId
 from bson.json_util import dumps, loads
 from datetime import datetime
+from mock import patch
 from tavi import fields
 from tavi.documents import Document, EmbeddedDocument
 from tavi.errors import TaviTypeError, Errors
@@ -689,6 +690,36 @@ class EmbeddedFieldTest(unittest.TestCase):
         t = Target()
         self.assertEqual("default", t.address.afield)
 
+    def test_each_instance_has_its_own_value(self):
+        class Address(EmbeddedDocument):
+            street = fields.StringField("street")
+
+        class Target(Document):
+            address = fields.EmbeddedField("address", Address)
+
+        first = Target(address=Address(street="Elm"))
+        second = Target(address=Address(street="Pine"))
+        self.assertEqual("Elm", first.address.street)
+        self.assertEqual("Pine", second.address.street)
+
+        first.address.street = "Oak"
+        self.assertEqual("Pine", second.address.street)
+
+    def test_creates_the_value_on_first_access(self):
+        class Address(EmbeddedDocument):
+            street = fields.StringField("street")
+
+        with patch.object(Address, "__init__", return_value=None) as init:
+            class Target(object):
+                f = fields.EmbeddedField("address", Address)
+                errors = Errors()
+
+            self.assertFalse(init.called)
+            first, second = Target(), Target()
+            self.assertIsNot(first.f, second.f)
+            self.assertIs(first.f, first.f)
+            self.assertEqual(2, init.call_count)
+
     def test_type_checking_on_default_value(self):
         class Address(EmbeddedDocument):
             afield = fields.StringField("afield")
@@ -736,6 +767,25 @@ class ListFieldTest(unittest.TestCase):
         order.f = Other()
         self.assertEqual(fields.EmbeddedList, order.f.__class__)
 
+    def test_must_be_a_list_of_embedded_documents(self):
+        class Other(object):
+            pass
+
+        with self.assertRaises(TaviTypeError):
+            fields.ListField("orderlines", Other)
+
+    def test_does_not_create_items_to_check_the_type(self):
+        class OrderLine(EmbeddedDocument):
+            pass
+
+        with patch.object(OrderLine, "__init__") as init:
+            class Order(object):
+                f = fields.ListField("orderlines", OrderLine)
+                errors = Errors()
+
+            self.assertEqual([], Order().f)
+            self.assertFalse(init.called)
+
 
 class ArrayFieldTest(unittest.TestCase):
     def setUp(self):
@@ -867,6 +917,31 @@ class ArrayFieldTest(unittest.TestCase):
         self.assertRaises(ValueError,
                           fields.ArrayField, "field", validate_item="wat")
 
+    def test_bad_validate_items_function(self):
+        self.assertRaises(ValueError,
+                          fields.ArrayField, "field", validate_items="wat")
+        self.assertRaises(ValueError,
+                          fields.ArrayField, "field", validate_items=[None])
+
+    def test_runs_validate_items_functions_once(self):
+        calls = []
+
+        def validate(field, document, items):
+            calls.append(list(items))
+            if 42 not in items:
+                document.errors.add(field.name, 'has no answer')
+
+        class Target(Document):
+            f = fields.ArrayField("violence", validate_items=[validate])
+            errors = Errors()
+
+        t = Target()
+        calls[:] = []
+
+        t.f = [1, 2, 3]
+        self.assertEqual([[1, 2, 3]], calls)
+        self.assertEqual(["Violence has no answer"], t.errors.full_messages)
+
     def test_runs_validate_function(self):
         def validate(field, document, item):
             if item != 42:
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+import datetime
+import unittest
+from tavi import Connection
+from tavi.documents import Document
+from tavi.errors import TaviError
+from tavi.indexes import Index
+from tavi import fields
+from unit import BACKEND
+
+
+class Event(Document):
+    __auto_index__ = False
+    __indexes__ = [
+        Index("kind", "-seen_at"),
+        Index("seen_at", expire_after_seconds=3600),
+        Index("user_id", sparse=True),
+        Index("code", unique=True, name="active_code",
+              partial_filter={"active": True})
+    ]
+
+    kind = fields.StringField("kind")
+    seen_at = fields.DateTimeField("seen")
+    user_id = fields.StringField("uid")
+    code = fields.StringField("code")
+    active = fields.BooleanField("active")
+
+
+class Badge(Document):
+    __auto_index__ = False
+    __indexes__ = [Index("number", unique=True, sparse=True)]
+
+    owner = fields.StringField("owner")
+    number = fields.StringField("no")
+
+
+class IndexTest(unittest.TestCase):
+    def test_needs_a_key(self):
+        with self.assertRaises(TaviError):
+            Index()
+
+    def test_unknown_option(self):
+        with self.assertRaises(TaviError):
+            Index("kind", ttl=5)
+
+    def test_unknown_field(self):
+        with self.assertRaises(TaviError):
+            class Broken(Document):
+                __indexes__ = [Index("missing")]
+
+    def test_spec_uses_mongo_names(self):
+        key, options = Event.__indexes__[0].spec(Event)
+        self.assertEqual([("kind", 1), ("seen", -1)], key)
+        self.assertEqual("kind_1_seen_-1", options["name"])
+        self.assertTrue(options["background"])
+
+    def test_spec_options(self):
+        _, ttl = Event.__indexes__[1].spec(Event)
+        self.assertEqual(3600, ttl["expireAfterSeconds"])
+
+        _, partial = Event.__indexes__[3].spec(Event)
+        self.assertEqual("active_code", partial["name"])
+        self.assertEqual({"active": True}, partial["partialFilterExpression"])
+
+
+class EnsureIndexesTest(unittest.TestCase):
+    class Sample(Document):
+        name = fields.StringField("name", unique=True)
+        rank = fields.IntegerField("rank")
+
+        __indexes__ = [Index("-rank")]
+
+    def setUp(self):
+        super(EnsureIndexesTest, self).setUp()
+        Connection.client.drop_database("test_database")
+
+    def test_diff_and_ensure(self):
+        diff = Event.diff_indexes()
+        self.assertFalse(diff.in_sync)
+        self.assertEqual(4, len(diff.missing))
+
+        created = Event.ensure_indexes()
+        self.assertEqual(4, len(created))
+        self.assertTrue(Event.diff_indexes().in_sync)
+        self.assertEqual([], Event.ensure_indexes())
+
+    def test_extra_and_changed_indexes(self):
+        collection = Event.collection
+        collection.create_index("active")
+        collection.create_index("uid")
+
+        diff = Event.diff_indexes()
+        self.assertEqual(["active_1"], diff.extra)
+        self.assertEqual(
+            ["uid_1"], [options["name"] for _, options in diff.changed])
+        self.assertNotIn("uid_1", Event.ensure_indexes())
+
+    def test_ttl_of_zero_seconds(self):
+        class Expiring(Document):
+            __auto_index__ = False
+            __indexes__ = [Index("seen_at", expire_after_seconds=0)]
+
+            seen_at = fields.DateTimeField("seen")
+
+        Expiring.collection.create_index("seen")
+        diff = Expiring.diff_indexes()
+        self.assertEqual(
+            ["seen_1"], [options["name"] for _, options in diff.changed])
+
+    def test_auto_index(self):
+        self.Sample.collection
+        info = self.Sample.collection.index_information()
+        self.assertEqual([("rank", -1)], info["rank_-1"]["key"])
+        self.assertTrue(info["name_unique_index"]["unique"])
+        self.assertTrue(self.Sample.diff_indexes().in_sync)
+
+    def test_declared_unique_index_violation(self):
+        Event.ensure_indexes()
+        Event(code="a", active=True).save()
+        Event(code="a", active=False).save()
+
+        event = Event(code="a", active=True)
+        self.assertFalse(event.save())
+        self.assertEqual(["Code must be unique"], event.errors.full_messages)
+
+    @unittest.skipUnless(
+        "memory" == BACKEND, "the TTL monitor of mongod runs every 60s")
+    def test_ttl_index(self):
+        Event.ensure_indexes()
+        Event(seen_at=datetime.datetime.utcnow()).save()
+        Event(seen_at=datetime.datetime.utcnow() -
+              datetime.timedelta(hours=2)).save()
+
+        self.assertEqual(1, Event.count())
+
+    def test_sparse_index(self):
+        Event.ensure_indexes()
+        Event(kind="a").save()
+        Event(kind="b", user_id="u").save()
+
+        self.assertEqual(["b"], [e.kind for e in Event.find({"uid": "u"})])
+        self.assertEqual(
+            ["a"], [e.kind for e in Event.find({"uid": {"$exists": False}})])
+
+    def test_missing_values_of_sparse_fields_are_not_written(self):
+        Badge.ensure_indexes()
+        first, second = Badge(owner="a"), Badge(owner="b")
+        self.assertTrue(first.save())
+        self.assertTrue(second.save())
+
+        second.number = "1"
+        self.assertTrue(second.save())
+        second.number = None
+        self.assertTrue(second.save())
+        self.assertNotIn("no", Connection.database["badges"].find_one(
+            {"owner": "b"}))
+        self.assertTrue(Badge(owner="c").save())
+
+    def test_unique_error_field_from_server_messages(self):
+        self.assertEqual("name", self.Sample._unique_error_field(
+            "E11000 duplicate key error index: "
+            "test_database.samples.$name_unique_index  dup key: { : \"a\" }"
+        ))
+        self.assertEqual("code", Event._unique_error_field(
+            "E11000 duplicate key error collection: test_database.events "
+            "index: active_code dup key: { : \"a\" }"
+        ))
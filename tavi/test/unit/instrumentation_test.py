@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+import unittest
+from tavi import Connection
+from tavi import instrumentation
+from tavi.documents import Document
+from tavi import fields
+
+
+class HistogramTest(unittest.TestCase):
+    def test_empty_histogram(self):
+        histogram = instrumentation.Histogram()
+        self.assertEqual(0, histogram.count)
+        self.assertIsNone(histogram.percentile(50))
+
+    def test_percentiles(self):
+        histogram = instrumentation.Histogram()
+        for i in range(1, 101):
+            histogram.record(i / 1000.0)
+
+        self.assertEqual(100, histogram.count)
+        self.assertAlmostEqual(0.050, histogram.percentile(50), delta=0.001)
+        self.assertAlmostEqual(0.095, histogram.percentile(95), delta=0.002)
+        self.assertAlmostEqual(0.099, histogram.percentile(99), delta=0.002)
+        self.assertEqual(0.001, histogram.min)
+        self.assertEqual(0.1, histogram.max)
+
+    def test_summary(self):
+        histogram = instrumentation.Histogram()
+        histogram.record(0.5)
+        summary = histogram.summary()
+
+        self.assertEqual(1, summary["count"])
+        self.assertEqual(0.5, summary["mean"])
+        self.assertEqual(0.5, summary["p50"])
+        self.assertEqual(0.5, summary["p99"])
+
+
+class InstrumentationTest(unittest.TestCase):
+    class Sample(Document):
+        name = fields.StringField("name", required=True)
+
+    def setUp(self):
+        super(InstrumentationTest, self).setUp()
+        client = Connection.client
+        client.drop_database("test_database")
+        self.events = []
+        instrumentation.register(self.events.append)
+
+    def tearDown(self):
+        super(InstrumentationTest, self).tearDown()
+        instrumentation.unregister(self.events.append)
+
+    def test_listener_must_be_callable(self):
+        with self.assertRaises(ValueError):
+            instrumentation.register("not callable")
+
+    def test_insert_event(self):
+        sample = self.Sample(name="John")
+        assert sample.save(), sample.errors.full_messages
+
+        self.assertEqual(1, len(self.events))
+        event = self.events[0]
+        self.assertEqual("insert", event.operation)
+        self.assertEqual("Sample", event.class_name)
+        self.assertEqual("samples", event.collection)
+        self.assertEqual(1, event.count)
+        self.assertTrue(event.payload_size > 0)
+        self.assertEqual(
+            set(["validate", "serialize", "network"]),
+            set(event.phases.keys())
+        )
+
+    def test_update_event(self):
+        sample = self.Sample(name="John")
+        sample.save()
+        sample.name = "Joe"
+        sample.save()
+
+        self.assertEqual("update", self.events[1].operation)
+
+    def test_no_event_if_invalid(self):
+        self.assertFalse(self.Sample().save())
+        self.assertEqual([], self.events)
+
+    def test_find_events(self):
+        self.Sample(name="John").save()
+        self.Sample(name="Joe").save()
+        del self.events[:]
+
+        list(self.Sample.find())
+        self.Sample.find_one({"name": "John"})
+
+        find, find_one = self.events
+        self.assertEqual("find", find.operation)
+        self.assertEqual(2, find.count)
+        self.assertEqual(set(["network", "hydrate"]), set(find.phases.keys()))
+        self.assertEqual("find_one", find_one.operation)
+        self.assertEqual(1, find_one.count)
+
+    def test_delete_event(self):
+        sample = self.Sample(name="John")
+        sample.save()
+        sample.delete()
+
+        self.assertEqual("delete", self.events[-1].operation)
+        self.assertEqual(1, self.events[-1].count)
+
+    def test_failing_listener_does_not_break_operation(self):
+        def broken(event):
+            raise RuntimeError("boom")
+
+        instrumentation.register(broken)
+        try:
+            self.assertTrue(self.Sample(name="John").save())
+        finally:
+            instrumentation.unregister(broken)
+
+    def test_histogram_aggregator(self):
+        histograms = instrumentation.HistogramAggregator()
+        instrumentation.register(histograms)
+        try:
+            self.Sample(name="John").save()
+            list(self.Sample.find())
+            list(self.Sample.find())
+        finally:
+            instrumentation.unregister(histograms)
+
+        summary = histograms.dump()
+        self.assertEqual(2, summary["operations"]["find"]["count"])
+        self.assertEqual(1, summary["classes"]["Sample"]["insert"]["count"])
+        self.assertIsNotNone(summary["classes"]["Sample"]["find"]["p99"])
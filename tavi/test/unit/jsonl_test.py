@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+import datetime
+import json
+import unittest
+from StringIO import StringIO
+from tavi import Connection
+from tavi import instrumentation
+from tavi.documents import Document
+from tavi.errors import TaviError
+from tavi import fields
+
+
+class Product(Document):
+    name = fields.StringField("n", required=True)
+    price = fields.FloatField("p", min_value=0)
+    released_on = fields.DateTimeField("r")
+
+
+class ExportJsonlTest(unittest.TestCase):
+    def setUp(self):
+        super(ExportJsonlTest, self).setUp()
+        Connection.client.drop_database("test_database")
+        self.widget = Product(
+            name="Widget",
+            price=9.99,
+            released_on=datetime.datetime(2013, 8, 25, 22, 24, 0)
+        )
+        self.widget.save()
+        Product(name="Gadget", price=5.0).save()
+
+    def test_exports_one_document_per_line(self):
+        out = StringIO()
+        report = Product.export_jsonl(out, {"n": "Widget"})
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual(1, len(lines))
+        self.assertEqual({
+            "id": {"$oid": str(self.widget.bson_id)},
+            "name": "Widget",
+            "price": 9.99,
+            "released_on": {"$date": 1377469440000}
+        }, json.loads(lines[0]))
+        self.assertEqual(1, report.rows)
+        self.assertGreater(report.rows_per_second, 0)
+
+    def test_exports_only_given_fields(self):
+        out = StringIO()
+        Product.export_jsonl(out, fields=["name"])
+
+        self.assertEqual(
+            [["id", "name"], ["id", "name"]],
+            [sorted(json.loads(l)) for l in out.getvalue().splitlines()]
+        )
+
+    def test_unknown_field(self):
+        with self.assertRaises(TaviError):
+            Product.export_jsonl(StringIO(), fields=["weight"])
+
+
+class ImportJsonlTest(unittest.TestCase):
+    def setUp(self):
+        super(ImportJsonlTest, self).setUp()
+        Connection.client.drop_database("test_database")
+        self.events = []
+        instrumentation.register(self.events.append)
+
+    def tearDown(self):
+        super(ImportJsonlTest, self).tearDown()
+        instrumentation.unregister(self.events.append)
+
+    def test_round_trip(self):
+        Product(name="Widget", price=9.99).save()
+        Product(name="Gadget", price=5.0).save()
+        out = StringIO()
+        Product.export_jsonl(out)
+        exported = Product.find()
+
+        Connection.client.drop_database("test_database")
+        report = Product.import_jsonl(StringIO(out.getvalue()))
+
+        self.assertEqual(2, report.rows)
+        self.assertEqual(
+            sorted((p.bson_id, p.name, p.price) for p in exported),
+            sorted((p.bson_id, p.name, p.price) for p in Product.find())
+        )
+
+    def test_inserts_in_batches(self):
+        lines = "\n".join(
+            '{"name": "P%s", "price": %s}' % (i, i) for i in range(5))
+        report = Product.import_jsonl(StringIO(lines), batch_size=2)
+
+        self.assertEqual(5, report.rows)
+        self.assertEqual(5, Product.count())
+        imports = [e for e in self.events if "import_jsonl" == e.operation]
+        self.assertEqual([5], [e.count for e in imports])
+
+    def test_skips_invalid_documents(self):
+        lines = StringIO(
+            '{"name": "Widget", "price": 1.5}\n'
+            '\n'
+            '{"price": -1.0}\n'
+        )
+        report = Product.import_jsonl(lines)
+
+        self.assertEqual(1, report.rows)
+        self.assertEqual(1, report.invalid)
+        self.assertEqual(3, report.errors[0][0])
+        self.assertEqual(["Widget"], [p.name for p in Product.find()])
+
+    def test_without_validation(self):
+        report = Product.import_jsonl(
+            StringIO('{"price": -1.0}\n'), validate=False)
+
+        self.assertEqual(1, report.rows)
+        self.assertEqual([{"p": -1.0}], list(
+            Product.collection.find({}, {"_id": False})))
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+import re
+import unittest
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from tavi.backends import get_backend, MemoryBackend, MongoBackend
+from tavi.backends.memory import MemoryClient
+from tavi.base.backends import BaseBackend
+from tavi.errors import TaviError
+
+
+class GetBackendTest(unittest.TestCase):
+    def test_by_name(self):
+        self.assertIsInstance(get_backend("memory"), MemoryBackend)
+        self.assertIsInstance(get_backend("mongo"), MongoBackend)
+
+    def test_by_instance(self):
+        backend = MemoryBackend()
+        self.assertIs(backend, get_backend(backend))
+
+    def test_unknown_backend(self):
+        with self.assertRaises(TaviError):
+            get_backend("no such backend")
+
+    def test_backends_must_connect(self):
+        class Incomplete(BaseBackend):
+            pass
+
+        with self.assertRaises(TypeError):
+            Incomplete()
+
+
+class MemoryCollectionTest(unittest.TestCase):
+    def setUp(self):
+        super(MemoryCollectionTest, self).setUp()
+        self.db = MemoryClient()["test_database"]
+        self.collection = self.db.people
+        self.ids = self.collection.insert([
+            {"name": "John", "age": 42, "tags": ["a", "b"]},
+            {"name": "Joe", "age": 17, "address": {"city": "Anywhere"}},
+            {"name": "Jane", "age": 30, "tags": ["b"]}
+        ])
+
+    def names(self, *args, **kwargs):
+        return [d["name"] for d in self.collection.find(*args, **kwargs)]
+
+    def test_insert_assigns_ids(self):
+        self.assertEqual(3, len(self.ids))
+        self.assertTrue(all(isinstance(i, ObjectId) for i in self.ids))
+        self.assertEqual(3, self.collection.count())
+
+    def test_insert_rejects_invalid_keys(self):
+        with self.assertRaises(Exception):
+            self.collection.insert({"$bad": 1})
+
+    def test_find_returns_copies(self):
+        self.collection.find_one(self.ids[0])["name"] = "Changed"
+        self.assertEqual("John", self.collection.find_one(self.ids[0])["name"])
+
+    def test_equality_and_array_membership(self):
+        self.assertEqual(["John", "Jane"], self.names({"tags": "b"}))
+        self.assertEqual(["Joe"], self.names({"address.city": "Anywhere"}))
+        self.assertEqual(["Joe"], self.names({"tags": None}))
+
+    def test_comparison_operators(self):
+        self.assertEqual(["John", "Jane"], self.names({"age": {"$gte": 30}}))
+        self.assertEqual(["Joe"], self.names({"age": {"$lt": 30}}))
+        self.assertEqual(
+            ["Joe", "Jane"], self.names({"name": {"$in": ["Joe", "Jane"]}}))
+        self.assertEqual(["John"], self.names({"name": {"$ne": "Joe"},
+                                               "age": {"$gt": 40}}))
+
+    def test_logical_operators(self):
+        spec = {"$or": [{"name": "Joe"}, {"age": 42}]}
+        self.assertEqual(["John", "Joe"], self.names(spec))
+        self.assertEqual(["Jane"], self.names({"$nor": spec["$or"]}))
+
+    def test_exists_regex_and_size(self):
+        self.assertEqual(["Joe"], self.names({"tags": {"$exists": False}}))
+        self.assertEqual(
+            ["Joe", "Jane"], self.names({"name": re.compile("e$")}))
+        self.assertEqual(["John"], self.names({"tags": {"$size": 2}}))
+
+    def test_unsupported_operator(self):
+        with self.assertRaises(OperationFailure):
+            list(self.collection.find({"$where": "true"}))
+
+    def test_sort_skip_and_limit(self):
+        self.assertEqual(
+            ["Joe", "Jane", "John"], self.names(sort=[("age", 1)]))
+        cursor = self.collection.find().sort("age", -1).skip(1).limit(1)
+        self.assertEqual(["Jane"], [d["name"] for d in cursor])
+        self.assertEqual(3, cursor.count())
+        self.assertEqual(1, cursor.count(with_limit_and_skip=True))
+
+    def test_projection(self):
+        doc = self.collection.find_one(self.ids[0], fields=["name"])
+        self.assertEqual(set(["_id", "name"]), set(doc.keys()))
+
+        doc = self.collection.find_one(self.ids[0], fields={"tags": 0})
+        self.assertNotIn("tags", doc)
+        self.assertIn("age", doc)
+
+    def test_slice_projection(self):
+        self.collection.update(
+            {"_id": self.ids[0]}, {"$set": {"tags": ["a", "b", "c", "d"]}})
+
+        def tags(projection):
+            doc = self.collection.find_one(self.ids[0], projection)
+            return doc.get("tags")
+
+        self.assertEqual(["a", "b"], tags({"tags": {"$slice": 2}}))
+        self.assertEqual(["c", "d"], tags({"tags": {"$slice": -2}}))
+        self.assertEqual(["b", "c"], tags({"tags": {"$slice": [1, 2]}}))
+        self.assertEqual(["d"], tags({"tags": {"$slice": [-1, 5]}}))
+
+        doc = self.collection.find_one(self.ids[0], {"tags": {"$slice": 1}})
+        self.assertEqual(42, doc["age"])
+
+        doc = self.collection.find_one(
+            self.ids[0], {"tags": {"$slice": 1}, "_id": True})
+        self.assertEqual(set(["_id", "tags"]), set(doc.keys()))
+
+    def test_size_expression(self):
+        result = self.collection.aggregate([
+            {"$project": {
+                "_id": False,
+                "n": {"$size": {"$ifNull": ["$tags", []]}}
+            }}
+        ], cursor={})
+        self.assertEqual([2, 0, 1], [r["n"] for r in result])
+
+        with self.assertRaises(OperationFailure):
+            list(self.collection.aggregate(
+                [{"$project": {"n": {"$size": "$name"}}}], cursor={}))
+
+    def test_update_operators(self):
+        self.collection.update(
+            {"_id": self.ids[1]},
+            {"$set": {"address.city": "Nowhere"}, "$inc": {"age": 1},
+             "$push": {"tags": "c"}}
+        )
+        doc = self.collection.find_one(self.ids[1])
+        self.assertEqual("Nowhere", doc["address"]["city"])
+        self.assertEqual(18, doc["age"])
+        self.assertEqual(["c"], doc["tags"])
+
+    def test_upsert(self):
+        _id = ObjectId()
+        result = self.collection.update(
+            {"_id": _id}, {"$set": {"name": "Jim"}}, upsert=True)
+        self.assertEqual(_id, result["upserted"])
+        self.assertEqual("Jim", self.collection.find_one(_id)["name"])
+
+    def test_remove(self):
+        result = self.collection.remove({"age": {"$gt": 20}})
+        self.assertEqual(2, result["n"])
+        self.assertEqual(["Joe"], self.names())
+
+    def test_write_concern_that_cannot_be_satisfied(self):
+        with self.assertRaises(OperationFailure):
+            self.collection.insert({"name": "Jim"}, w=3)
+        self.assertEqual(3, self.collection.count())
+
+    def test_unique_index(self):
+        self.collection.create_index(
+            [("name", 1)], name="name_unique_index", unique=True)
+
+        with self.assertRaises(DuplicateKeyError) as exc:
+            self.collection.insert({"name": "John"})
+
+        self.assertEqual(11000, exc.exception.code)
+        self.assertEqual(
+            "name",
+            re.search(r'\$(.+)_unique_index', exc.exception.message).group(1)
+        )
+        self.assertEqual(3, self.collection.count())
+
+    def test_unique_index_on_update(self):
+        self.collection.create_index("name", unique=True)
+        self.collection.update({"_id": self.ids[2]}, {"$set": {"age": 31}})
+
+        with self.assertRaises(DuplicateKeyError):
+            self.collection.update(
+                {"_id": self.ids[2]}, {"$set": {"name": "John"}})
+        self.assertEqual("Jane", self.collection.find_one(self.ids[2])["name"])
+
+    def test_unique_index_lookup(self):
+        self.collection.create_index("name", unique=True)
+        self.assertEqual(
+            self.ids[1], self.collection.find_one({"name": "Joe"})["_id"])
+        self.assertIsNone(self.collection.find_one({"name": "Nobody"}))
+
+    def test_creating_unique_index_on_duplicates_fails(self):
+        self.collection.insert({"name": "John"})
+        with self.assertRaises(DuplicateKeyError):
+            self.collection.create_index("name", unique=True)
+
+    def test_index_information(self):
+        self.collection.create_index([("age", -1)], sparse=True)
+        info = self.collection.index_information()
+        self.assertEqual([("age", -1)], info["age_-1"]["key"])
+        self.assertTrue(info["age_-1"]["sparse"])
+
+    def test_distinct(self):
+        self.assertEqual(["a", "b"], self.collection.distinct("tags"))
+
+    def test_drop_database_keeps_handles_valid(self):
+        self.db.client.drop_database("test_database")
+        self.assertEqual(0, self.collection.count())
+        self.collection.insert({"name": "Jim"})
+        self.assertEqual(1, self.db.people.count())
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+import unittest
+from tavi import Connection
+from tavi import instrumentation
+from tavi.documents import Document, EmbeddedDocument
+from tavi.errors import TaviError
+from tavi.query import Query, mongo_name
+from tavi import fields
+
+
+class Address(EmbeddedDocument):
+    city = fields.StringField("city")
+
+
+class Person(Document):
+    name = fields.StringField("n")
+    age = fields.IntegerField("a")
+    address = fields.EmbeddedField("addr", Address)
+
+
+class QueryBuilderTest(unittest.TestCase):
+    def test_mongo_name(self):
+        self.assertEqual("n", mongo_name(Person, "name"))
+        self.assertEqual("addr.city", mongo_name(Person, "address.city"))
+        self.assertEqual("_id", mongo_name(Person, "_id"))
+
+    def test_unknown_field(self):
+        with self.assertRaises(TaviError):
+            Person.where(nickname="J")
+
+    def test_conditions(self):
+        query = Person.where(name="John", age__gte=21, address__city="Here")
+        self.assertEqual(
+            {"n": "John", "a": {"$gte": 21}, "addr.city": "Here"}, query.spec)
+
+    def test_conditions_on_the_same_field_are_merged(self):
+        query = Person.where(age__gte=21).where(age__lt=65)
+        self.assertEqual({"a": {"$gte": 21, "$lt": 65}}, query.spec)
+
+        query = Person.where(name="John").where(name="Joe")
+        self.assertEqual({"$and": [{"n": "John"}, {"n": "Joe"}]}, query.spec)
+
+    def test_spec_is_translated(self):
+        query = Person.where({"$or": [{"name": "John"}, {"age": 42}]})
+        self.assertEqual({"$or": [{"n": "John"}, {"a": 42}]}, query.spec)
+
+    def test_queries_are_immutable(self):
+        query = Person.where(name="John")
+        query.where(age=42).order_by("-age").limit(1)
+        self.assertEqual({"n": "John"}, query.spec)
+        self.assertIsInstance(query, Query)
+
+
+class QueryTest(unittest.TestCase):
+    def setUp(self):
+        super(QueryTest, self).setUp()
+        Connection.client.drop_database("test_database")
+        for name, age, city in [
+            ("John", 42, "Here"), ("Joe", 17, "There"), ("Jane", 30, "Here")
+        ]:
+            Person(name=name, age=age, address=Address(city=city)).save()
+
+        self.events = []
+        instrumentation.register(self.events.append)
+
+    def tearDown(self):
+        super(QueryTest, self).tearDown()
+        instrumentation.unregister(self.events.append)
+
+    def test_all_with_order_skip_and_limit(self):
+        query = Person.where(age__gte=18).order_by("-age")
+        self.assertEqual(["John", "Jane"], [p.name for p in query])
+        self.assertEqual(
+            ["Jane"], [p.name for p in query.skip(1).limit(1).all()])
+
+    def test_stream(self):
+        documents = Person.where(age__gte=18).order_by("name").stream()
+        self.assertEqual("Jane", next(documents).name)
+        self.assertEqual(["John"], [p.name for p in documents])
+
+    def test_first(self):
+        self.assertEqual("Joe", Person.where().order_by("age").first().name)
+        self.assertIsNone(Person.where(name="Nobody").first())
+
+    def test_count(self):
+        self.assertEqual(2, Person.where(address__city="Here").count())
+        self.assertEqual(
+            1, Person.where(address__city="Here").limit(1).count())
+        self.assertEqual(0, Person.where(name="Nobody").count())
+        self.assertEqual("count", self.events[-1].operation)
+
+    def test_exists(self):
+        self.assertTrue(Person.where(name__in=["Jane", "Jim"]).exists())
+        self.assertFalse(Person.where(age__gt=100).exists())
+
+    def test_distinct(self):
+        self.assertEqual(
+            ["Here", "There"], sorted(Person.where().distinct("address.city")))
+        self.assertEqual(
+            [42, 30], Person.where(address__city="Here").distinct("age"))
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+import unittest
+from pymongo.read_preferences import Primary, SecondaryPreferred
+from tavi import Connection
+from tavi import read_preferences
+from tavi.documents import Document
+from tavi.errors import TaviError
+from tavi import fields
+from unit import BACKEND
+
+
+class MakeTest(unittest.TestCase):
+    def test_modes(self):
+        self.assertEqual(Primary(), read_preferences.make("primary"))
+        self.assertEqual(
+            SecondaryPreferred([{"dc": "east"}]),
+            read_preferences.make("secondaryPreferred", [{"dc": "east"}])
+        )
+
+    def test_unknown_mode(self):
+        with self.assertRaises(TaviError):
+            read_preferences.make("secondaryOnly")
+
+    def test_passes_pymongo_read_preferences_through(self):
+        preference = SecondaryPreferred()
+        self.assertIs(preference, read_preferences.make(preference))
+
+
+@unittest.skipUnless("memory" == BACKEND, "counts reads on the memory backend")
+class ReadPreferenceRoutingTest(unittest.TestCase):
+    class Sample(Document):
+        name = fields.StringField("name")
+
+    class Report(Document):
+        __read_preference__ = "secondaryPreferred"
+        __tag_sets__ = [{"dc": "east"}, {}]
+
+        name = fields.StringField("name")
+
+    def setUp(self):
+        super(ReadPreferenceRoutingTest, self).setUp()
+        Connection.client.drop_database("test_database")
+        Connection.client.reads.clear()
+
+    def test_default_reads_use_primary(self):
+        list(self.Sample.find())
+        self.assertEqual({"primary": 1}, Connection.client.reads)
+
+    def test_per_call_read_preference(self):
+        self.Sample(name="John").save()
+        list(self.Sample.find(read_preference="secondaryPreferred"))
+        found = self.Sample.find_one(
+            {"name": "John"}, read_preference="nearest")
+
+        self.assertEqual("John", found.name)
+        self.assertEqual(
+            {"secondaryPreferred": 1, "nearest": 1}, Connection.client.reads)
+
+    def test_per_class_read_preference(self):
+        list(self.Report.find())
+        list(self.Report.find(read_preference="primary"))
+
+        self.assertEqual(
+            {"secondaryPreferred": 1, "primary": 1}, Connection.client.reads)
+
+    def test_reads_after_writes_in_session_use_primary(self):
+        with read_preferences.session():
+            list(self.Report.find())
+            self.Report(name="Q1").save()
+            list(self.Report.find())
+            list(self.Report.find(read_preference="secondary"))
+
+        list(self.Report.find())
+        self.assertEqual(
+            {"secondaryPreferred": 2, "primary": 2}, Connection.client.reads)
+
+    def test_nested_sessions_share_state(self):
+        with read_preferences.session() as outer:
+            with read_preferences.session() as inner:
+                self.Sample(name="John").save()
+            self.assertIs(outer, inner)
+            self.assertTrue(outer.wrote)
+        self.assertIsNone(read_preferences.current_session())
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+import unittest
+from bson import ObjectId
+from tavi import Connection
+from tavi import instrumentation
+from tavi import references
+from tavi.documents import Document, EmbeddedDocument
+from tavi.errors import TaviError, TaviTypeError
+from tavi import fields
+
+
+class Customer(Document):
+    name = fields.StringField("n")
+
+
+class Warehouse(Document):
+    city = fields.StringField("c")
+
+
+class Order(Document):
+    number = fields.IntegerField("no")
+    customer = fields.ReferenceField("cu", Customer)
+    warehouse = fields.ReferenceField("wh", Warehouse)
+
+
+class Line(EmbeddedDocument):
+    customer = fields.ReferenceField("cu", Customer)
+
+
+class ReferenceFieldTest(unittest.TestCase):
+    def setUp(self):
+        super(ReferenceFieldTest, self).setUp()
+        Connection.client.drop_database("test_database")
+        self.customer = Customer(name="John")
+        self.customer.save()
+
+    def test_requires_a_document_class(self):
+        with self.assertRaises(TaviTypeError):
+            fields.ReferenceField("x", dict)
+
+    def test_stores_the_id(self):
+        order = Order(number=1, customer=self.customer)
+        self.assertTrue(order.valid)
+        self.assertIs(self.customer, order.customer)
+        self.assertEqual(self.customer.bson_id, order.mongo_field_values["cu"])
+        self.assertIsNone(order.mongo_field_values["wh"])
+
+    def test_accepts_ids(self):
+        order = Order(customer=str(self.customer.bson_id))
+        self.assertEqual(self.customer.bson_id, order.field_values["customer"])
+
+        order.customer = "not an id"
+        self.assertEqual(
+            ["Cu must be a valid Object Id"],
+            order.errors.full_messages
+        )
+
+    def test_rejects_other_documents(self):
+        with self.assertRaises(TaviTypeError):
+            Order(customer=Warehouse(city="Here"))
+
+    def test_unsaved_document(self):
+        order = Order(customer=Customer(name="Jane"))
+        self.assertFalse(order.valid)
+
+    def test_resolves_on_first_access(self):
+        Order(number=1, customer=self.customer).save()
+        order = Order.find_one()
+
+        self.assertEqual("John", order.customer.name)
+        self.assertIs(order.customer, order.customer)
+
+    def test_embedded_documents_compare_the_ids(self):
+        events = []
+        instrumentation.register(events.append)
+        try:
+            line = Line(customer=self.customer)
+            self.assertEqual(line, Line(customer=self.customer.bson_id))
+            self.assertNotEqual(
+                Line(customer=ObjectId()), Line(customer=ObjectId()))
+        finally:
+            instrumentation.unregister(events.append)
+        self.assertEqual([], events)
+
+    def test_missing_document(self):
+        order = Order(customer=ObjectId())
+        self.assertIsNone(order.customer)
+
+
+class PrefetchTest(unittest.TestCase):
+    def setUp(self):
+        super(PrefetchTest, self).setUp()
+        Connection.client.drop_database("test_database")
+        customers = [Customer(name=name) for name in ("John", "Jane")]
+        warehouse = Warehouse(city="Here")
+        for document in customers + [warehouse]:
+            document.save()
+        for number in range(6):
+            Order(
+                number=number,
+                customer=customers[number % 2],
+                warehouse=warehouse
+            ).save()
+
+        self.events = []
+        instrumentation.register(self.events.append)
+
+    def tearDown(self):
+        super(PrefetchTest, self).tearDown()
+        instrumentation.unregister(self.events.append)
+
+    def reads(self):
+        return [
+            (e.operation, e.class_name) for e in self.events
+            if e.operation in ("find", "find_one")
+        ]
+
+    def test_one_query_per_class(self):
+        orders = Order.find().prefetch("customer", "warehouse")
+        names = [order.customer.name for order in orders]
+        cities = set(order.warehouse.city for order in orders)
+
+        self.assertEqual(["John", "Jane"] * 3, names)
+        self.assertEqual(set(["Here"]), cities)
+        self.assertEqual(
+            [("find", "Order"), ("find", "Customer"), ("find", "Warehouse")],
+            self.reads()
+        )
+
+    def test_without_prefetch(self):
+        for order in Order.find():
+            order.customer
+        self.assertEqual(7, len(self.reads()))
+
+    def test_query(self):
+        orders = Order.where(number__lt=4).prefetch("customer").all()
+        self.assertEqual(4, len([order.customer.name for order in orders]))
+        self.assertEqual(2, len(self.reads()))
+
+    def test_stream(self):
+        self.assertEqual(
+            ["John", "Jane"] * 3,
+            [o.customer.name for o in Order.where().prefetch("customer")
+                .order_by("number").stream()]
+        )
+        self.assertEqual([("find", "Customer")], self.reads())
+
+    def test_unknown_field(self):
+        with self.assertRaises(TaviError):
+            Order.where().prefetch("number")
+        with self.assertRaises(TaviError):
+            Order.find().prefetch("buyer")
+
+
+class IdentityMapTest(unittest.TestCase):
+    def setUp(self):
+        super(IdentityMapTest, self).setUp()
+        Connection.client.drop_database("test_database")
+        self.customer = Customer(name="John")
+        self.customer.save()
+        Order(number=1, customer=self.customer).save()
+        Order(number=2, customer=self.customer).save()
+
+    def test_inactive_by_default(self):
+        self.assertIsNone(references.current_identity_map())
+        self.assertIsNot(Customer.find_one(), Customer.find_one())
+
+    def test_same_instance_per_document(self):
+        with references.identity_map():
+            first = Customer.find_one()
+            self.assertIs(first, Customer.find()[0])
+            self.assertIs(first, Customer.find_by_id(first.bson_id))
+
+            orders = Order.find()
+            self.assertIs(orders[0].customer, orders[1].customer)
+            self.assertIs(first, orders[0].customer)
+
+    def test_prefetch_skips_mapped_documents(self):
+        events = []
+        instrumentation.register(events.append)
+        try:
+            with references.identity_map():
+                list(Customer.find())
+                Order.find().prefetch("customer")
+        finally:
+            instrumentation.unregister(events.append)
+
+        self.assertEqual(
+            ["Customer", "Order"],
+            [e.class_name for e in events]
+        )
+
+    def test_saved_and_deleted_documents(self):
+        with references.identity_map() as identity_map:
+            customer = Customer(name="Jane")
+            customer.save()
+            self.assertIs(customer, Customer.find_by_id(customer.bson_id))
+
+            customer.delete()
+            self.assertIsNone(identity_map.get(Customer, customer.bson_id))
@@ -1,8 +1,22 @@
 # -*- coding: utf-8 -*-
 import unittest
 import datetime
+from StringIO import StringIO
+from bson import Binary, ObjectId
+from bson.json_util import dumps
 from tavi import fields
-from tavi.documents import Document
+from tavi.documents import Document, EmbeddedDocument
+
+
+class Part(EmbeddedDocument):
+    label = fields.StringField("label")
+    made_on = fields.DateTimeField("made_on")
+
+
+class Assembly(Document):
+    part = fields.EmbeddedField("part", Part)
+    parts = fields.ListField("parts", Part)
+    payload = fields.ArrayField("payload")
 
 
 class SerializationTest(unittest.TestCase):
@@ -67,3 +81,48 @@ class SerializationTest(unittest.TestCase):
         self.assertEqual(9.99, t.price)
         self.assertEqual("Widget", t.name)
         self.assertEqual(3, t.quantity)
+
+    def test_serialize_only_specified_fields_leaves_fields_as_is(self):
+        t = self.Target(name="Widget", price=9.99)
+        names = ["bson_id", "name"]
+
+        self.assertEqual('{"name": "Widget", "id": null}', t.to_json(names))
+        self.assertEqual(["bson_id", "name"], names)
+
+    def test_serialize_unknown_field_to_json(self):
+        with self.assertRaises(KeyError):
+            self.Target(name="Widget").to_json(fields=["color"])
+
+    def test_serialize_extended_json_values(self):
+        made_on = datetime.datetime(2013, 8, 25, 22, 24, 0)
+        a = Assembly(
+            part=Part(label="bolt", made_on=made_on),
+            parts=[{"label": "nut"}, {"label": "washer"}],
+            payload=[Binary("abc"), ObjectId("520a5fca4f8a1e1c32000001")]
+        )
+        a._id = ObjectId("520a5fca4f8a1e1c32000002")
+
+        expected = dict(a.field_values, id=a.bson_id)
+        self.assertEqual(dumps(expected), a.to_json())
+
+    def test_dumps_many(self):
+        targets = [self.Target(name="Widget"), self.Target(name="Gadget")]
+        expected = "[%s]" % ", ".join(t.to_json() for t in targets)
+        self.assertEqual(expected, self.Target.dumps_many(targets))
+
+        self.assertEqual("[]", self.Target.dumps_many([]))
+
+    def test_dumps_many_to_file(self):
+        targets = (self.Target(name=str(i), quantity=i) for i in range(3))
+        out = StringIO()
+
+        count = self.Target.dumps_many(
+            targets, fields=["name", "bson_id"], fileobj=out)
+
+        self.assertEqual(3, count)
+        self.assertEqual(
+            '[{"name": "0", "id": null}, '
+            '{"name": "1", "id": null}, '
+            '{"name": "2", "id": null}]',
+            out.getvalue()
+        )
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+import unittest
+from tavi.documents import Document
+from tavi import fields
+from tavi import validators
+
+
+class Series(Document):
+    readings = fields.ArrayField("readings", validate_items=[
+        validators.item_type((int, float)),
+        validators.item_range(min_value=0, max_value=10, limit=3)
+    ])
+    codes = fields.ArrayField("codes", validate_items=[
+        validators.item_pattern(r"[A-Z]{2}-\d+$"),
+        validators.unique_items()
+    ])
+
+
+class ValidatorsTest(unittest.TestCase):
+    def test_valid_items(self):
+        series = Series(readings=[0, 2.5, 10], codes=["AB-1", "CD-22"])
+        self.assertTrue(series.valid, series.errors.full_messages)
+
+    def test_item_type(self):
+        series = Series(readings=[1, "2", 3.0, None])
+        self.assertEqual(
+            ["Readings has items that are not int or float at indexes 1, 3"],
+            series.errors.full_messages
+        )
+
+    def test_item_range(self):
+        series = Series(readings=[-1, 11, 5])
+        self.assertEqual(
+            [
+                "Readings has items that are too small (minimum is 0) "
+                "at index 0",
+                "Readings has items that are too big (maximum is 10) "
+                "at index 1"
+            ],
+            series.errors.full_messages
+        )
+
+    def test_reports_a_limited_number_of_indexes(self):
+        series = Series(readings=[-1] * 5)
+        self.assertEqual(
+            [
+                "Readings has items that are too small (minimum is 0) "
+                "at indexes 0, 1, 2 and 2 more"
+            ],
+            series.errors.full_messages
+        )
+
+    def test_item_pattern(self):
+        series = Series(codes=["AB-1", "ab-2", 3])
+        self.assertEqual(
+            ["Codes has items in the wrong format at indexes 1, 2"],
+            series.errors.full_messages
+        )
+
+    def test_unique_items(self):
+        series = Series(codes=["AB-1", "AB-2", "AB-1", "AB-1"])
+        self.assertEqual(
+            ["Codes has repeated items at indexes 2, 3"],
+            series.errors.full_messages
+        )
+
+        field = fields.ArrayField("f")
+        series.errors.clear("codes")
+        validators.unique_items()(field, series, [{"a": 1}, {"a": 1}])
+        self.assertEqual(
+            ["F has repeated items at index 1"],
+            series.errors.full_messages
+        )
+
+    def test_values_that_are_not_lists(self):
+        series = Series(codes="AB-1AB-1")
+        self.assertEqual(["Codes is not a list."], series.errors.full_messages)
@@ -3,6 +3,11 @@
 from __future__ import with_statement
 import time
 
+# Prefer a monotonic, high resolution clock when the interpreter provides one
+# and fall back to wall-clock time otherwise.
+clock = getattr(time, "perf_counter", None) or \
+    getattr(time, "monotonic", None) or time.time
+
 
 class Timer(object):
     """An object use to time a block of code."""
@@ -11,14 +16,23 @@ class Timer(object):
         self._finish = None
 
     def __enter__(self):
-        self._start = time.time()
+        self._start = clock()
+        return self
 
     def __exit__(self, type_, value, traceback):
-        self._finish = time.time()
+        self._finish = clock()
+
+    @property
+    def elapsed(self):
+        """The unrounded amount of time, in seconds, taken to execute the
+        block of code.
+
+        """
+        return self._finish - self._start
 
     def duration_in_seconds(self):
         """The amount of time taken to execute block of code. Rounded to
         nearest millisecond.
 
         """
-        return round(self._finish - self._start, 3)
+        return round(self.elapsed, 3)
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""Provides batch validators for the items of tavi.fields.ArrayField.
+
+A batch validator is given all the items of the field at once, as the
+*validate_items* of the field, instead of being called once per item like
+*validate_item*. The validators of this module check the common cases in
+a single pass over the items and add one error per validator, naming the
+indexes of the first *limit* offending items::
+
+    from tavi import validators
+
+    class Series(Document):
+        readings = fields.ArrayField("readings", validate_items=[
+            validators.item_type(float),
+            validators.item_range(min_value=0)
+        ])
+
+    >>> Series(readings=[1.5, -2.0, "x"]).errors.full_messages
+    ["Readings has items that are not float at index 2",
+     "Readings has items that are too small (minimum is 0) at index 1"]
+
+"""
+import re
+
+LIMIT = 10
+
+_NUMBERS = (int, long, float)
+
+
+def report(field, instance, indexes, message, limit=LIMIT):
+    """Adds *message* as an error of *field* to *instance*, followed by the
+    first *limit* of the offending *indexes*. Does nothing if there are
+    no *indexes*.
+
+    """
+    if not indexes:
+        return
+
+    shown = ", ".join(str(index) for index in indexes[:limit])
+    if len(indexes) > limit:
+        shown += " and %s more" % (len(indexes) - limit)
+    instance.errors.add(field.name, "%s at %s %s" % (
+        message, "index" if 1 == len(indexes) else "indexes", shown))
+
+
+def item_type(types, limit=LIMIT):
+    """Returns a validator that checks each item is an instance of *types*,
+    a type or a tuple of types.
+
+    """
+    if not isinstance(types, tuple):
+        types = (types,)
+    message = "has items that are not %s" % " or ".join(
+        t.__name__ for t in types)
+
+    def validate(field, instance, items):
+        # Comparing the distinct types of the items is much faster than
+        # checking each item and enough when they are all valid.
+        if all(issubclass(kind, types) for kind in set(map(type, items))):
+            return
+        indexes = [
+            i for i, item in enumerate(items) if not isinstance(item, types)
+        ]
+        report(field, instance, indexes, message, limit)
+    return validate
+
+
+def item_range(min_value=None, max_value=None, limit=LIMIT):
+    """Returns a validator that checks each number is at least *min_value*
+    and at most *max_value*, when given. Items that are not numbers are
+    left to *item_type*.
+
+    """
+    def validate(field, instance, items):
+        if not items:
+            return
+
+        # min and max find valid items without a Python call per item
+        if min_value is not None and min(items) < min_value:
+            report(
+                field, instance,
+                [
+                    i for i, item in enumerate(items)
+                    if isinstance(item, _NUMBERS) and item < min_value
+                ],
+                "has items that are too small (minimum is %s)" % min_value,
+                limit
+            )
+
+        if max_value is not None and max(items) > max_value:
+            report(
+                field, instance,
+                [
+                    i for i, item in enumerate(items)
+                    if isinstance(item, _NUMBERS) and item > max_value
+                ],
+                "has items that are too big (maximum is %s)" % max_value,
+                limit
+            )
+    return validate
+
+
+def item_pattern(pattern, limit=LIMIT):
+    """Returns a validator that checks each item is a string that matches
+    the regular expression *pattern*, which is compiled once.
+
+    """
+    match = re.compile(pattern).match
+
+    def validate(field, instance, items):
+        indexes = [
+            i for i, item in enumerate(items)
+            if not (isinstance(item, basestring) and match(item))
+        ]
+        report(
+            field, instance, indexes, "has items in the wrong format", limit)
+    return validate
+
+
+def unique_items(limit=LIMIT):
+    """Returns a validator that checks no item is equal to an earlier one.
+    The indexes of the repeated items are reported.
+
+    """
+    def validate(field, instance, items):
+        try:
+            if len(set(items)) == len(items):
+                return
+            seen = set()
+            indexes = []
+            for i, item in enumerate(items):
+                if item in seen:
+                    indexes.append(i)
+                seen.add(item)
+        except TypeError:    # unhashable items, such as dictionaries
+            indexes = [
+                i for i, item in enumerate(items) if item in items[:i]
+            ]
+        report(field, instance, indexes, "has repeated items", limit)
+    return validate